@@ -0,0 +1,512 @@
+from game import Game
+from player import Player
+from world import World
+from topology import Topology
+from map_generator import generate_world
+
+import sys
+import os
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import tempfile
+import contextlib
+import statistics
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent / 'risk-agents'))
+
+from angry_based_agent import AngryBased
+from random_agent import Agent
+from monte_carlo_agent import MonteCarlo
+
+AGENTS = {
+    'AngryBased': AngryBased,
+    'Agent': Agent,
+    'MonteCarlo': MonteCarlo
+}
+
+def summarize(samples: list) -> dict:
+    """Describe a list of durations.
+
+    Parameters
+    ----------
+    samples : list
+        Durations in seconds.
+
+    Returns
+    -------
+    dict
+        The `count` and the `mean`, `median`, `p95`, `p99` and `max` in
+        microseconds.
+    """
+
+    if not samples:
+        return {'count': 0}
+
+    samples = sorted(samples)
+
+    def percentile(q):
+        return samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6
+
+    return {
+        'count': len(samples),
+        'mean': statistics.fmean(samples) * 1e6,
+        'median': percentile(0.5),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'max': samples[-1] * 1e6
+    }
+
+def bench_games(n_games: int, seed: int = 0, max_turns: int = 150) -> dict:
+    """Play headless games between random agents.
+
+    Parameters
+    ----------
+    n_games : int
+    seed : int, default 0
+    max_turns : int, default 150
+
+    Returns
+    -------
+    dict
+    """
+
+    actions = 0
+    turns = 0
+
+    time_start = time.perf_counter()
+
+    for i in range(n_games):
+        random.seed(seed + i)
+        game = Game(agents=[Agent(1, headless=True), Agent(2, headless=True)])
+        game.run(max_turns)
+        actions += game.player_1.control.call_count + game.player_2.control.call_count
+        turns += game.turn
+
+    duration = time.perf_counter() - time_start
+
+    return {
+        'games': n_games,
+        'actions': actions,
+        'turns': turns,
+        'duration': duration,
+        'games_per_second': n_games / duration,
+        'actions_per_second': actions / duration
+    }
+
+def bench_action_latency(n_games: int, protocol: str = 'full', seed: int = 0, max_turns: int = 150) -> dict:
+    """Time the phases of every action of headless games between random\\
+    agents.
+
+    The loop is the one of `Game.run`, with `_ask_active_agent` as the wait
+    for the agent. The data `_update_players_data` would send to both
+    players after every action is also created, without a transport, and
+    the agents acknowledge every update at once.
+
+    Parameters
+    ----------
+    n_games : int
+    protocol : {'full', 'delta', 'binary'}, default 'full'
+    seed : int, default 0
+    max_turns : int, default 150
+
+    Returns
+    -------
+    dict
+        The latencies of the `wait`, `execute` and `serialize` phases and
+        the mean `bytes` sent to each player per update.
+    """
+
+    wait = []
+    execute = []
+    serialize = []
+    n_bytes = 0
+
+    for i in range(n_games):
+        random.seed(seed + i)
+        game = Game(agents=[Agent(1, headless=True), Agent(2, headless=True)], protocol=protocol)
+        players = (game.player_1, game.player_2)
+
+        game.time_start = time.perf_counter()
+
+        while game.turn < max_turns:
+            t0 = time.perf_counter()
+            game._ask_active_agent()
+            t1 = time.perf_counter()
+            game._execute_active_player_action()
+            has_winner = game._check_for_winner()
+            t2 = time.perf_counter()
+
+            payloads = game._create_players_payloads()
+            t3 = time.perf_counter()
+
+            for player in players:
+                player.control.acked_count = player.data_count
+
+            wait.append(t1 - t0)
+            execute.append(t2 - t1)
+            serialize.append(t3 - t2)
+            n_bytes += sum(map(len, payloads))
+
+            if has_winner:
+                break
+
+    return {
+        'protocol': protocol,
+        'wait': summarize(wait),
+        'execute': summarize(execute),
+        'serialize': summarize(serialize),
+        'bytes_per_update': n_bytes / (2 * len(serialize))
+    }
+
+def bench_components(n_samples: int, seed: int = 0) -> dict:
+    """Time the map data of a player against the number of countries it owns.
+
+    For every number of owned countries, random sets of countries are given
+    to a player and the following are timed: building its `ComponentIndex`
+    and `BorderIndex` country by country, gaining and losing one more
+    country, and the `_create_components` and `_create_border_countries`
+    done whenever the map changes.
+
+    Parameters
+    ----------
+    n_samples : int
+        Random sets of countries for each number of owned countries.
+    seed : int, default 0
+
+    Returns
+    -------
+    dict
+        A dict with the number of owned countries as keys.
+    """
+
+    rng = random.Random(seed)
+    random.seed(seed)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        game = Game(agents=[Agent(1, headless=True), Agent(2, headless=True)])
+
+    world = game.world
+    results = {}
+
+    for n_owned in range(1, len(world.country_list)):
+        build = []
+        update = []
+        create = []
+
+        for _ in range(n_samples):
+            countries = rng.sample(world.country_list, n_owned + 1)
+            player = Player(1, 0)
+            enemy = Player(2, 0)
+
+            for country in world.country_list:
+                country.owner = enemy
+            for country in countries[:-1]:
+                country.owner = player
+            player.countries_owned = countries[:-1]
+
+            t0 = time.perf_counter()
+            for country in player.countries_owned:
+                player.component_index.add(country)
+                player.border_index.add(country)
+            t1 = time.perf_counter()
+            player.component_index.add(countries[-1])
+            player.border_index.add(countries[-1])
+            player.component_index.remove(countries[-1])
+            player.border_index.remove(countries[-1])
+            t2 = time.perf_counter()
+            game._create_border_countries(player)
+            game._create_components(player)
+            t3 = time.perf_counter()
+
+            build.append(t1 - t0)
+            update.append(t2 - t1)
+            create.append(t3 - t2)
+
+        results[n_owned] = {
+            'build_index': summarize(build),
+            'add_remove': summarize(update),
+            'create_map_data': summarize(create)
+        }
+
+    return results
+
+def bench_scaling(sizes: tuple, n_samples: int, seed: int = 0) -> dict:
+    """Time the engine on generated worlds of growing sizes.
+
+    For every number of countries, a world with a continent every 20
+    countries is generated, compiled and loaded, and a game is drafted on
+    it. The map data created for a player whenever the map changes, the new
+    troops given at the start of every turn and the countries data sent to
+    the agents are then timed, as is gaining and losing a country in the
+    `ComponentIndex`.
+
+    The `growth` of each measure is the exponent of its mean time from one
+    size to the next: about 1 is linear in the number of countries, 2 is
+    quadratic.
+
+    Parameters
+    ----------
+    sizes : tuple
+        Numbers of countries, in increasing order.
+    n_samples : int
+    seed : int, default 0
+
+    Returns
+    -------
+    dict
+        A dict with the number of countries as keys, and the `growth`.
+    """
+
+    results = {}
+    rng = random.Random(seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_countries in sizes:
+            measures = {}
+
+            def measure(name, function):
+                time_start = time.perf_counter()
+                function()
+                measures.setdefault(name, []).append(time.perf_counter() - time_start)
+
+            world_dict = generate_world(n_countries, max(1, n_countries // 20), seed)
+            world_path = Path(tmp) / f'world_{n_countries}.json'
+            world_path.write_text(json.dumps(world_dict))
+
+            measure('compile_topology', lambda: Topology.from_dict(world_dict))
+            World(str(world_path))
+            for _ in range(n_samples):
+                measure('create_world', lambda: World(str(world_path)))
+
+            random.seed(seed)
+            game = Game(agents=[Agent(1, headless=True), Agent(2, headless=True)], world_definition=str(world_path))
+            player = game.player_1
+
+            for _ in range(n_samples):
+                measure('create_border_countries', lambda: game._create_border_countries(player))
+                measure('create_components', lambda: game._create_components(player))
+                measure('distribute_new_troops', lambda: game._distribute_new_troops(player))
+                measure('create_countries_data', game._create_countries_data)
+
+                country = rng.choice(game.player_2.countries_owned)
+                measure('add_remove_country', lambda: (player.component_index.add(country),
+                                                       player.border_index.add(country),
+                                                       player.component_index.remove(country),
+                                                       player.border_index.remove(country)))
+
+            results[n_countries] = {name: summarize(samples) for name, samples in measures.items()}
+
+    results['growth'] = {}
+
+    for size_1, size_2 in zip(sizes, sizes[1:]):
+        results['growth'][f'{size_1}-{size_2}'] = {
+            name: math.log(results[size_2][name]['mean'] / results[size_1][name]['mean']) / math.log(size_2 / size_1)
+            for name
+            in results[size_1]
+        }
+
+    return results
+
+def bench_combat(n_battles: int, seed: int = 0) -> dict:
+    """Measure how many attacks and battles are resolved per second.
+
+    `Player.attack` is a single roll. The blitzes of `GameState` and
+    `combat.simulate_battles` fight 10 troops against 10 until the end.
+    The numpy ones are skipped if numpy is not installed.
+
+    Parameters
+    ----------
+    n_battles : int
+    seed : int, default 0
+
+    Returns
+    -------
+    dict
+    """
+
+    results = {}
+    random.seed(seed)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        game = Game(agents=[Agent(1, headless=True), Agent(2, headless=True)])
+
+    # Single rolls of the engine
+    player = game.player_1
+    attacker = next(country
+                    for country in player.countries_owned
+                    if any(neighbour.owner != player for neighbour in country.neighbours))
+    attacked = next(neighbour for neighbour in attacker.neighbours if neighbour.owner != player)
+
+    time_start = time.perf_counter()
+    for _ in range(n_battles):
+        attacker.n_troops = 10
+        attacked.n_troops = 10
+        player.attack(3, attacker, attacked)
+    duration = time.perf_counter() - time_start
+    results['player_attack'] = {'rolls': n_battles, 'duration': duration, 'per_second': n_battles / duration}
+
+    # Blitzes on a copy of the game
+    attacker.n_troops = 10
+    attacked.n_troops = 10
+    state = game.get_state(random.Random(seed))
+    state.active = player.id
+    state.states[player.id] = 'attacking'
+
+    time_start = time.perf_counter()
+    for _ in range(n_battles):
+        state.apply('blitz', [3, attacker.id, attacked.id])
+        state.undo()
+    duration = time.perf_counter() - time_start
+    results['game_state_blitz'] = {'battles': n_battles, 'duration': duration, 'per_second': n_battles / duration}
+
+    try:
+        import numpy as np
+        from combat import simulate_battles, BattleTables
+    except ImportError:
+        results['simulate_battles'] = results['battle_tables'] = 'skipped, numpy is not installed'
+        return results
+
+    rng = np.random.default_rng(seed)
+    time_start = time.perf_counter()
+    simulate_battles(np.full(n_battles, 10), 10, rng)
+    duration = time.perf_counter() - time_start
+    results['simulate_battles'] = {'battles': n_battles, 'duration': duration, 'per_second': n_battles / duration}
+
+    time_start = time.perf_counter()
+    tables = BattleTables()
+    build_duration = time.perf_counter() - time_start
+
+    time_start = time.perf_counter()
+    for _ in range(n_battles):
+        tables.win_probability(10, 10)
+    duration = time.perf_counter() - time_start
+    results['battle_tables'] = {
+        'build_duration': build_duration,
+        'lookups': n_battles,
+        'duration': duration,
+        'per_second': n_battles / duration
+    }
+
+    return results
+
+def bench_agents(agent_names: list, n_games: int, seed: int = 0, max_turns: int = 150) -> dict:
+    """Time the decisions of agents playing against the random agent.
+
+    MonteCarlo keeps its tree in a temporary database.
+
+    Parameters
+    ----------
+    agent_names : list
+        Names of agents in `AGENTS`.
+    n_games : int
+        Games of each agent.
+    seed : int, default 0
+    max_turns : int, default 150
+
+    Returns
+    -------
+    dict
+        The latencies of each agent by state.
+    """
+
+    results = {}
+
+    for name in agent_names:
+        latencies = {}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(n_games):
+                random.seed(seed + i)
+                agent = AGENTS[name](1, headless=True)
+
+                if isinstance(agent, MonteCarlo):
+                    agent.tree_path = Path(tmp) / 'tree.sqlite3'
+
+                act = agent.act
+
+                def timed_act(agent=agent, act=act):
+                    state = agent.state
+                    time_start = time.perf_counter()
+                    act()
+                    latencies.setdefault(state, []).append(time.perf_counter() - time_start)
+
+                agent.act = timed_act
+
+                game = Game(agents=[agent, Agent(2, headless=True)])
+                game.run(max_turns)
+
+                if isinstance(agent, MonteCarlo) and agent.mcts is not None:
+                    agent.mcts.store.close()
+
+        results[name] = {state: summarize(samples) for state, samples in latencies.items()}
+
+    return results
+
+BENCHMARKS = ('games', 'latency', 'components', 'scaling', 'combat', 'agents')
+
+def run_benchmarks(benchmarks: tuple = BENCHMARKS, quick: bool = False, seed: int = 0) -> dict:
+    """Run benchmarks and gather their results with a description of the\\
+    machine.
+
+    Parameters
+    ----------
+    benchmarks : tuple, default BENCHMARKS
+        Names of the benchmarks to run.
+    quick : bool, default False
+        True to run fewer iterations, for a smoke test.
+    seed : int, default 0
+
+    Returns
+    -------
+    dict
+    """
+
+    scale = 1 if quick else 10
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.time(),
+        'quick': quick,
+        'seed': seed
+    }
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if 'games' in benchmarks:
+            results['games'] = bench_games(5 * scale, seed)
+        if 'latency' in benchmarks:
+            results['latency'] = {protocol: bench_action_latency(scale, protocol, seed)
+                                  for protocol
+                                  in ('full', 'delta', 'binary')}
+        if 'components' in benchmarks:
+            results['components'] = bench_components(5 * scale, seed)
+        if 'scaling' in benchmarks:
+            sizes = (42, 250, 1000) if quick else (42, 500, 2000, 8000)
+            results['scaling'] = bench_scaling(sizes, 5 * scale, seed)
+        if 'combat' in benchmarks:
+            results['combat'] = bench_combat(2000 * scale, seed)
+        if 'agents' in benchmarks:
+            results['agents'] = bench_agents(['AngryBased', 'MonteCarlo'], max(1, scale // 5), seed)
+
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the engine, the protocols and the agents, printing JSON")
+    parser.add_argument('-b', '--benchmarks', nargs='+', choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument('-q', '--quick', action='store_true', help="run fewer iterations")
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', type=Path, default=None, help="write the JSON to a file instead of stdout")
+    args = parser.parse_args()
+
+    results = run_benchmarks(tuple(args.benchmarks), args.quick, args.seed)
+    json_data = json.dumps(results, indent=4)
+
+    if args.output is None:
+        print(json_data)
+    else:
+        args.output.write_text(json_data)
@@ -0,0 +1,163 @@
+import sys
+import struct
+from array import array
+
+MAGIC = b'RSKB'
+
+STATES = ('waiting', 'mobilizing', 'attacking', 'conquering', 'fortifying', 'winner', 'loser')
+
+# magic, count, id, state, n_new_troops, n_total_troops, enemy_n_total_troops,
+# n_countries, n_continents, n_components
+HEADER = struct.Struct('<4sIBBiiiHHH')
+
+def is_binary(payload: bytes) -> bool:
+    """Check if a message is in the binary format, json messages start\\
+    with `{`.
+
+    Parameters
+    ----------
+    payload : bytes
+
+    Returns
+    -------
+    bool
+    """
+
+    return payload[:4] == MAGIC
+
+def _to_little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+
+    return values.tobytes()
+
+def _from_little_endian(typecode: str, payload: bytes) -> array:
+    values = array(typecode, payload)
+
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+    return values
+
+def encode_player_data(
+        count: int,
+        id: int,
+        state: str,
+        n_new_troops: int,
+        n_total_troops: int,
+        enemy_n_total_troops: int,
+        owners: array,
+        troops: array,
+        continent_owners: list,
+        components: list
+    ) -> bytes:
+    """Pack the dynamic part of the player data.
+
+    The message is the header followed by the owner of each country as
+    int8, the troops of each country as int32, the owner of each continent
+    as int8 (0 for no owner) and a bitset of `ceil(n_countries / 8)` bytes
+    for each component of the player, with the bit `i` set if the country
+    with id `i` belongs to it. All ints are little endian.
+
+    Parameters
+    ----------
+    count : int
+    id : {1, 2}
+    state : str
+        One of `STATES`.
+    n_new_troops : int
+    n_total_troops : int
+    enemy_n_total_troops : int
+    owners : array
+        The id of the owner of each country indexed by country id, typecode
+        'b'.
+    troops : array
+        The troops on each country indexed by country id, typecode 'i'.
+    continent_owners : list
+        The id of the owner of each continent, 0 if it has no owner.
+    components : list
+        The bitmask of the country ids of each component of the player.
+
+    Returns
+    -------
+    bytes
+    """
+
+    n_countries = len(owners)
+    n_bytes = (n_countries + 7) // 8
+
+    header = HEADER.pack(
+        MAGIC,
+        count,
+        id,
+        STATES.index(state),
+        n_new_troops,
+        n_total_troops,
+        enemy_n_total_troops,
+        n_countries,
+        len(continent_owners),
+        len(components)
+    )
+
+    return b''.join((
+        header,
+        owners.tobytes(),
+        _to_little_endian(troops),
+        bytes(continent_owners),
+        *(component.to_bytes(n_bytes, 'little') for component in components)
+    ))
+
+def decode_player_data(payload: bytes) -> dict:
+    """Unpack a message made by `encode_player_data`.
+
+    Parameters
+    ----------
+    payload : bytes
+
+    Returns
+    -------
+    dict
+        A dict with the `count`, `id`, `state`, `n_new_troops`,
+        `n_total_troops` and `enemy_n_total_troops`, the `owners` and
+        `troops` arrays, the `continent_owners` bytes and the `components`
+        as lists of country ids.
+    """
+
+    (_, count, id, state, n_new_troops, n_total_troops, enemy_n_total_troops,
+     n_countries, n_continents, n_components) = HEADER.unpack_from(payload)
+
+    offset = HEADER.size
+    owners = array('b', payload[offset:offset + n_countries])
+    offset += n_countries
+    troops = _from_little_endian('i', payload[offset:offset + 4 * n_countries])
+    offset += 4 * n_countries
+    continent_owners = payload[offset:offset + n_continents]
+    offset += n_continents
+
+    n_bytes = (n_countries + 7) // 8
+    components = []
+
+    for _ in range(n_components):
+        bitset = int.from_bytes(payload[offset:offset + n_bytes], 'little')
+        offset += n_bytes
+
+        country_ids = []
+        while bitset:
+            lowest = bitset & -bitset
+            country_ids.append(lowest.bit_length() - 1)
+            bitset ^= lowest
+        components.append(country_ids)
+
+    return {
+        'count': count,
+        'id': id,
+        'state': STATES[state],
+        'n_new_troops': n_new_troops,
+        'n_total_troops': n_total_troops,
+        'enemy_n_total_troops': enemy_n_total_troops,
+        'owners': owners,
+        'troops': troops,
+        'continent_owners': continent_owners,
+        'components': components
+    }
@@ -0,0 +1,247 @@
+from functools import lru_cache
+from itertools import product
+
+import numpy as np
+
+MAX_ATTACKER_DICE = 3
+MAX_DEFENDER_DICE = 2
+
+def get_n_dice(attacker_troops: int, defender_troops: int) -> tuple:
+    """Get the dice used by each side when attacking with everything.
+
+    Parameters
+    ----------
+    attacker_troops : int
+        The number of troops on the attacking country.
+    defender_troops : int
+        The number of troops on the attacked country.
+
+    Returns
+    -------
+    tuple
+        `(attacker_dice, defender_dice)`.
+    """
+
+    return (min(MAX_ATTACKER_DICE, attacker_troops - 1), min(MAX_DEFENDER_DICE, defender_troops))
+
+@lru_cache(maxsize=None)
+def get_roll_outcomes(attacker_dice: int, defender_dice: int) -> tuple:
+    """Exact probabilities of the losses of a single roll.
+
+    The highest dice of each side are compared in pairs and the defender
+    wins the ties, as in `Player.attack`.
+
+    Parameters
+    ----------
+    attacker_dice : {1, 2, 3}
+    defender_dice : {1, 2}
+
+    Returns
+    -------
+    tuple
+        A tuple of `(attacker_losses, defender_losses, probability)` tuples.
+    """
+
+    counts = {}
+
+    for roll in product(range(1, 7), repeat=attacker_dice + defender_dice):
+        attacker_values = sorted(roll[:attacker_dice], reverse=True)
+        defender_values = sorted(roll[attacker_dice:], reverse=True)
+
+        attacker_losses = 0
+        defender_losses = 0
+
+        for attacker_value, defender_value in zip(attacker_values, defender_values):
+            if defender_value >= attacker_value:
+                attacker_losses += 1
+            else:
+                defender_losses += 1
+
+        key = (attacker_losses, defender_losses)
+        counts[key] = counts.get(key, 0) + 1
+
+    n_rolls = 6 ** (attacker_dice + defender_dice)
+
+    return tuple((attacker_losses, defender_losses, count / n_rolls)
+                 for (attacker_losses, defender_losses), count
+                 in sorted(counts.items()))
+
+def simulate_battles(attacker_troops, defender_troops, rng: np.random.Generator = None) -> tuple:
+    """Fight many independent battles until the end at once.
+
+    Each battle is rolled with the most dice allowed until the attacked
+    country has no troops or the attacking country has a single troop.
+    Every round rolls the dice of all battles still going on together.
+
+    Parameters
+    ----------
+    attacker_troops : int or array_like
+        The number of troops on each attacking country.
+    defender_troops : int or array_like
+        The number of troops on each attacked country, broadcast against
+        `attacker_troops`.
+    rng : numpy.random.Generator, optional
+        The generator of the dice, a new one is created if not given.
+
+    Returns
+    -------
+    tuple
+        `(attacker_remaining, defender_remaining)`, arrays with the troops
+        left on each country. A battle was won when its defender has 0.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    attacker, defender = np.broadcast_arrays(np.asarray(attacker_troops, dtype=np.int64),
+                                             np.asarray(defender_troops, dtype=np.int64))
+    attacker = attacker.copy()
+    defender = defender.copy()
+
+    active = np.flatnonzero((attacker >= 2) & (defender >= 1))
+
+    while active.size:
+        attacker_dice = np.minimum(MAX_ATTACKER_DICE, attacker[active] - 1)
+        defender_dice = np.minimum(MAX_DEFENDER_DICE, defender[active])
+
+        attacker_values = rng.integers(1, 7, size=(active.size, MAX_ATTACKER_DICE))
+        defender_values = rng.integers(1, 7, size=(active.size, MAX_DEFENDER_DICE))
+
+        # Dice not rolled count as 0 so they sort last
+        attacker_values[np.arange(MAX_ATTACKER_DICE) >= attacker_dice[:, None]] = 0
+        defender_values[np.arange(MAX_DEFENDER_DICE) >= defender_dice[:, None]] = 0
+
+        attacker_values = -np.sort(-attacker_values, axis=1)
+        defender_values = -np.sort(-defender_values, axis=1)
+
+        n_compared = np.minimum(attacker_dice, defender_dice)
+        attacker_losses = np.zeros(active.size, dtype=np.int64)
+        defender_losses = np.zeros(active.size, dtype=np.int64)
+
+        for i in range(MAX_DEFENDER_DICE):
+            compared = n_compared > i
+            defender_wins = defender_values[:, i] >= attacker_values[:, i]
+            attacker_losses += compared & defender_wins
+            defender_losses += compared & ~defender_wins
+
+        attacker[active] -= attacker_losses
+        defender[active] -= defender_losses
+
+        active = active[(attacker[active] >= 2) & (defender[active] >= 1)]
+
+    return attacker, defender
+
+class BattleTables:
+    """Exact outcome probabilities of battles fought until the end.
+
+    A battle is rolled with the most dice allowed until the attacked country
+    has no troops or the attacking country has a single troop. All the
+    tables are indexed by `[attacker_troops, defender_troops]`, the troops on
+    the attacking and the attacked country before the battle, so every query
+    is an array lookup.
+
+    Parameters
+    ----------
+    max_attacker : int, default 50
+        The largest number of troops on the attacking country in the tables.
+    max_defender : int, default 50
+        The largest number of troops on the attacked country in the tables.
+
+    Attributes
+    ----------
+    victory : numpy.ndarray
+        The probability of conquering the attacked country.
+    attacker_remaining : numpy.ndarray
+        `attacker_remaining[a, d, k]` is the probability of conquering the
+        attacked country with k troops left on the attacking country.
+    defender_remaining : numpy.ndarray
+        `defender_remaining[a, d, k]` is the probability of the attack ending
+        with a single troop on the attacking country and k troops left on
+        the attacked one.
+    expected_attacker_remaining : numpy.ndarray
+        The expected number of troops left on the attacking country.
+    expected_defender_remaining : numpy.ndarray
+        The expected number of troops left on the attacked country.
+    """
+
+    def __init__(self, max_attacker: int = 50, max_defender: int = 50):
+        self.max_attacker = max_attacker
+        self.max_defender = max_defender
+
+        shape = (max_attacker + 1, max_defender + 1)
+        attacker_remaining = np.zeros(shape + (max_attacker + 1,))
+        defender_remaining = np.zeros(shape + (max_defender + 1,))
+
+        for attacker in range(max_attacker + 1):
+            for defender in range(max_defender + 1):
+                if defender == 0:
+                    attacker_remaining[attacker, defender, attacker] = 1
+                elif attacker <= 1:
+                    defender_remaining[attacker, defender, defender] = 1
+                else:
+                    # Every roll loses at least a troop, so the next states
+                    # were already filled
+                    for attacker_losses, defender_losses, probability in get_roll_outcomes(*get_n_dice(attacker, defender)):
+                        next_state = (attacker - attacker_losses, defender - defender_losses)
+                        attacker_remaining[attacker, defender] += probability * attacker_remaining[next_state]
+                        defender_remaining[attacker, defender] += probability * defender_remaining[next_state]
+
+        self.attacker_remaining = attacker_remaining
+        self.defender_remaining = defender_remaining
+        self.victory = attacker_remaining.sum(axis=2)
+
+        self.expected_attacker_remaining = (attacker_remaining @ np.arange(max_attacker + 1)
+                                            + (1 - self.victory) * np.minimum(1, np.arange(max_attacker + 1))[:, None])
+        self.expected_defender_remaining = defender_remaining @ np.arange(max_defender + 1)
+
+    def win_probability(self, attacker_troops: int, defender_troops: int) -> float:
+        """Probability of conquering a country attacking until the end.
+
+        Parameters
+        ----------
+        attacker_troops : int
+            The number of troops on the attacking country.
+        defender_troops : int
+            The number of troops on the attacked country.
+
+        Returns
+        -------
+        float
+        """
+
+        return self.victory[attacker_troops, defender_troops]
+
+    def expected_losses(self, attacker_troops: int, defender_troops: int) -> tuple:
+        """Expected troops lost by each side attacking until the end.
+
+        Parameters
+        ----------
+        attacker_troops : int
+            The number of troops on the attacking country.
+        defender_troops : int
+            The number of troops on the attacked country.
+
+        Returns
+        -------
+        tuple
+            `(attacker_losses, defender_losses)`.
+        """
+
+        return (attacker_troops - self.expected_attacker_remaining[attacker_troops, defender_troops],
+                defender_troops - self.expected_defender_remaining[attacker_troops, defender_troops])
+
+@lru_cache(maxsize=None)
+def get_battle_tables(max_attacker: int = 50, max_defender: int = 50) -> BattleTables:
+    """Get the `BattleTables` of a size, built only once per process.
+
+    Parameters
+    ----------
+    max_attacker : int, default 50
+    max_defender : int, default 50
+
+    Returns
+    -------
+    BattleTables
+    """
+
+    return BattleTables(max_attacker, max_defender)
@@ -0,0 +1,231 @@
+from country import Country
+
+class ComponentIndex:
+    """Labels the groups of countries of a player connected by land.
+
+    Two countries owned by the same player are connected if there is a path
+    between them going only through countries of that player. Every group of
+    connected countries gets a component id, kept up to date as countries are
+    gained and lost, so checking a connection is a dict lookup.
+
+    Gaining a country merges the components around it, relabelling the
+    smaller ones. Losing a country may split its component, only that
+    component is relabelled.
+
+    Attributes
+    ----------
+    component_of : dict
+        A dict with the owned Country objects as keys and their component id
+        as values.
+    members : dict
+        A dict with the component ids as keys and a set with their Country
+        objects as values.
+    labels : dict
+        The same as `component_of` with country names as keys.
+
+        E.g.: `{'country A': 0, 'country B': 0, 'country C': 3}`
+    """
+
+    def __init__(self):
+        self.component_of = {}
+        self.members = {}
+        self.labels = {}
+        self._next_id = 0
+
+    def _new_component(self) -> int:
+        """Get an id never used by this index."""
+
+        id = self._next_id
+        self._next_id += 1
+        self.members[id] = set()
+
+        return id
+
+    def _label(self, country: Country, id: int):
+        """Put a country in a component, without touching the old one."""
+
+        self.component_of[country] = id
+        self.labels[country.name] = id
+        self.members[id].add(country)
+
+    def add(self, country: Country):
+        """Add a country just gained by the player.
+
+        Parameters
+        ----------
+        country : Country
+        """
+
+        ids = {self.component_of[neighbour]
+               for neighbour
+               in country.neighbours
+               if neighbour in self.component_of}
+
+        if not ids:
+            self._label(country, self._new_component())
+            return
+
+        # Keep the largest component and move the others into it
+        id = max(ids, key=lambda id: len(self.members[id]))
+        ids.discard(id)
+
+        for other_id in ids:
+            for member in self.members.pop(other_id):
+                self._label(member, id)
+
+        self._label(country, id)
+
+    def remove(self, country: Country):
+        """Remove a country just lost by the player.
+
+        Parameters
+        ----------
+        country : Country
+        """
+
+        id = self.component_of.pop(country)
+        del self.labels[country.name]
+        members = self.members[id]
+        members.discard(country)
+
+        if not members:
+            del self.members[id]
+            return
+
+        # The component can only split between the neighbours of the country
+        starts = [neighbour for neighbour in country.neighbours if neighbour in members]
+
+        if len(starts) <= 1:
+            return
+
+        reached = self._reach(starts[0], members)
+
+        if all(start in reached for start in starts):
+            return
+
+        # Split: the first part keeps the id, every other part gets a new one
+        self.members[id] = reached
+        remaining = members - reached
+
+        for start in starts:
+            if start not in remaining:
+                continue
+            part = self._reach(start, remaining)
+            remaining -= part
+            new_id = self._new_component()
+            for member in part:
+                self._label(member, new_id)
+
+    @staticmethod
+    def _reach(start: Country, members: set) -> set:
+        """Get every member reachable from start going through members."""
+
+        reached = {start}
+        stack = [start]
+
+        while stack:
+            country = stack.pop()
+            for neighbour in country.neighbours:
+                if neighbour in members and neighbour not in reached:
+                    reached.add(neighbour)
+                    stack.append(neighbour)
+
+        return reached
+
+    def are_connected(self, country_1: Country, country_2: Country) -> bool:
+        """Check if two countries are connected by countries of the player.
+
+        Parameters
+        ----------
+        country_1 : Country
+        country_2 : Country
+
+        Returns
+        -------
+        bool
+            `True` if both countries are owned and connected
+
+            `False` otherwise
+        """
+
+        id = self.component_of.get(country_1)
+
+        return id is not None and id == self.component_of.get(country_2)
+
+class BorderIndex:
+    """Keeps the frontier of a player: its countries bordering countries it\\
+    does not own.
+
+    The frontier only changes when the player gains or loses a country, and
+    then only around that country, so each update looks at the neighbours of
+    a single country.
+
+    Attributes
+    ----------
+    owned : set
+        The Country objects owned by the player.
+    edges : set
+        The frontier edges, as `(owned country id, id of a neighbour not
+        owned)` tuples.
+    border_countries : dict
+        A dict with the names of the owned countries with neighbours not
+        owned as keys and a list with the names of those neighbours as
+        values.
+
+        E.g.: `{'country A': ['enemy neighbour B', 'enemy neighbour C', ...]}`
+    """
+
+    def __init__(self):
+        self.owned = set()
+        self.edges = set()
+        self.border_countries = {}
+
+    def add(self, country: Country):
+        """Add a country just gained by the player.
+
+        Parameters
+        ----------
+        country : Country
+        """
+
+        self.owned.add(country)
+        enemies = []
+
+        for neighbour in country.neighbours:
+            if neighbour in self.owned:
+                self._remove_edge(neighbour, country)
+            else:
+                self.edges.add((country.id, neighbour.id))
+                enemies.append(neighbour.name)
+
+        if enemies:
+            self.border_countries[country.name] = enemies
+
+    def remove(self, country: Country):
+        """Remove a country just lost by the player.
+
+        Parameters
+        ----------
+        country : Country
+        """
+
+        self.owned.discard(country)
+        self.border_countries.pop(country.name, None)
+
+        for neighbour in country.neighbours:
+            if neighbour in self.owned:
+                self.edges.add((neighbour.id, country.id))
+                self.border_countries.setdefault(neighbour.name, []).append(country.name)
+            else:
+                self.edges.discard((country.id, neighbour.id))
+
+    def _remove_edge(self, country: Country, neighbour: Country):
+        """Remove an edge of the frontier, and its owned country from\\
+        `border_countries` if it was its last one."""
+
+        self.edges.discard((country.id, neighbour.id))
+        enemies = self.border_countries[country.name]
+        enemies.remove(neighbour.name)
+
+        if not enemies:
+            del self.border_countries[country.name]
@@ -1,6 +1,146 @@
+from array import array
+
+class ContinentCounters:
+    """Counts the countries of each owner in every continent.
+
+    The counters are updated in O(1) whenever a country changes owner, so
+    the owner of a continent and the extra armies of each player are known
+    without looking at the countries again.
+
+    Parameters
+    ----------
+    topology : Topology
+        The structure of the world.
+    owners : array
+        The id of the owner of each country, 0 if the country has no owner.
+
+    Attributes
+    ----------
+    counts : array
+        The number of countries of the owner `o` in the continent `c` is
+        `counts[c * 3 + o]`.
+    bonuses : array
+        `[no owner, player 1, player 2]` sum of the extra armies of the
+        continents owned.
+    changed : set
+        The ids of the continents whose owner changed, see
+        `World.pop_changes`.
+    """
+
+    __slots__ = ('country_continent', 'sizes', 'extra_armies', 'counts', 'bonuses', 'changed')
+
+    def __init__(self, topology, owners: array):
+        self.country_continent = topology.country_continent
+        self.extra_armies = topology.continent_extra_armies
+        self.sizes = array('i', bytes(4 * len(self.extra_armies)))
+
+        for continent_id in topology.country_continent:
+            self.sizes[continent_id] += 1
+
+        self.count(owners)
+
+    def count(self, owners: array):
+        """Count every country again, after the owners were replaced.
+
+        Parameters
+        ----------
+        owners : array
+        """
+
+        self.counts = array('i', bytes(4 * 3 * len(self.sizes)))
+        self.bonuses = array('i', [0, 0, 0])
+        self.changed = set(range(len(self.sizes)))
+
+        for country_id, owner in enumerate(owners):
+            self.counts[self.country_continent[country_id] * 3 + owner] += 1
+
+        for continent_id, size in enumerate(self.sizes):
+            for owner in (0, 1, 2):
+                if self.counts[continent_id * 3 + owner] == size:
+                    self.bonuses[owner] += self.extra_armies[continent_id]
+
+    def copy(self) -> 'ContinentCounters':
+        counters = ContinentCounters.__new__(ContinentCounters)
+        counters.country_continent = self.country_continent
+        counters.extra_armies = self.extra_armies
+        counters.sizes = self.sizes
+        counters.counts = array('i', self.counts)
+        counters.bonuses = array('i', self.bonuses)
+        counters.changed = set()
+
+        return counters
+
+    def move(self, country_id: int, old_owner: int, new_owner: int):
+        """Move a country from an owner to another.
+
+        Parameters
+        ----------
+        country_id : int
+        old_owner : {0, 1, 2}
+        new_owner : {0, 1, 2}
+        """
+
+        if old_owner == new_owner:
+            return
+
+        continent_id = self.country_continent[country_id]
+        size = self.sizes[continent_id]
+        i = continent_id * 3
+        counts = self.counts
+
+        if counts[i + old_owner] == size:
+            self.bonuses[old_owner] -= self.extra_armies[continent_id]
+            self.changed.add(continent_id)
+
+        counts[i + old_owner] -= 1
+        counts[i + new_owner] += 1
+
+        if counts[i + new_owner] == size:
+            self.bonuses[new_owner] += self.extra_armies[continent_id]
+            self.changed.add(continent_id)
+
+    def get_owner(self, continent_id: int) -> int:
+        """Get the id of the player owning all the countries of a\\
+        continent.
+
+        Parameters
+        ----------
+        continent_id : int
+
+        Returns
+        -------
+        int
+            0 if no player owns the whole continent.
+        """
+
+        size = self.sizes[continent_id]
+
+        for owner in (1, 2):
+            if self.counts[continent_id * 3 + owner] == size:
+                return owner
+
+        return 0
+
 class Continent:
     """Represents a continent.
 
+    The owner of a continent of a `World` is read from the continent
+    counters of the world, see `ContinentCounters`.
+
+    Parameters
+    ----------
+    name : str
+        A string containing the continent's name.
+    countries : list, optional
+        A list of Country objects with all the continent's countries.
+    extra_armies : int, default 0
+        The number of extra armies that the continent provides to its owner.
+    id : int, default 0
+        The unique identifier of the continent in its world.
+    world : World, optional
+        The world the continent belongs to. The owner of a continent created
+        without a world is found by looking at its countries.
+
     Attributes
     ---------
     name : str
@@ -14,29 +154,32 @@ class Continent:
         the end of the round.
     """
 
-    def __init__(self, name: str, countries: list = None, extra_armies = 0):
+    def __init__(self, name: str, countries: list = None, extra_armies = 0, id: int = 0, world = None):
         if countries is None:
             countries = []
         self.name = name
         self.countries = countries
-        self.owner = None
-        self.extra_armies = 0
+        self.extra_armies = extra_armies
+        self.id = id
+
+        if world is None:
+            self._counters = None
+            self._players = None
+        else:
+            self._counters = world.continent_counters
+            self._players = world.players
 
-    def update_continent_owner(self):
-        """Iterates over all the countries checking their owners. If all the\\
-        countries have the same owner, it becomes the owner of the continent."""
+    @property
+    def owner(self):
+        if self._counters is not None:
+            return self._players[self._counters.get_owner(self.id)]
 
         owner = None
-        has_owner = True
 
         for country in self.countries:
-            if owner == None:
+            if owner is None:
                 owner = country.owner
-            elif owner != country.owner:
-                has_owner = False
-                break
-        
-        if has_owner:
-            self.owner = owner
-        else:
-            self.owner = None
\ No newline at end of file
+            if owner is None or country.owner != owner:
+                return None
+
+        return owner
@@ -1,32 +1,146 @@
+from zobrist import get_keys, N_CACHED_TROOPS
+from array import array
+
+# Shared by the countries created without a world
+_STANDALONE_KEYS = get_keys(1)
+
 class Country:
     """Represents a country.
-    
+
+    The owner and the number of troops of a country live in arrays of its
+    `World`, indexed by the country id, so the whole board can be read,
+    copied and restored as two arrays. A Country is a view of its position
+    in those arrays.
+
+    Setting the owner or the troops also updates the Zobrist hash of the
+    board of the world, see `World.hash`, and marks the country as changed,
+    see `World.pop_changes`. Setting the owner updates the continent
+    counters of the world.
+
+    Parameters
+    ----------
+    name : str
+        A string containing the name of the country.
+    id : int, default 0
+        The unique identifier of the country, its index in the arrays of the
+        world.
+    world : World, optional
+        The world the country belongs to. A country created without a world
+        keeps its owner and troops in arrays of its own.
+
     Attributes
     ----------
     name : str
         A string containing the name of the country.
+    id : int
+        The unique identifier of the country, its index in the arrays of the
+        world.
     neighbours : list
         A list of Country objects with all the country's neighbours.
+    neighbour_ids : frozenset
+        The ids of all the country's neighbours.
     owner : Player
         The Player object of the country's owner.
     n_troops : int
         The number of troops on the country.
     """
 
-    def __init__(self, name: str):
+    __slots__ = ('name', 'id', 'neighbours', 'neighbour_ids', '_index', '_owners', '_troops', '_players', '_hash', '_keys', '_continents', '_changed')
+
+    def __init__(self, name: str, id: int = 0, world = None):
         self.name = name
+        self.id = id
         self.neighbours = []
-        self.owner = None
-        self.n_troops = 0
+        self.neighbour_ids = frozenset()
+
+        if world is None:
+            self._index = 0
+            self._owners = array('b', [0])
+            self._troops = array('i', [0])
+            self._players = {0: None}
+            self._hash = [_STANDALONE_KEYS.get_key(0, 0, 0)]
+            self._keys = _STANDALONE_KEYS
+            self._continents = None
+            self._changed = set()
+        else:
+            self._index = id
+            self._owners = world.owners
+            self._troops = world.troops
+            self._players = world.players
+            self._hash = world.board_hash
+            self._keys = world.zobrist
+            self._continents = world.continent_counters
+            self._changed = world.changed_countries
+
+    @property
+    def owner(self):
+        return self._players[self._owners[self._index]]
+
+    @owner.setter
+    def owner(self, player):
+        if player is None:
+            owner = 0
+        else:
+            owner = player.id
+            self._players[owner] = player
+
+        index = self._index
+        n_troops = self._troops[index]
+        old_owner = self._owners[index]
+        keys = self._keys
+        if n_troops < N_CACHED_TROOPS:
+            # The keys of the cache, without the calls of `get_key`
+            i = index * 3 * N_CACHED_TROOPS + n_troops
+            self._hash[0] ^= keys.keys[i + old_owner * N_CACHED_TROOPS] ^ keys.keys[i + owner * N_CACHED_TROOPS]
+        else:
+            self._hash[0] ^= keys.get_key(index, old_owner, n_troops) ^ keys.get_key(index, owner, n_troops)
+        self._owners[index] = owner
+        self._changed.add(index)
+
+        if self._continents is not None:
+            self._continents.move(index, old_owner, owner)
+
+    @property
+    def n_troops(self) -> int:
+        return self._troops[self._index]
+
+    @n_troops.setter
+    def n_troops(self, n_troops: int):
+        index = self._index
+        old_n_troops = self._troops[index]
+        keys = self._keys
+        if old_n_troops < N_CACHED_TROOPS and n_troops < N_CACHED_TROOPS:
+            i = (index * 3 + self._owners[index]) * N_CACHED_TROOPS
+            self._hash[0] ^= keys.keys[i + old_n_troops] ^ keys.keys[i + n_troops]
+        else:
+            owner = self._owners[index]
+            self._hash[0] ^= keys.get_key(index, owner, old_n_troops) ^ keys.get_key(index, owner, n_troops)
+        self._troops[index] = n_troops
+        self._changed.add(index)
+
+    def is_neighbour(self, country: 'Country') -> bool:
+        """Check if a country borders this one.
+
+        Parameters
+        ----------
+        country : Country
+
+        Returns
+        -------
+        bool
+        """
+
+        return country.id in self.neighbour_ids
 
     # Legacy
     def add_neighbours(self, countries : list):
         """Add countries to the neighbours list
-        
+
         Parameters
         ----------
         countries : list
             A list with Country objects to be added to the neighbours list
         """
 
-        self.neighbours += countries
\ No newline at end of file
+        self.neighbours += countries
+        self.neighbour_ids = self.neighbour_ids.union(country.id for country in countries)
@@ -0,0 +1,303 @@
+from game import Game
+from world import World
+from game_record import encode_command
+from binary_protocol import STATES
+from tournament import AGENTS
+
+import os
+import time
+import random
+import argparse
+import contextlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Decision points in each shard
+SHARD_SIZE = 1 << 16
+
+class _ExportGame(Game):
+    """A game that keeps the features of every decision point of the\\
+    current game, see `export_games`."""
+
+    def __init__(self, *args, **kwargs):
+        self.rows = []
+        super().__init__(*args, **kwargs)
+
+    def _execute_command(self, player, enemy, command: str) -> bool:
+        # Called for every command, alone or in a batch, before the board
+        # changes
+        owners = np.frombuffer(self.world.owners, dtype=np.int8)
+        row = [
+            player.id,
+            np.stack((owners == player.id, owners == enemy.id), axis=1),
+            np.array(self.world.troops, dtype=np.int32),
+            STATES.index(player.state),
+            player.n_new_troops,
+            self.turn,
+            encode_command(player.control.call_data['command'], self.world.topology.ids)[0]
+        ]
+
+        valid = super()._execute_command(player, enemy, command)
+        row.append(valid)
+        self.rows.append(row)
+
+        return valid
+
+class ShardWriter:
+    """Writes decision points in shards of a fixed number of rows, so the\\
+    memory used does not grow with the number of games.
+
+    Each shard is a `.npz` with an array for each field, the first axis
+    being the decision point:
+    - owners: uint8 (n_countries, 2), the one-hot of the owner of each
+    country by id, the player deciding first and its enemy second.
+    - troops: int32 (n_countries,).
+    - state: uint8, the index of the state of the player in `STATES`.
+    - n_new_troops, turn: int32.
+    - player: uint8, the id of the player deciding.
+    - action: int32 (4,), the code and the 3 args of the command chosen,
+    as in the first record of `game_record`, with country ids.
+    - valid: bool, if the action was valid.
+    - outcome: int8, 1 if the player deciding won the game, -1 if it lost
+    and 0 if no one won.
+
+    Parameters
+    ----------
+    out_dir : Path
+    prefix : str
+        The start of the name of the shards, unique to each writer.
+    n_countries : int
+    shard_size : int, default SHARD_SIZE
+    """
+
+    def __init__(self, out_dir: Path, prefix: str, n_countries: int, shard_size: int = SHARD_SIZE):
+        self.out_dir = Path(out_dir)
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.n_shards = 0
+        self.n_rows = 0
+        self.size = 0
+        self.arrays = {
+            'owners': np.zeros((shard_size, n_countries, 2), dtype=np.uint8),
+            'troops': np.zeros((shard_size, n_countries), dtype=np.int32),
+            'state': np.zeros(shard_size, dtype=np.uint8),
+            'n_new_troops': np.zeros(shard_size, dtype=np.int32),
+            'turn': np.zeros(shard_size, dtype=np.int32),
+            'player': np.zeros(shard_size, dtype=np.uint8),
+            'action': np.zeros((shard_size, 4), dtype=np.int32),
+            'valid': np.zeros(shard_size, dtype=bool),
+            'outcome': np.zeros(shard_size, dtype=np.int8)
+        }
+
+    def add_game(self, rows: list, winner: int):
+        """Add the decision points of a finished game.
+
+        Parameters
+        ----------
+        rows : list
+            See `_ExportGame`.
+        winner : int or None
+            The id of the winner, None if no one won.
+        """
+
+        arrays = self.arrays
+
+        for player_id, owners, troops, state, n_new_troops, turn, action, valid in rows:
+            i = self.size
+            arrays['owners'][i] = owners
+            arrays['troops'][i] = troops
+            arrays['state'][i] = state
+            arrays['n_new_troops'][i] = n_new_troops
+            arrays['turn'][i] = turn
+            arrays['player'][i] = player_id
+            arrays['action'][i] = action
+            arrays['valid'][i] = valid
+            arrays['outcome'][i] = 0 if winner is None else (1 if winner == player_id else -1)
+            self.size += 1
+
+            if self.size == self.shard_size:
+                self.flush()
+
+    def flush(self):
+        """Write the rows not written yet in a new shard."""
+
+        if self.size == 0:
+            return
+
+        path = self.out_dir / f'{self.prefix}-{self.n_shards:05d}.npz'
+        tmp_path = path.with_suffix('.tmp')
+
+        # Written aside and renamed, so readers never load half of a shard
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **{name: values[:self.size] for name, values in self.arrays.items()})
+        os.replace(tmp_path, path)
+
+        self.n_shards += 1
+        self.n_rows += self.size
+        self.size = 0
+
+def export_games(task: tuple) -> tuple:
+    """Play headless games in the current process and write their decision\\
+    points in shards, see `ShardWriter`.
+
+    Parameters
+    ----------
+    task : tuple
+        `(worker, agent_1_class, agent_2_class, seeds, max_turns,
+        world_definition, out_dir, shard_size)`, worker being the number of
+        the process, used to name its shards.
+
+    Returns
+    -------
+    tuple
+        `(n_rows, n_shards)`.
+    """
+
+    worker, agent_1_class, agent_2_class, seeds, max_turns, world_definition, out_dir, shard_size = task
+
+    writer = None
+
+    for seed in seeds:
+        random.seed(seed)
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            agents = [agent_1_class(1, headless=True), agent_2_class(2, headless=True)]
+            game = _ExportGame(agents=agents, seed=seed, world_definition=world_definition)
+            game.run(max_turns)
+
+        if writer is None:
+            writer = ShardWriter(out_dir, f'worker-{worker:03d}', len(game.world.country_list), shard_size)
+
+        writer.add_game(game.rows, game.winner.id if game.winner is not None else None)
+
+    if writer is None:
+        return 0, 0
+
+    writer.flush()
+
+    return writer.n_rows, writer.n_shards
+
+def write_meta(out_dir: Path, world_definition: str):
+    """Write what is the same for every decision point in `meta.npz`: the\\
+    continent mask of each country id, uint8 (n_continents, n_countries),
+    and the adjacency of the world in compressed sparse rows, see
+    `Topology`.
+
+    Parameters
+    ----------
+    out_dir : Path
+    world_definition : str
+    """
+
+    topology = World(world_definition).topology
+    continent_masks = np.zeros((len(topology.continent_names), topology.n_countries), dtype=np.uint8)
+    continent_masks[np.frombuffer(topology.country_continent, dtype=np.int32), np.arange(topology.n_countries)] = 1
+
+    np.savez(
+        Path(out_dir) / 'meta.npz',
+        continent_masks=continent_masks,
+        adjacency_offsets=np.array(topology.adjacency_offsets, dtype=np.int32),
+        adjacency=np.array(topology.adjacency, dtype=np.int32),
+        digest=np.array(topology.digest)
+        )
+
+def export_dataset(
+        agent_names: tuple,
+        n_games: int,
+        out_dir: Path,
+        seed: int = 0,
+        max_turns: int = 150,
+        world_definition: str = 'worlds/classic.json',
+        shard_size: int = SHARD_SIZE,
+        workers: int = None
+    ) -> dict:
+    """Play games between two agents across a process pool and export their\\
+    decision points, see `ShardWriter` and `write_meta`.
+
+    Every process plays its share of the games and writes its own shards,
+    keeping at most one shard and one game in memory.
+
+    Parameters
+    ----------
+    agent_names : tuple
+        The names of the agents of player 1 and player 2 in `AGENTS`.
+    n_games : int
+    out_dir : Path
+        Created if it does not exist.
+    seed : int, default 0
+        The seed of the first game, the next games use the following ints.
+    max_turns : int, default 150
+    world_definition : str, default 'worlds/classic.json'
+    shard_size : int, default SHARD_SIZE
+    workers : int, optional
+        Number of processes, defaults to the number of cores.
+
+    Returns
+    -------
+    dict
+        The number of `rows` and `shards` written and the `duration` in
+        seconds.
+    """
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    write_meta(out_dir, world_definition)
+
+    workers = min(workers or os.cpu_count(), max(1, n_games))
+    agent_1_class, agent_2_class = (AGENTS[name] for name in agent_names)
+    tasks = [
+        (worker, agent_1_class, agent_2_class, range(seed + worker, seed + n_games, workers),
+         max_turns, world_definition, out_dir, shard_size)
+        for worker
+        in range(workers)
+        ]
+
+    time_start = time.perf_counter()
+
+    with ProcessPoolExecutor(workers) as executor:
+        results = list(executor.map(export_games, tasks))
+
+    return {
+        'rows': sum(n_rows for n_rows, _ in results),
+        'shards': sum(n_shards for _, n_shards in results),
+        'duration': time.perf_counter() - time_start
+    }
+
+def iter_shards(out_dir: Path):
+    """Load the shards of a dataset one at a time.
+
+    Parameters
+    ----------
+    out_dir : Path
+
+    Yields
+    ------
+    dict
+        The arrays of a shard by field, see `ShardWriter`.
+    """
+
+    for path in sorted(Path(out_dir).glob('*-[0-9][0-9][0-9][0-9][0-9].npz')):
+        with np.load(path) as shard:
+            yield {name: shard[name] for name in shard.files}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the decision points of self-play games to numpy shards")
+    parser.add_argument('out_dir', type=Path)
+    parser.add_argument('agents', nargs=2, choices=AGENTS.keys())
+    parser.add_argument('-n', '--games', type=int, default=100)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-t', '--max-turns', type=int, default=150)
+    parser.add_argument('-m', '--world', default='worlds/classic.json')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    results = export_dataset(args.agents, args.games, args.out_dir, args.seed, args.max_turns,
+                             args.world, args.shard_size, args.workers)
+
+    print(f'Decision points: {results["rows"]}')
+    print(f'Shards: {results["shards"]}')
+    print(f'Time: {results["duration"]}')
@@ -1,14 +1,40 @@
 from world import World
 from player import Player
 from country import Country
+from transport import TRANSPORTS, SHARED_MEMORY_ENV, FileTransport, SocketTransport, SharedMemoryTransport, new_shared_memory_name
+from game_state import GameState, COUNTRY_PAIR_COMMANDS
+from instrumentation import GameStats
+from binary_protocol import encode_player_data
+from seeding import get_rng
+from game_record import GameRecordWriter, GameRecordReader, Snapshot
+from state_view import StateView
 
+import os
 import sys
 import time
 import json
 import random
-import os
 from pathlib import Path
 
+PROTOCOLS = ('full', 'delta', 'binary')
+
+# Troops of each player at the start of a game on the classic world of 42
+# countries, scaled with the number of countries of other worlds
+N_INITIAL_TROOPS = 40
+N_CLASSIC_COUNTRIES = 42
+
+# Player data that changes during the game, the rest is sent only once in
+# the delta protocol
+DYNAMIC_KEYS = (
+    "n_new_troops",
+    "n_total_troops",
+    "enemy_n_total_troops",
+    "state",
+    "countries_owned",
+    "border_countries",
+    "components"
+)
+
 class Game:
     """Runs the game, providing an interface for the players to play the game\\
     within the rules.
@@ -17,6 +43,47 @@ class Game:
     ----------
     log : bool
         True to print logs with the actions taken on the game.
+    agents : list, optional
+        A list with the two in-process agents (instances of `AgentBase`
+        subclasses) that will play the game. When given, the game runs
+        headless: the agents are called directly with an in-memory state and
+        no call or log files are used.
+    transport : {'file', 'socket', 'shm'}, default 'file'
+        How the game talks to agents running in other processes. 'file'
+        polls the call files and writes the log files, 'socket' exchanges
+        length-prefixed messages through a Unix socket per player
+        (`Calls/player_N.sock`) and blocks while waiting for them. 'shm'
+        keeps the game state in shared memory, where the agents on the same
+        host copy its arrays after every update instead of decoding
+        messages, and ignores the protocol. Ignored when the game is
+        headless.
+    protocol : {'full', 'delta', 'binary'}, default 'full'
+        What the game sends to agents running in other processes. 'full'
+        sends the whole player data after every action. 'delta' sends the
+        whole player data until the agent acknowledges a `count` in its
+        calls, and from then on only what changed since the last count
+        acknowledged. 'binary' sends the whole player data until the agent
+        acknowledges a count, and from then on only the owners, troops and
+        components packed in bytes, see `binary_protocol`. `AgentBase`
+        reads all of them transparently. Ignored when the game is headless.
+    stats : GameStats, optional
+        Measures the phases of every action, the commands and the bytes
+        sent, see `GameStats`. Its summary is printed at the end of `run`.
+    world_definition : str, default 'worlds/classic.json'
+        A path to the json of the world to play on, any number of countries
+        and continents, see `map_generator` to create big ones.
+    seed : int, optional
+        The seed of the coin flip, the draft and the dices, each drawn from
+        its own stream, see `seeding`. Drawn from the global `random` if not
+        given. The same seed and the same actions always give the same game,
+        see `replay`.
+    record_path : str or Path, optional
+        Where to write the game in the binary record format, see
+        `game_record`. Needs a seed from 0 to 2^64 - 1.
+    shared_memory_name : str, optional
+        The name of the shared memory block of the 'shm' transport, the
+        agents attach to it by this name, see `transport.SHARED_MEMORY_ENV`.
+        A name unique to the game is created if not given.
     
     Attributes
     ----------
@@ -33,21 +100,53 @@ class Game:
         yet, it will return None.
     map_changed : bool
         True if the map was changed by the last action made by a player.
+    headless : bool
+        True if the game is played by in-process agents.
+    seed : int
+    actions : list
+        The actions performed or tried so far, as `(player_id, command)`
+        tuples where command is the `{'name': str, 'args': list}` of the
+        call data.
 
     Methods
     -------
     run(max_turns=150)
         Run the game.
+    get_state(rng=None)
+        Copy the game into a `GameState`.
+    get_record()
+        Get what is needed to replay the game.
+    replay(record)
+        Play again a recorded game, without agents.
+    replay_file(path)
+        Play again a game from its binary record, from any turn.
     """
 
-    def __init__(self, log=False):
-        self.world = World('worlds/classic.json')
-        self.player_1 = Player(1,40)
-        self.player_2 = Player(2,40)
+    def __init__(self, log=False, agents=None, transport='file', protocol='full', stats=None, world_definition='worlds/classic.json', seed=None, record_path=None, shared_memory_name=None):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport {transport}, choose one of {TRANSPORTS}")
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Unknown protocol {protocol}, choose one of {PROTOCOLS}")
+
+        self.world_definition = world_definition
+        self.world = World(world_definition)
+
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.actions = []
+        # Every random draw has its own stream, so changing one never
+        # shifts the others
+        coin_rng = get_rng(self.seed, 'coin')
+        self.draft_rng = get_rng(self.seed, 'draft')
+        self.combat_rng = get_rng(self.seed, 'combat')
+
+        n_countries = len(self.world.country_list)
+        n_initial_troops = max(N_INITIAL_TROOPS, N_INITIAL_TROOPS * n_countries // N_CLASSIC_COUNTRIES)
+        self.player_1 = Player(1,n_initial_troops,self.combat_rng)
+        self.player_2 = Player(2,n_initial_troops,self.combat_rng)
 
         self.turn = 0
 
-        coin = random.randint(1,2)
+        coin = coin_rng.randint(1,2)
         self.player_1.state = "mobilizing" if coin == 1 else "waiting"
         self.player_2.state = "mobilizing" if coin == 2 else "waiting"
         self.active_player = self.player_1 if coin == 1 else self.player_2
@@ -61,18 +160,309 @@ class Game:
         self.player_1.control.data_path = Path("Logs/player_1.json")
         self.player_2.control.data_path = Path("Logs/player_2.json")
 
+        self.player_1.control.sent_data = {}
+        self.player_2.control.sent_data = {}
+
+        # The countries and continents data of the json messages, kept
+        # between messages, see `_update_board_data`
+        self.countries_data = None
+        self.continents_data = None
+
         self.winner = None
         self.map_changed = True
         self.log = log
+        self.transport = transport
+        self.protocol = protocol
+        self.shared_memory_name = shared_memory_name if shared_memory_name is not None else new_shared_memory_name()
+        self.stats = stats
+
+        self.headless = agents is not None
+        if self.headless:
+            for agent in agents:
+                self._register_agent(agent)
+
+        self.recorder = None
+        if record_path is not None:
+            self.recorder = GameRecordWriter(record_path, self.seed, self.world.topology.digest, n_countries)
 
         self._setup()
 
     def _setup(self):
-        self._create_command_files()
+        if not self.headless:
+            if self.transport == 'file':
+                self._create_command_files()
+            self._open_transports()
         self._random_draft()
         self._distribute_new_troops(self.active_player)
-        self._update_continents_owners()
-        self._update_players_data()
+        if not self.headless:
+            self._update_players_data()
+        if self.recorder is not None:
+            self.recorder.write_snapshot(self._create_snapshot())
+
+    def _register_agent(self, agent):
+        """Attach an in-process agent to the player with the same id.
+
+        Parameters
+        ----------
+        agent : AgentBase
+            The agent that will take the decisions of the player.
+        """
+
+        player = self.player_1 if agent.id == 1 else self.player_2
+
+        if player.control.agent is not None:
+            raise ValueError(f"Player {agent.id} already has an agent")
+
+        player.control.agent = agent
+
+    def _open_transports(self):
+        """Open the channel between each player and its agent."""
+
+        players = (self.player_1, self.player_2)
+
+        if self.transport == 'file':
+            for player in players:
+                player.control.transport = FileTransport(
+                    player.control.data_path,
+                    player.control.call_path
+                    )
+
+        elif self.transport == 'socket':
+            # Bind both sockets before waiting, so the agents can start in
+            # any order
+            servers = [SocketTransport.serve(player.control.call_path.with_suffix('.sock'))
+                       for player
+                       in players]
+
+            for player, server in zip(players, servers):
+                player.control.transport = SocketTransport.accept(server)
+
+        elif self.transport == 'shm':
+            transports = SharedMemoryTransport.create(self.world, self.shared_memory_name)
+
+            if self.log:
+                print("Shared memory:", self.shared_memory_name, "(start the agents with", SHARED_MEMORY_ENV + "=" + self.shared_memory_name + ")")
+
+            for player, transport in zip(players, transports):
+                player.control.transport = transport
+
+    def _close_transports(self):
+        """Close the channel between each player and its agent."""
+
+        for player in (self.player_1, self.player_2):
+            if player.control.transport is not None:
+                player.control.transport.close()
+
+    def get_state(self, rng: random.Random = None) -> GameState:
+        """Copy the game into a `GameState`, that can be played ahead and\\
+        undone without touching the game.
+
+        Parameters
+        ----------
+        rng : random.Random, optional
+            The generator of the dices of the state, a new one is created if
+            not given.
+
+        Returns
+        -------
+        GameState
+        """
+
+        owners, troops = self.world.get_state()
+        players = (None, self.player_1, self.player_2)
+
+        last_attack = None
+        call_data = self.active_player.control.call_data
+        if call_data is not None and call_data["command"]["name"] in COUNTRY_PAIR_COMMANDS:
+            args = call_data["command"]["args"]
+            last_attack = (self.world.country_dict[args[1]].id, self.world.country_dict[args[2]].id)
+
+        return GameState(
+            self.world,
+            owners,
+            troops,
+            [0] + [player.n_new_troops for player in players[1:]],
+            [0] + [player.n_total_troops for player in players[1:]],
+            [None] + [player.state for player in players[1:]],
+            self.active_player.id,
+            self.turn,
+            self.winner.id if self.winner is not None else None,
+            last_attack,
+            rng,
+            self.world.hash
+            )
+
+    def get_record(self) -> dict:
+        """Get what is needed to replay the game, see `replay`.
+
+        Returns
+        -------
+        dict
+            A json serializable dict with the `seed`, the
+            `world_definition` and the `actions` as
+            `[player_id, command]` lists.
+        """
+
+        return {
+            'seed': self.seed,
+            'world_definition': self.world_definition,
+            'actions': [[player_id, command] for player_id, command in self.actions]
+        }
+
+    @classmethod
+    def replay(cls, record: dict, log: bool = False) -> 'Game':
+        """Play again a recorded game, without agents.
+
+        The actions are performed one after the other on a game with the
+        same seed, so the draft and every dice are the same as in the
+        recorded game.
+
+        Parameters
+        ----------
+        record : dict
+            See `get_record`.
+        log : bool, default False
+
+        Returns
+        -------
+        Game
+            The game after the last action recorded.
+
+        Raises
+        ------
+        ValueError
+            If an action was called by a player that is not the active one
+            in the replay, meaning the record is not of this engine.
+        """
+
+        game = cls(log=log, agents=[], seed=record['seed'], world_definition=record['world_definition'])
+        game._replay_actions(record['actions'])
+
+        return game
+
+    @classmethod
+    def replay_file(
+            cls,
+            path,
+            world_definition: str = 'worlds/classic.json',
+            turn: int = None,
+            log: bool = False
+        ) -> 'Game':
+        """Play again a game from its binary record, see `game_record`.
+
+        The game starts from the last snapshot at or before `turn`, so only
+        the actions of a few turns are performed whatever the turn.
+
+        Parameters
+        ----------
+        path : str or Path
+        world_definition : str, default 'worlds/classic.json'
+            The world the game was played on.
+        turn : int, optional
+            Stop at the start of this turn, play all the actions recorded if
+            not given.
+        log : bool, default False
+
+        Returns
+        -------
+        Game
+
+        Raises
+        ------
+        ValueError
+            If the record is of another world, or an action was called by a
+            player that is not the active one in the replay.
+        """
+
+        with GameRecordReader(path) as reader:
+            game = cls(log=log, agents=[], seed=reader.seed, world_definition=world_definition)
+
+            if reader.world_digest != game.world.topology.digest:
+                raise ValueError(f"{path} was not recorded on {world_definition}")
+
+            snapshot = reader.seek(turn) if turn is not None else None
+            if snapshot is not None:
+                game._restore_snapshot(snapshot)
+
+            game._replay_actions(reader.actions(snapshot, game.world.topology.names), turn)
+
+        return game
+
+    def _replay_actions(self, actions, turn: int = None):
+        """Perform recorded actions until the last one, the winner or the\\
+        start of a turn.
+
+        Parameters
+        ----------
+        actions : iterable
+            `(player_id, command)` pairs.
+        turn : int, optional
+        """
+
+        self.time_start = time.perf_counter()
+
+        for i, (player_id, command) in enumerate(actions):
+            if turn is not None and self.turn >= turn:
+                break
+
+            player = self.active_player
+
+            if player.id != player_id:
+                raise ValueError(f"The action {i} was called by player {player_id} while player {player.id} is active")
+
+            player.control.call_count += 1
+            player.control.last_call_data = player.control.call_data
+            player.control.call_data = {'id': player_id, 'count': player.control.call_count, 'command': command}
+
+            self._execute_active_player_action()
+
+            if self._check_for_winner():
+                break
+
+    def _create_snapshot(self) -> Snapshot:
+        """Copy the game at the start of a turn, see `Snapshot`."""
+
+        owners, troops = self.world.get_state()
+        players = (None, self.player_1, self.player_2)
+
+        return Snapshot(
+            self.turn,
+            len(self.actions),
+            self.active_player.id,
+            [0] + [player.n_new_troops for player in players[1:]],
+            [0] + [player.n_total_troops for player in players[1:]],
+            owners,
+            troops,
+            self.combat_rng.getstate()
+            )
+
+    def _restore_snapshot(self, snapshot: Snapshot):
+        """Put the game back in the state of a snapshot.
+
+        Parameters
+        ----------
+        snapshot : Snapshot
+        """
+
+        players = (None, self.player_1, self.player_2)
+
+        for country in self.world.country_list:
+            owner = players[snapshot.owners[country.id]]
+            if country.owner is not owner:
+                country.owner.lose_country(country)
+                owner.gain_country(country)
+            country.n_troops = snapshot.troops[country.id]
+
+        for player in players[1:]:
+            player.n_new_troops = snapshot.n_new_troops[player.id]
+            player.n_total_troops = snapshot.n_total_troops[player.id]
+            player.state = "mobilizing" if player.id == snapshot.active else "waiting"
+            player.control.map_outdated = True
+
+        self.turn = snapshot.turn
+        self.active_player = players[snapshot.active]
+        self.combat_rng.setstate(snapshot.rng_state)
+        self.map_changed = True
 
     def _distribute_new_troops(self, player : Player):
         """Distribute new troops to a player based on the number of countries\\
@@ -88,12 +478,7 @@ class Game:
         n_new_troops = int(n_countries_owned // 3)
         n_new_troops = max(n_new_troops, 3)
 
-        bonus_troops = 0
-
-        for continent in self.world.continents:
-            if continent.owner == player:
-                bonus_troops += continent.extra_armies
-        
+        bonus_troops = self.world.continent_counters.bonuses[player.id]
         #print("Total bonus = ", bonus_troops)
 
         n_new_troops += bonus_troops
@@ -129,7 +514,6 @@ class Game:
         
         return json_data
 
-    # TODO Make a _update_countries_data where it updates only the changeable data
     def _create_countries_data(self) -> dict:
         """Create a dict with info about all countries
 
@@ -140,18 +524,20 @@ class Game:
 
         countries_data = {} 
 
+        owners = self.world.owners
+        troops = self.world.troops
+
         for country in self.world.country_list:
             countries_data[country.name] = {
                 "neighbours": [neighbour.name
                                for neighbour 
                                in country.neighbours],
-                "owner": country.owner.id,
-                "n_troops": country.n_troops
+                "owner": owners[country.id],
+                "n_troops": troops[country.id]
             }
 
         return countries_data
 
-    # TODO Make a _update_continents_data where it updates only the changeable data
     def _create_continents_data(self) -> dict:
         """Create a dict with info about all continents
 
@@ -176,72 +562,59 @@ class Game:
 
         return continents_data
 
-    def _is_connected(
-            self,
-            country_1: Country,
-            country_2: Country,
-            countries_visited: list=None
-        ) -> bool:
-        """Check if two countries are connected by allied countries.
+    def _update_board_data(self) -> tuple:
+        """Update the countries and continents data with the countries and\\
+        continents changed since the last update, creating them the first\\
+        time.
 
-        Parameters
-        ----------
-        country_1 : Country
-        country_2 : Country
-        countries_visited : list, default [country_1]
+        Only the owner and troops of the countries and the owner of the
+        continents change during a game, the changes are taken from the
+        world, see `World.pop_changes`.
 
         Returns
         -------
-        bool
-            `True` if the countries have a connection
-
-            `False` if the countries don't have a connection
+        tuple
+            `(country_ids, continent_ids)`, the sets of the ids of the
+            countries and continents updated.
         """
 
-        if countries_visited is None:
-            countries_visited = [country_1]
-        for neighbour in country_1.neighbours:
-            if neighbour in countries_visited:
-                continue
-            elif neighbour.owner == country_1.owner:
-                if neighbour == country_2:
-                    return True
-                else:
-                    countries_visited.append(neighbour)
-                    if self._is_connected(neighbour, country_2, countries_visited):
-                        return True
-        return False
+        country_ids, continent_ids = self.world.pop_changes()
+
+        if self.countries_data is None:
+            self.countries_data = self._create_countries_data()
+            self.continents_data = self._create_continents_data()
+            return (country_ids, continent_ids)
+
+        owners = self.world.owners
+        troops = self.world.troops
+        country_list = self.world.country_list
+
+        for country_id in country_ids:
+            country_data = self.countries_data[country_list[country_id].name]
+            country_data["owner"] = owners[country_id]
+            country_data["n_troops"] = troops[country_id]
+
+        for continent_id in continent_ids:
+            continent = self.world.continents[continent_id]
+            continent_owner = continent.owner
+            self.continents_data[continent.name]["owner"] = continent_owner.id if continent_owner is not None else None
+
+        return (country_ids, continent_ids)
 
-    def _create_connection_matrix(self, player : Player):
-        """Create a matrix that tells if there is a land connection between\\
-        allied countries.
+    def _create_components(self, player : Player):
+        """Create a dict that tells which group of allied countries connected\\
+        by land each owned country belongs to.
 
-        E.g.: `connection_matrix['country A']['country B'] = True`
+        E.g.: `{'country A': 0, 'country B': 0, 'country C': 3}`, countries
+        with the same id are connected.
 
         Parameters
         ----------
         player : Player
-            The `Player` object owner of the countries that are in the matrix.
+            The `Player` object owner of the countries.
         """
 
-        player.connection_matrix = {} 
-
-        for country in player.countries_owned:
-            player.connection_matrix[country.name] = {}
-        
-        for country_1 in player.countries_owned:
-            for country_2 in player.countries_owned:
-                if country_1 == country_2:
-                    continue
-                elif (country_1, country_2) in player.connection_matrix.items():
-                    continue
-                else:
-                    if self._is_connected(country_1, country_2):
-                        player.connection_matrix[country_1.name][country_2.name] = True
-                        player.connection_matrix[country_2.name][country_1.name] = True
-                    else:
-                        player.connection_matrix[country_1.name][country_2.name] = False
-                        player.connection_matrix[country_2.name][country_1.name] = False
+        player.components = dict(player.component_index.labels)
 
     def _create_border_countries(self, player : Player):
         """Create a dict containing countries as keys and enemy neighbours as\\
@@ -249,46 +622,28 @@ class Game:
 
         E.g.: `{'country A': ['enemy neighbour B', 'enemy neighbour C', ...]}`
 
+        The dict is a copy of the one of the player's `BorderIndex`, so the
+        data already sent is not changed by later conquests. The frontier
+        edges of the index are copied in `frontier_edges` at the same time.
+
         Parameters
         ----------
         player : Player
             The `Player` object owner of the countries used as keys.
         """
 
-        player.border_countries = {}
-
-        for country in player.countries_owned:
-                for neighbour in country.neighbours:
-                    if neighbour.owner != player:
-                        if country.name not in player.border_countries:
-                            player.border_countries[country.name] = []
-                            player.border_countries[country.name].append(neighbour.name)
-                        else:
-                            player.border_countries[country.name].append(neighbour.name)
-
-    # TODO use the update_continent_owner method of the Continent class
-    def _update_continents_owners(self):
-        """Iterate over all the countries of each continent checking its\\
-        owners and updating each continent's owner according to that.
-        """
+        player.border_countries = {country_name: list(enemies)
+                                   for country_name, enemies
+                                   in player.border_index.border_countries.items()}
+        player.frontier_edges = frozenset(player.border_index.edges)
 
-        for continent in self.world.continents:
-            continent_owner = None
-            for country in continent.countries:
-                if continent_owner == None:
-                    continent_owner = country.owner
-                elif country.owner != continent_owner:
-                    continent_owner = None
-                    break
-            continent.owner = continent_owner
-            
-    def _create_player_data(
+    def _create_player_dict(
             self,
             continents_data: dict,
             countries_data: dict,
             player: Player
-        ) -> str:
-        """Create the json data structure to be written inside a log file.
+        ) -> dict:
+        """Create the data structure with everything a player can see.
 
         Parameters
         ----------
@@ -301,8 +656,8 @@ class Game:
             
         Returns
         -------
-        json_data : str
-            A `string` with the data to be written in a json file.
+        data : dict
+            A `dict` with the player's view of the game.
         """
 
         countries_owned_names = [country.name
@@ -311,9 +666,10 @@ class Game:
 
         player.data_count += 1
 
-        if self.map_changed:
+        if player.control.map_outdated:
             self._create_border_countries(player)
-            self._create_connection_matrix(player)
+            self._create_components(player)
+            player.control.map_outdated = False
 
         if player.id == 1:
             enemy = self.player_2
@@ -330,14 +686,194 @@ class Game:
             "countries_owned": countries_owned_names,
             "countries_data": countries_data,
             "border_countries": player.border_countries,
-            "connection_matrix": player.connection_matrix,
+            "components": player.components,
             "continents_data": continents_data
         }
 
+        return data
+
+    def _create_player_data(
+            self,
+            continents_data: dict,
+            countries_data: dict,
+            player: Player
+        ) -> str:
+        """Create the json data structure to be written inside a log file.
+
+        Parameters
+        ----------
+        continents_data : dict
+            A `dict` with all the continents as keys and their info as values.
+        countries_data : dict
+            A `dict` with all the countries as keys and their info as values.
+        player : Player
+            The `Player` object owner of the data
+            
+        Returns
+        -------
+        json_data : str
+            A `string` with the data to be written in a json file.
+        """
+
+        data = self._create_player_dict(continents_data, countries_data, player)
+
         json_data = json.dumps(data, indent = 4)
 
         return json_data
 
+    def _create_player_delta_data(
+            self,
+            continents_data: dict,
+            countries_data: dict,
+            player: Player,
+            board_changes: tuple
+        ) -> str:
+        """Create the json data structure of the delta protocol to be written\\
+        inside a log file.
+
+        Until the player acknowledges a count it is the same as
+        `_create_player_data`. After that it only has what changed since the
+        acknowledged count:
+        ```
+        {
+            'count': int,
+            'id': int,
+            'base': int (the count acknowledged),
+            'countries_data': {
+                'Country A': {'owner': int, 'n_troops': int},
+                ...
+            },
+            'continents_data': {
+                'Continent A': {'owner': int or None},
+                ...
+            },
+            'state': str,
+            ...
+        }
+        ```
+        Where `countries_data` and `continents_data` only have the countries
+        and continents that changed and the other keys are only present if
+        their value changed.
+
+        Parameters
+        ----------
+        continents_data : dict
+            A `dict` with all the continents as keys and their info as values.
+        countries_data : dict
+            A `dict` with all the countries as keys and their info as values.
+        player : Player
+            The `Player` object owner of the data
+        board_changes : tuple
+            The countries and continents changed since the last data sent,
+            see `_update_board_data`.
+
+        Returns
+        -------
+        json_data : str
+            A `string` with the data to be written in a json file.
+        """
+
+        control = player.control
+
+        data = self._create_player_dict(continents_data, countries_data, player)
+
+        # The agent will never ask for a base older than the one acknowledged
+        for count in [count for count in control.sent_data if count < (control.acked_count or 0)]:
+            del control.sent_data[count]
+
+        # The countries and continents data change in place, only the keys
+        # compared by value and the changes of the board are kept
+        control.sent_data[data["count"]] = ({key: data[key] for key in DYNAMIC_KEYS}, board_changes)
+
+        base = control.sent_data.get(control.acked_count)
+
+        if base is None:
+            return json.dumps(data, indent = 4)
+
+        base_data, _ = base
+        country_ids = set()
+        continent_ids = set()
+
+        for count, (_, (changed_countries, changed_continents)) in control.sent_data.items():
+            if count > control.acked_count:
+                country_ids |= changed_countries
+                continent_ids |= changed_continents
+
+        country_list = self.world.country_list
+        continents = self.world.continents
+
+        delta = {
+            "count": data["count"],
+            "id": data["id"],
+            "base": control.acked_count,
+            "countries_data": {},
+            "continents_data": {}
+        }
+
+        for country_id in sorted(country_ids):
+            country_name = country_list[country_id].name
+            delta["countries_data"][country_name] = {
+                "owner": countries_data[country_name]["owner"],
+                "n_troops": countries_data[country_name]["n_troops"]
+            }
+
+        for continent_id in sorted(continent_ids):
+            continent_name = continents[continent_id].name
+            delta["continents_data"][continent_name] = {
+                "owner": continents_data[continent_name]["owner"]
+            }
+
+        for key in DYNAMIC_KEYS:
+            if data[key] != base_data[key]:
+                delta[key] = data[key]
+
+        return json.dumps(delta)
+
+    def _create_player_binary_data(self, player: Player) -> bytes:
+        """Create the binary data of the binary protocol to be written inside\\
+        a log file.
+
+        Only the data that changes during the game is sent, see
+        `binary_protocol.encode_player_data`. The agent takes the names,
+        neighbours and continents from the json data it received before,
+        where countries and continents are in the order of their ids.
+
+        Parameters
+        ----------
+        player : Player
+            The `Player` object owner of the data
+
+        Returns
+        -------
+        bytes
+        """
+
+        player.data_count += 1
+
+        enemy = self.player_2 if player.id == 1 else self.player_1
+
+        continent_owners = [continent.owner.id if continent.owner is not None else 0
+                            for continent
+                            in self.world.continents]
+
+        components = [sum(1 << country.id for country in members)
+                      for members
+                      in player.component_index.members.values()
+                      if members]
+
+        return encode_player_data(
+            player.data_count,
+            player.id,
+            player.state,
+            player.n_new_troops,
+            player.n_total_troops,
+            enemy.n_total_troops,
+            self.world.owners,
+            self.world.troops,
+            continent_owners,
+            components
+            )
+
     def _create_command_files(self):
         """Create p1 and p2 command files used to declare their actions."""
 
@@ -346,86 +882,243 @@ class Game:
 
         with open(self.player_1.control.call_path, "w") as f: 
             f.write(p1_json_data)
-        self.last_m_time_p1 = os.path.getmtime(self.player_1.control.call_path)
         
         with open(self.player_2.control.call_path, "w") as f:
             f.write(p2_json_data)
-        self.last_m_time_p2 = os.path.getmtime(self.player_2.control.call_path)
 
     def _random_draft(self):
         """Randomly distribute countries and troops between players."""
 
-        random.shuffle(self.world.country_list)
+        rng = self.draft_rng
+        country_list = list(self.world.country_list)
+        rng.shuffle(country_list)
 
-        self.player_1.countries_owned = self.world.country_list[0:21]
-        self.player_2.countries_owned = self.world.country_list[21:42]
+        half = len(country_list) // 2
 
-        for country in self.player_1.countries_owned:
-            country.owner = self.player_1
+        for country in country_list[:half]:
+            self.player_1.gain_country(country)
             self.player_1.set_new_troops(1, country)
 
-        for country in self.player_2.countries_owned:
-            country.owner = self.player_2
+        for country in country_list[half:]:
+            self.player_2.gain_country(country)
             self.player_2.set_new_troops(1, country)
 
         # Distribute troops randomly among countries owned
         while self.player_1.n_new_troops > 0:
-            country = random.choice(self.player_1.countries_owned)
-            self.player_1.set_new_troops(random.randint(0, self.player_1.n_new_troops), country)
+            country = rng.choice(self.player_1.countries_owned)
+            self.player_1.set_new_troops(rng.randint(0, self.player_1.n_new_troops), country)
         
         while self.player_2.n_new_troops > 0:
-            country = random.choice(self.player_2.countries_owned)
-            self.player_2.set_new_troops(random.randint(0, self.player_2.n_new_troops), country)
+            country = rng.choice(self.player_2.countries_owned)
+            self.player_2.set_new_troops(rng.randint(0, self.player_2.n_new_troops), country)
 
     def _update_players_data(self):
         """Update players' data files with all the current game states."""
 
-        countries_data = self._create_countries_data()
-        continents_data = self._create_continents_data()
+        if self.transport == 'shm':
+            self._write_shared_state()
+            return
 
-        p1_json_data = self._create_player_data(continents_data, countries_data, self.player_1)
-        p2_json_data = self._create_player_data(continents_data, countries_data, self.player_2)
+        payloads = self._create_players_payloads()
 
-        with open(self.player_1.control.data_path, "w") as f:
-            f.write(p1_json_data)
-        with open(self.player_2.control.data_path, "w") as f:
-            f.write(p2_json_data)
+        self.player_1.control.transport.send(payloads[0])
+        self.player_2.control.transport.send(payloads[1])
+
+        if self.stats is not None:
+            self.stats.record_bytes(self.turn, len(payloads[0]) + len(payloads[1]))
+
+    def _write_shared_state(self):
+        """Write the current game state in the shared memory of the 'shm'\\
+        transport, copied by the agents after every update, see\\
+        `SharedBoard.read`."""
+
+        continent_owners = [continent.owner.id if continent.owner is not None else 0
+                            for continent
+                            in self.world.continents]
+
+        players = []
+
+        for player in (self.player_1, self.player_2):
+            player.data_count += 1
+            components = {country.id: component
+                          for country, component
+                          in player.component_index.component_of.items()}
+            players.append((player.data_count, player.state, player.n_new_troops, player.n_total_troops, components))
+
+        board = self.player_1.control.transport.board
+        board.write(self.world.owners, self.world.troops, continent_owners, players)
+
+    def _create_players_payloads(self) -> list:
+        """Create the messages with the current game state for both players,\\
+        in the protocol of the game.
+
+        Returns
+        -------
+        list
+            The bytes to be sent to player 1 and to player 2.
+        """
+
+        board_changes = None
+        payloads = []
+
+        for player in (self.player_1, self.player_2):
+            if self.protocol == 'binary' and player.control.acked_count is not None:
+                payloads.append(self._create_player_binary_data(player))
+                continue
+
+            # The changes not taken yet wait in the world for the next json
+            if board_changes is None:
+                board_changes = self._update_board_data()
+
+            if self.protocol == 'delta':
+                payload = self._create_player_delta_data(self.continents_data, self.countries_data, player, board_changes)
+            else:
+                payload = self._create_player_data(self.continents_data, self.countries_data, player)
+
+            payloads.append(payload.encode())
+
+        return payloads
 
     def _wait_for_active_player(self):
         """Wait for the player's declaration of action."""
 
         player = self.active_player
 
-        current_time = os.path.getmtime(player.control.call_path)
-
         last_count = player.control.call_count
 
         while last_count == player.control.call_count:
-            while player.control.last_m_time == current_time:
-                # TODO Maybe the deadlock is here
-                current_time = os.path.getmtime(player.control.call_path)
-
-            while True:
-                try:
-                    with open(player.control.call_path) as openfile:
-                        call_data = json.load(openfile)
-                        if call_data["count"] == player.control.call_count:
-                            #print("Atualizou sem precisar")
-                            pass
-                        else:
-                            player.control.last_call_data = player.control.call_data
-                            player.control.call_data = call_data
-                        player.control.call_count = call_data["count"]
-                        break
-                except:
-                    #print("Oh, deu erro aqui")
-                    pass
-
-            current_time = os.path.getmtime(player.control.call_path)
-
-            player.control.last_m_time = current_time
-
-    def _attack(self, player: Player, enemy: Player):
+            payload = player.control.transport.recv()
+
+            try:
+                call_data = json.loads(payload)
+            except ValueError:
+                # Caught a call file while it was being written, the end of
+                # the write will change it again
+                continue
+
+            if call_data["count"] != player.control.call_count:
+                player.control.last_call_data = player.control.call_data
+                player.control.call_data = call_data
+            player.control.call_count = call_data["count"]
+            player.control.acked_count = call_data.get("ack")
+
+    def _ask_active_agent(self):
+        """Give the current game state to the active in-process agent and\\
+        take its declaration of action."""
+
+        player = self.active_player
+        agent = player.control.agent
+
+        self._send_data_to_agent(player)
+
+        last_count = agent.call_data["count"]
+        agent.act()
+
+        if agent.call_data["count"] == last_count:
+            raise RuntimeError(f"Agent {agent.id} did not call any action while {player.state}")
+
+        player.control.last_call_data = player.control.call_data
+        player.control.call_data = agent.call_data
+        player.control.call_count = agent.call_data["count"]
+
+    def _create_state_view(self, player: Player) -> StateView:
+        """Create the view of the game of a player, holding the same as the\\
+        player data without building its dicts.
+
+        Parameters
+        ----------
+        player : Player
+            The `Player` object owner of the view.
+
+        Returns
+        -------
+        StateView
+        """
+
+        player.data_count += 1
+
+        if player.control.map_outdated:
+            self._create_border_countries(player)
+            self._create_components(player)
+            player.control.map_outdated = False
+
+        enemy = self.player_2 if player.id == 1 else self.player_1
+        owners, troops = self.world.get_state()
+        counters = self.world.continent_counters
+
+        return StateView(
+            self.world.topology,
+            player.data_count,
+            player.id,
+            player.state,
+            player.n_new_troops,
+            player.n_total_troops,
+            enemy.n_total_troops,
+            owners,
+            troops,
+            tuple(country.id for country in player.countries_owned),
+            player.border_countries,
+            player.components,
+            tuple(counters.get_owner(continent_id) for continent_id in range(len(self.world.continents))),
+            player.frontier_edges
+            )
+
+    def _send_data_to_agent(self, player: Player):
+        """Hand the player's view of the game to its in-process agent.
+
+        The agent gets a `StateView`, its player data dict is only built if
+        the agent reads it.
+
+        Parameters
+        ----------
+        player : Player
+            The `Player` object whose agent will receive the data.
+        """
+
+        view = self._create_state_view(player)
+
+        agent = player.control.agent
+        agent.player_data_count = view.count
+        agent._get_state_view(view)
+
+    def _notify_agents(self):
+        """Give the final game state to both in-process agents, letting them\\
+        know who won if someone did, and end their game."""
+
+        for player in (self.player_1, self.player_2):
+            self._send_data_to_agent(player)
+            agent = player.control.agent
+
+            if player.state == "winner":
+                agent.win()
+            elif player.state == "loser":
+                agent.lose()
+
+            agent.game_over()
+
+    def _get_owned_country(self, player: Player, country_name: str) -> Country:
+        """Find a country by its name if it is owned by a player.
+
+        Parameters
+        ----------
+        player : Player
+        country_name : str
+
+        Returns
+        -------
+        Country or None
+            None if there is no country with this name or if it is owned by
+            other player.
+        """
+
+        country = self.world.country_dict.get(country_name)
+
+        if country is None or self.world.owners[country.id] != player.id:
+            return None
+
+        return country
+
+    def _attack(self, player: Player, enemy: Player, blitz: bool = False) -> bool:
         """Performs an attack action from one player to other.
 
         Parameters
@@ -434,30 +1127,35 @@ class Game:
             The `player` performing the action.
         enemy : Player        
             The `player` suffering the action.
-        """
+        blitz : bool, default False
+            True to keep attacking until conquering the country or having a
+            single troop left on the attacking country.
 
-        attacker = None
-        attacked = None
+        Returns
+        -------
+        bool
+            True if the action was valid and performed.
+        """
 
-        for country_owned in player.countries_owned:
-            if country_owned.name == player.control.call_data["command"]["args"][1]:
-                attacker = country_owned
-                break
-        
-        for country_owned in enemy.countries_owned:
-            if country_owned.name == player.control.call_data["command"]["args"][2]:
-                attacked = country_owned
-                break        
+        attacker = self._get_owned_country(player, player.control.call_data["command"]["args"][1])
+        attacked = self._get_owned_country(enemy, player.control.call_data["command"]["args"][2])
         
         if(attacker == None):
             print("Player", player.id, "does not own any country named", player.control.call_data["command"]["args"][1])
+            return False
         elif(attacked == None):
             print("Player", enemy.id, "does not own any country named", player.control.call_data["command"]["args"][2])
+            return False
         else:
             attacker_n_troops_before_attack = attacker.n_troops
             attacked_n_troops_before_attack = attacked.n_troops
 
-            has_won = player.attack(player.control.call_data["command"]["args"][0], attacker, attacked)
+            n_dice = player.control.call_data["command"]["args"][0]
+
+            if blitz:
+                has_won, n_dice = self._blitz(player, n_dice, attacker, attacked)
+            else:
+                has_won = player.attack(n_dice, attacker, attacked)
 
             attacker_troops_after = attacker_n_troops_before_attack - attacker.n_troops
             attacked_troops_after = attacked_n_troops_before_attack - attacked.n_troops
@@ -466,22 +1164,48 @@ class Game:
             attacked.owner.n_total_troops -= attacked_troops_after
 
             if has_won:
-                enemy.countries_owned.remove(attacked)
-                player.countries_owned.append(attacked)
-                attacked.owner = attacker.owner
-                attacked.n_troops += player.control.call_data["command"]["args"][0]
-                attacker.n_troops -= player.control.call_data["command"]["args"][0]
+                enemy.lose_country(attacked)
+                player.gain_country(attacked)
+                attacked.n_troops += n_dice
+                attacker.n_troops -= n_dice
                 player.state = "conquering"
 
-                if len(player.countries_owned) == 42:
+                if len(player.countries_owned) == len(self.world.country_list):
                     self.winner = player
 
-                self._update_continents_owners()
-            
-            self.map_changed = has_won
+                self.map_changed = True
+
+            return has_won is not None
+
+    def _blitz(self, player: Player, max_dice: int, attacker: Country, attacked: Country) -> tuple:
+        """Roll attacks until conquering the attacked country or having a\\
+        single troop left on the attacker.
+
+        Parameters
+        ----------
+        player : Player
+            The `player` performing the action.
+        max_dice : int
+            The most dices used in each roll.
+        attacker : Country
+        attacked : Country
+
+        Returns
+        -------
+        tuple
+            `(has_won, n_dice)`, the result of the last `Player.attack` and
+            the dices used in it.
+        """
+
+        while True:
+            n_dice = min(max_dice, attacker.n_troops - 1)
+            has_won = player.attack(n_dice, attacker, attacked)
+
+            if has_won is not False or attacker.n_troops < 2:
+                return has_won, n_dice
 
     # TODO Maybe the enemy player is not needed
-    def _move_troops(self, player : Player, enemy : Player):
+    def _move_troops(self, player : Player, enemy : Player) -> bool:
         """Performs a move troops action from one player.
 
         Parameters
@@ -490,40 +1214,34 @@ class Game:
             The `player` performing the action.
         enemy : Player        
             The other `player`. 
+
+        Returns
+        -------
+        bool
+            True if the action was valid and performed.
         """
 
         from_country = None
         to_country = None
 
         if player.state == 'conquering':
-            if player.control.call_data['command']['args'][1] != player.control.last_call_data['command']['args'][1] or player.control.call_data['command']['args'][2] != player.control.last_call_data['command']['args'][2]:
-                print("Player", player.id, "can only move between", player.control.last_call_data['command']['args'][1], "and", player.control.last_call_data['command']['args'][2], "during a conquering")
-                return
-
-        if player.state == 'fortifying':
-            country_1 = player.control.call_data["command"]["args"][1]
-            country_2 = player.control.call_data["command"]["args"][2]
-            if not player.connection_matrix[country_1][country_2]:
-                print("Player", player.id, "is trying to mobilize troops between countries not connected (", country_1, "-", country_2, ")")
-                return
-            
-
-        for country_owned in player.countries_owned:
-            if country_owned.name == player.control.call_data["command"]["args"][1]:
-                from_country = country_owned
-                break
-        
-        for country_owned in player.countries_owned:
-            if country_owned.name == player.control.call_data["command"]["args"][2]:
-                to_country = country_owned
-                break
+            # The last call may not have countries, e.g. an invalid pass_turn
+            last_countries = player.control.last_call_data['command']['args'][1:3]
+            if player.control.call_data['command']['args'][1:3] != last_countries:
+                print("Player", player.id, "can only move between the countries of its last call", last_countries, "during a conquering")
+                return False
+
+        from_country = self._get_owned_country(player, player.control.call_data["command"]["args"][1])
+        to_country = self._get_owned_country(player, player.control.call_data["command"]["args"][2])
         
         if(from_country == None):
             print("Player", player.id, "does not own any country named", player.control.call_data["command"]["args"][1])
         elif(to_country == None):
             print("Player", enemy.id, "does not own any country named", player.control.call_data["command"]["args"][2])
+        elif player.state == 'fortifying' and not player.component_index.are_connected(from_country, to_country):
+            print("Player", player.id, "is trying to mobilize troops between countries not connected (", from_country.name, "-", to_country.name, ")")
         else:
-            player.move_troops(player.control.call_data["command"]["args"][0], from_country, to_country)
+            is_valid = player.move_troops(player.control.call_data["command"]["args"][0], from_country, to_country)
 
             if player.state == "conquering":
                 player.state = "attacking"
@@ -531,28 +1249,76 @@ class Game:
             elif player.state == "fortifying":
                 self._pass_turn(player, enemy)
 
-    def _set_new_troops(self, player : Player):
+            return is_valid
+
+        return False
+
+    def _set_new_troops(self, player : Player) -> bool:
         """Performs a set new troops action from one player.
 
         Parameters
         ----------
         player : Player
             The `player` performing the action.
-        """
 
-        country = None
+        Returns
+        -------
+        bool
+            True if the action was valid and performed.
+        """
 
-        for country_owned in player.countries_owned:
-            if country_owned.name == player.control.call_data["command"]["args"][1]:
-                country = country_owned
-                break
+        country = self._get_owned_country(player, player.control.call_data["command"]["args"][1])
         
         if(country == None):
             print("Player", player.id, "does not own any country named", player.control.call_data["command"]["args"][1])
-        else:
-            player.set_new_troops(player.control.call_data["command"]["args"][0], country)
+            return False
+
+        return player.set_new_troops(player.control.call_data["command"]["args"][0], country)
+
+    def _set_new_troops_bulk(self, player : Player) -> bool:
+        """Performs several set new troops actions from one player at once.
+
+        The args of the command are a list of `[n_troops, country_name]`
+        placements. Nothing is placed if any country is not owned by the
+        player or if the placements add up to more troops than it has.
+
+        Parameters
+        ----------
+        player : Player
+            The `player` performing the action.
 
-    def _pass_turn(self, player : Player, enemy : Player):
+        Returns
+        -------
+        bool
+            True if the action was valid and performed.
+        """
+
+        placements = []
+        n_troops_total = 0
+
+        for n_troops, country_name in player.control.call_data["command"]["args"]:
+            country = self._get_owned_country(player, country_name)
+
+            if country == None:
+                print("Player", player.id, "does not own any country named", country_name)
+                return False
+            if n_troops < 0:
+                print("Player", player.id, "is trying to set", n_troops, "troops in", country_name)
+                return False
+
+            placements.append((n_troops, country))
+            n_troops_total += n_troops
+
+        if n_troops_total > player.n_new_troops:
+            print("Player", player.id, "is trying to set", n_troops_total, "troops, but has only", player.n_new_troops)
+            return False
+
+        for n_troops, country in placements:
+            player.set_new_troops(n_troops, country)
+
+        return True
+
+    def _pass_turn(self, player : Player, enemy : Player) -> bool:
         """Performs the action of passing the turn to another player.
 
         Parameters
@@ -561,6 +1327,11 @@ class Game:
             The `player` performing the action.
         enemy : Player        
             The `player` that will play in the next turn.
+
+        Returns
+        -------
+        bool
+            True if the action was valid and performed.
         """
 
         if player.state == "mobilizing":
@@ -578,6 +1349,92 @@ class Game:
 
         elif player.state == "conquering":
             print("Player", player.id, "cannot pass_turn during a conquering state")
+            return False
+
+        else:
+            return False
+
+        return True
+
+    def _execute_command(self, player: Player, enemy: Player, command: str) -> bool:
+        """Perform a single action, with the args in the call_data of the\\
+        player.
+
+        Parameters
+        ----------
+        player : Player
+            The `player` performing the action.
+        enemy : Player
+            The other `player`.
+        command : str
+            The name of the command.
+
+        Returns
+        -------
+        bool
+            True if the action was valid and performed.
+        """
+
+        if command == "attack":
+            return self._attack(player, enemy)
+
+        elif command == "blitz":
+            return self._attack(player, enemy, blitz=True)
+        
+        elif command == "move_troops":
+            return self._move_troops(player, enemy) 
+
+        elif command == "set_new_troops":
+            return self._set_new_troops(player)
+
+        elif command == "set_new_troops_bulk":
+            return self._set_new_troops_bulk(player)
+        
+        elif command == "pass_turn":
+            return self._pass_turn(player, enemy)
+
+        print("Player", player.id, "is trying to use a command that does not exist (", command, ")")
+
+        return False
+
+    def _execute_batch(self, player: Player, enemy: Player):
+        """Perform the actions of a batch command in order, each one as if\\
+        it was called alone, and send the player data only once after them.
+
+        The args of the command are a list of commands as in the call data,
+        `[{'name': str, 'args': list}, ...]`. The batch stops at the first
+        invalid action, keeping the actions before it, and when the turn
+        passes to the enemy or the game has a winner. Afterwards, the
+        call_data of the player is the last action performed, so a
+        `move_troops` after a conquering attack ending a batch refers to it.
+
+        Parameters
+        ----------
+        player : Player
+            The `player` performing the actions.
+        enemy : Player
+            The other `player`.
+        """
+
+        control = player.control
+        call_data = control.call_data
+
+        for i, command in enumerate(call_data["command"]["args"]):
+            if self.active_player is not player or self.winner is not None:
+                print("Player", player.id, "ended the turn before the action", i, "of the batch")
+                break
+
+            if command["name"] == "batch":
+                print("Player", player.id, "cannot call a batch inside a batch")
+                break
+
+            if i > 0:
+                control.last_call_data = control.call_data
+            control.call_data = dict(call_data, command=command)
+
+            if not self._execute_command(player, enemy, command["name"]):
+                print("Player", player.id, "stopped the batch at the invalid action", i)
+                break
 
     def _execute_active_player_action(self):
         """Read the call_data of the active player and perform the action\\
@@ -593,21 +1450,29 @@ class Game:
 
         if self.log:
             print(call_data)
-                
-        if call_data["command"]["name"] == "attack":
-            self._attack(player, enemy)
-        
-        elif call_data["command"]["name"] == "move_troops":
-            self._move_troops(player, enemy) 
 
-        elif call_data["command"]["name"] == "set_new_troops":
-            self._set_new_troops(player)
-        
-        elif call_data["command"]["name"] == "pass_turn":
-            self._pass_turn(player, enemy)
+        self.actions.append((player.id, call_data["command"]))
+        if self.recorder is not None:
+            self.recorder.write_action(player.id, call_data["command"], self.world.topology.ids)
+        turn = self.turn
+
+        time_start = time.perf_counter()
 
+        if call_data["command"]["name"] == "batch":
+            self._execute_batch(player, enemy)
         else:
-            print("Player", player.id, "is trying to use a command that does not exist (", call_data["command"]["name"], ")")
+            self._execute_command(player, enemy, call_data["command"]["name"])
+
+        if self.stats is not None:
+            self.stats.record_command(call_data["command"]["name"], time.perf_counter() - time_start)
+
+        if self.map_changed:
+            self.player_1.control.map_outdated = True
+            self.player_2.control.map_outdated = True
+
+        if (self.recorder is not None and self.turn != turn and self.winner is None
+                and self.turn % self.recorder.snapshot_interval == 0):
+            self.recorder.write_snapshot(self._create_snapshot())
 
         #print('Player:', id, 'count:', call_data['count'])
 
@@ -620,6 +1485,7 @@ class Game:
         p2_n_actions = f'P2 Number of Actions: {self.player_2.control.call_count}'
         n_game_turns = f'Number of Game Turns: {self.turn}'
         game_duration_txt = f'Time: {game_duration}'
+        seed_txt = f'Seed: {self.seed}'
 
         print(winner_txt)
         print(n_troops_txt)
@@ -627,6 +1493,7 @@ class Game:
         print(p2_n_actions)
         print(n_game_turns)
         print(game_duration_txt)
+        print(seed_txt)
 
     def _check_for_winner(self) -> bool:
         """Check if the game winner is defined. If yes, print the game result\\
@@ -665,15 +1532,54 @@ class Game:
             Maximum number of turns in the game.
         """
 
+        stats = self.stats
+        if stats is not None:
+            stats.start()
+
         self.time_start = time.perf_counter()
         while self.turn < max_turns:
-            self._wait_for_active_player()
+            t0 = time.perf_counter()
+            if self.headless:
+                self._ask_active_agent()
+            else:
+                self._wait_for_active_player()
+            t1 = time.perf_counter()
             self._execute_active_player_action()
+            t2 = time.perf_counter()
             has_winner = self._check_for_winner()
-            self._update_players_data()
+            t3 = time.perf_counter()
+            if not self.headless:
+                self._update_players_data()
+            t4 = time.perf_counter()
+
+            if stats is not None:
+                stats.record_phase('wait', t1 - t0)
+                stats.record_phase('execute', t2 - t1)
+                stats.record_phase('check_winner', t3 - t2)
+                stats.record_phase('update_data', t4 - t3)
+
             if has_winner: 
                 break
 
+        if stats is not None:
+            stats.stop()
+            stats.print_summary()
+
+        if self.recorder is not None:
+            self.recorder.close()
+
+        if self.headless:
+            self._notify_agents()
+        else:
+            self._close_transports()
+
 if __name__ == '__main__':
-    game = Game(log=True)
+    transport = sys.argv[1] if len(sys.argv) > 1 else 'file'
+    protocol = sys.argv[2] if len(sys.argv) > 2 else 'full'
+    # 'stats' prints the time of each phase, 'profile' also runs cProfile,
+    # 'none' measures nothing
+    instrumentation = sys.argv[3] if len(sys.argv) > 3 else 'none'
+    world_definition = sys.argv[4] if len(sys.argv) > 4 else 'worlds/classic.json'
+    stats = GameStats(profile=instrumentation == 'profile') if instrumentation != 'none' else None
+    game = Game(log=True, transport=transport, protocol=protocol, stats=stats, world_definition=world_definition, shared_memory_name=os.environ.get(SHARED_MEMORY_ENV))
     game.run()
\ No newline at end of file
@@ -0,0 +1,512 @@
+import struct
+import bisect
+from array import array
+
+from binary_protocol import _to_little_endian, _from_little_endian
+
+MAGIC = b'RSKR'
+VERSION = 1
+
+# magic, version, seed, world digest, n_countries, snapshot_interval
+HEADER = struct.Struct('<4sIQ16sII')
+
+# code, player_id, 2 unused bytes, 3 args
+RECORD = struct.Struct('<BB2xiii')
+
+# turn, n_actions, active player, n_new_troops and n_total_troops of each
+# player
+SNAPSHOT_HEADER = struct.Struct('<iIiiiiB3x')
+
+# turn, n_actions, offset of the snapshot record
+INDEX_ENTRY = struct.Struct('<iIQ')
+
+# magic, n_entries, offset of the index
+FOOTER = struct.Struct('<4sIQ')
+INDEX_MAGIC = b'RSKI'
+
+# Turns between two snapshots
+SNAPSHOT_INTERVAL = 10
+
+# Code of each command in the records, 'unknown' for the commands that do
+# not exist
+COMMANDS = ('unknown', 'attack', 'blitz', 'move_troops', 'set_new_troops',
+            'pass_turn', 'set_new_troops_bulk', 'batch')
+COMMAND_CODES = {name: code for code, name in enumerate(COMMANDS)}
+SNAPSHOT = 255
+
+# Words of the state of a `random.Random`, the Mersenne Twister state and
+# its position
+N_RNG_WORDS = 625
+
+class Snapshot:
+    """The state of a game at the start of a turn, enough to go on playing\\
+    it from there, see `Game.replay_file`.
+
+    The player of the turn is mobilizing and the other one waiting.
+
+    Parameters
+    ----------
+    turn : int
+    n_actions : int
+        The number of actions performed before the snapshot.
+    active : {1, 2}
+        The id of the player of the turn.
+    n_new_troops : list
+        `[0, player 1, player 2]`.
+    n_total_troops : list
+        `[0, player 1, player 2]`.
+    owners : array
+        The id of the owner of each country, typecode 'b'.
+    troops : array
+        The troops on each country, typecode 'i'.
+    rng_state : tuple
+        The state of the generator of the dices, see `random.getstate`.
+    offset : int, optional
+        Where the actions after the snapshot start in the record, set by
+        the reader.
+    """
+
+    __slots__ = ('turn', 'n_actions', 'active', 'n_new_troops', 'n_total_troops',
+                 'owners', 'troops', 'rng_state', 'offset')
+
+    def __init__(
+            self,
+            turn: int,
+            n_actions: int,
+            active: int,
+            n_new_troops: list,
+            n_total_troops: list,
+            owners: array,
+            troops: array,
+            rng_state: tuple,
+            offset: int = None
+        ):
+        self.turn = turn
+        self.n_actions = n_actions
+        self.active = active
+        self.n_new_troops = n_new_troops
+        self.n_total_troops = n_total_troops
+        self.owners = owners
+        self.troops = troops
+        self.rng_state = rng_state
+        self.offset = offset
+
+    def to_bytes(self) -> bytes:
+        """Pack the snapshot: its header, the owners as int8, the troops as\\
+        int32 and the words of the generator as uint32, little endian."""
+
+        header = SNAPSHOT_HEADER.pack(
+            self.turn,
+            self.n_actions,
+            *self.n_new_troops[1:],
+            *self.n_total_troops[1:],
+            self.active
+        )
+
+        return b''.join((
+            header,
+            self.owners.tobytes(),
+            _to_little_endian(self.troops),
+            _to_little_endian(array('I', self.rng_state[1]))
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, n_countries: int, offset: int = None) -> 'Snapshot':
+        """Unpack a snapshot packed by `to_bytes`.
+
+        Parameters
+        ----------
+        data : bytes
+        n_countries : int
+        offset : int, optional
+
+        Returns
+        -------
+        Snapshot
+        """
+
+        (turn, n_actions, n_new_1, n_new_2, n_total_1,
+         n_total_2, active) = SNAPSHOT_HEADER.unpack_from(data)
+
+        start = SNAPSHOT_HEADER.size
+        owners = array('b', data[start:start + n_countries])
+        start += n_countries
+        troops = _from_little_endian('i', data[start:start + 4 * n_countries])
+        start += 4 * n_countries
+        words = _from_little_endian('I', data[start:start + 4 * N_RNG_WORDS])
+
+        return cls(turn, n_actions, active, [0, n_new_1, n_new_2], [0, n_total_1, n_total_2],
+                   owners, troops, (3, tuple(words), None), offset)
+
+def _snapshot_size(n_countries: int) -> int:
+    return SNAPSHOT_HEADER.size + 5 * n_countries + 4 * N_RNG_WORDS
+
+def _int32(value) -> int:
+    value = int(value)
+
+    if not -1 << 31 <= value < 1 << 31:
+        raise ValueError(f"{value} does not fit in 32 bits")
+
+    return value
+
+def encode_command(command: dict, country_ids: dict) -> list:
+    """Pack a command in records, a bulk or a batch is a record with the\\
+    number of records that follow it.
+
+    Commands that cannot be packed, with args of the wrong type or out of
+    range, are recorded as 'unknown', they were invalid and did nothing.
+
+    Parameters
+    ----------
+    command : dict
+        The `{'name': str, 'args': list}` of the call data.
+    country_ids : dict
+        The id of each country name, see `Topology.ids`.
+
+    Returns
+    -------
+    list
+        The `(code, a, b, c)` of each record, unknown countries have the id
+        -1.
+    """
+
+    try:
+        name = command['name']
+        args = command['args']
+        code = COMMAND_CODES.get(name, 0)
+
+        if name in ('attack', 'blitz', 'move_troops'):
+            return [(code, _int32(args[0]), country_ids.get(args[1], -1), country_ids.get(args[2], -1))]
+
+        if name == 'set_new_troops':
+            return [(code, _int32(args[0]), country_ids.get(args[1], -1), 0)]
+
+        if name == 'set_new_troops_bulk':
+            records = [(code, len(args), 0, 0)]
+            for n_troops, country_name in args:
+                records.append((COMMAND_CODES['set_new_troops'], _int32(n_troops), country_ids.get(country_name, -1), 0))
+            return records
+
+        if name == 'batch':
+            records = [(code, len(args), 0, 0)]
+            for sub_command in args:
+                records.extend(encode_command(sub_command, country_ids))
+            return records
+
+        if name == 'pass_turn':
+            return [(code, 0, 0, 0)]
+
+    except (TypeError, ValueError, IndexError, KeyError):
+        pass
+
+    return [(0, 0, 0, 0)]
+
+class GameRecordWriter:
+    """Writes a game in the binary record format, read by\\
+    `GameRecordReader`.
+
+    The file is only appended to: a header with the seed and the hash of the
+    world, then the actions as they are performed, each a fixed-width record
+    of a command code and 3 int32 args with country ids instead of names,
+    and every `snapshot_interval` turns a snapshot of the board. `close`
+    appends the index of the snapshots and a footer pointing to it, a file
+    not closed, e.g. of a game that crashed, is still read up to its last
+    whole record.
+
+    Parameters
+    ----------
+    path : str or Path
+    seed : int
+        The seed of the game, from 0 to 2^64 - 1.
+    world_digest : str
+        The hash of the world definition, see `Topology.digest`.
+    n_countries : int
+    snapshot_interval : int, default SNAPSHOT_INTERVAL
+    """
+
+    def __init__(self, path, seed: int, world_digest: str, n_countries: int, snapshot_interval: int = SNAPSHOT_INTERVAL):
+        if not 0 <= seed < 1 << 64:
+            raise ValueError(f"Cannot record the seed {seed}, it does not fit in 64 bits")
+
+        self.n_countries = n_countries
+        self.snapshot_interval = snapshot_interval
+        self.n_actions = 0
+        self.index = []
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, bytes.fromhex(world_digest),
+                                    n_countries, snapshot_interval))
+
+    def write_action(self, player_id: int, command: dict, country_ids: dict):
+        """Append an action.
+
+        Parameters
+        ----------
+        player_id : {1, 2}
+        command : dict
+            The `{'name': str, 'args': list}` of the call data, with country
+            names.
+        country_ids : dict
+            The id of each country name, see `Topology.ids`.
+        """
+
+        self.file.write(b''.join(RECORD.pack(code, player_id, a, b, c)
+                                 for code, a, b, c
+                                 in encode_command(command, country_ids)))
+        self.n_actions += 1
+
+    def write_snapshot(self, snapshot: Snapshot):
+        """Append a snapshot and add it to the index.
+
+        Parameters
+        ----------
+        snapshot : Snapshot
+        """
+
+        payload = snapshot.to_bytes()
+        self.index.append((snapshot.turn, snapshot.n_actions, self.file.tell()))
+        self.file.write(RECORD.pack(SNAPSHOT, snapshot.active, len(payload), 0, 0))
+        self.file.write(payload)
+
+    def close(self):
+        """Append the index and the footer and close the file."""
+
+        if self.file.closed:
+            return
+
+        index_offset = self.file.tell()
+        self.file.write(b''.join(INDEX_ENTRY.pack(*entry) for entry in self.index))
+        self.file.write(FOOTER.pack(INDEX_MAGIC, len(self.index), index_offset))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class GameRecordReader:
+    """Reads a game written by `GameRecordWriter`.
+
+    Nothing is loaded upfront but the header and the index: actions and
+    snapshots are read lazily by generators, so any number of records can be
+    scanned with little memory, see `iter_records`.
+
+    Parameters
+    ----------
+    path : str or Path
+
+    Attributes
+    ----------
+    seed : int
+    world_digest : str
+    n_countries : int
+    snapshot_interval : int
+    index : list
+        The `(turn, n_actions, offset)` of each snapshot.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a game record of this version.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+
+        try:
+            magic, version, self.seed, digest, self.n_countries, self.snapshot_interval = HEADER.unpack(
+                self.file.read(HEADER.size))
+        except struct.error:
+            magic = version = None
+
+        if magic != MAGIC or version != VERSION:
+            self.file.close()
+            raise ValueError(f"{path} is not a game record of version {VERSION}")
+
+        self.world_digest = digest.hex()
+        self._snapshot_size = _snapshot_size(self.n_countries)
+        self._read_index()
+
+    def _read_index(self):
+        """Read the index written on close, or build it from the snapshots\\
+        if the file was not closed."""
+
+        end = self.file.seek(0, 2)
+        self.end = end
+        footer = None
+
+        if end - HEADER.size >= FOOTER.size:
+            self.file.seek(end - FOOTER.size)
+            footer = FOOTER.unpack(self.file.read(FOOTER.size))
+
+        if (footer is not None and footer[0] == INDEX_MAGIC
+                and footer[2] + footer[1] * INDEX_ENTRY.size + FOOTER.size == end):
+            _, n_entries, index_offset = footer
+            self.end = index_offset
+            self.file.seek(index_offset)
+            data = self.file.read(n_entries * INDEX_ENTRY.size)
+            self.index = [INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size) for i in range(n_entries)]
+            return
+
+        self.index = []
+
+        for code, player_id, a, _, _, offset in self._iter_records(HEADER.size):
+            if code == SNAPSHOT:
+                self.file.seek(offset)
+                turn, n_actions = struct.unpack('<iI', self.file.read(8))
+                self.index.append((turn, n_actions, offset - RECORD.size))
+
+    def _iter_records(self, offset: int):
+        """Yield the `(code, player_id, a, b, c, offset)` of each whole\\
+        record from an offset, skipping the payload of the snapshots.
+
+        The offset yielded is the one right after the record.
+        """
+
+        file = self.file
+
+        while offset + RECORD.size <= self.end:
+            file.seek(offset)
+            code, player_id, a, b, c = RECORD.unpack(file.read(RECORD.size))
+            offset += RECORD.size
+
+            if code == SNAPSHOT:
+                if offset + a > self.end:
+                    return
+                yield code, player_id, a, b, c, offset
+                offset += a
+            else:
+                yield code, player_id, a, b, c, offset
+
+    def _decode(self, records, first: tuple, names: list) -> dict:
+        """Unpack a command from its first record and the records that\\
+        follow it."""
+
+        code, _, a, b, c, _ = first
+        name = COMMANDS[code]
+
+        def get_name(country_id):
+            if names is None:
+                return country_id
+            return names[country_id] if 0 <= country_id < len(names) else None
+
+        if name in ('attack', 'blitz', 'move_troops'):
+            args = [a, get_name(b), get_name(c)]
+        elif name == 'set_new_troops':
+            args = [a, get_name(b)]
+        elif name == 'set_new_troops_bulk':
+            args = []
+            for _ in range(a):
+                _, _, n_troops, country_id, _, _ = next(records)
+                args.append([n_troops, get_name(country_id)])
+        elif name == 'batch':
+            args = [self._decode(records, next(records), names) for _ in range(a)]
+        else:
+            args = []
+
+        return {'name': name, 'args': args}
+
+    def actions(self, start: Snapshot = None, names: list = None):
+        """Yield the actions of the game.
+
+        Parameters
+        ----------
+        start : Snapshot, optional
+            Yield the actions after this snapshot, see `seek`, all of them
+            if not given.
+        names : list, optional
+            The country names indexed by id, see `Topology.names`. The args
+            keep the country ids if not given.
+
+        Yields
+        ------
+        tuple
+            `(player_id, command)` with command as the
+            `{'name': str, 'args': list}` of the call data.
+        """
+
+        offset = HEADER.size if start is None else start.offset
+        records = self._iter_records(offset)
+
+        for record in records:
+            if record[0] == SNAPSHOT:
+                continue
+
+            try:
+                command = self._decode(records, record, names)
+            except StopIteration:
+                # The last action was not written whole
+                return
+
+            yield record[1], command
+
+    def _read_snapshot(self, offset: int) -> Snapshot:
+        self.file.seek(offset + RECORD.size)
+        data = self.file.read(self._snapshot_size)
+
+        return Snapshot.from_bytes(data, self.n_countries, offset + RECORD.size + self._snapshot_size)
+
+    def snapshots(self):
+        """Yield the snapshots of the game.
+
+        Yields
+        ------
+        Snapshot
+        """
+
+        for _, _, offset in self.index:
+            yield self._read_snapshot(offset)
+
+    def seek(self, turn: int) -> Snapshot:
+        """Get the last snapshot at or before a turn.
+
+        Parameters
+        ----------
+        turn : int
+
+        Returns
+        -------
+        Snapshot or None
+            None if the first snapshot is after the turn.
+        """
+
+        i = bisect.bisect_right(self.index, turn, key=lambda entry: entry[0])
+
+        if i == 0:
+            return None
+
+        return self._read_snapshot(self.index[i - 1][2])
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def iter_records(paths):
+    """Open game records one after the other, closing each one before\\
+    opening the next.
+
+    Parameters
+    ----------
+    paths : iterable
+        The paths of the records, e.g. `Path('games').glob('*.rskr')`.
+        Files that are not game records are skipped.
+
+    Yields
+    ------
+    GameRecordReader
+    """
+
+    for path in paths:
+        try:
+            reader = GameRecordReader(path)
+        except (OSError, ValueError):
+            continue
+
+        with reader:
+            yield reader
@@ -0,0 +1,544 @@
+from world import World
+from continent import ContinentCounters
+
+from array import array
+import random
+
+# The commands with a pair of countries as their second and third args
+COUNTRY_PAIR_COMMANDS = ('attack', 'blitz', 'move_troops')
+
+class GameState:
+    """A compact copy of a game that can be played ahead and rewound.
+
+    The board is kept as the owner and troops arrays of `World`, indexed by
+    country id, and the players as a few ints, so cloning a state copies two
+    small arrays instead of the object graph of a `Game`. The world is only
+    read for its topology and shared between clones.
+
+    Actions follow the rules of `Game` and take country ids instead of
+    names, invalid actions included: moving more troops than allowed while
+    conquering or fortifying still ends the conquering or the turn, and a
+    blitz uses at most the troops of the attacker minus one as dices. Every
+    action applied is logged in `history` with what it changed, so `undo`
+    rewinds it without copying the state.
+
+    The Zobrist hash of the board is kept in `hash` and updated with the
+    countries each action changes.
+
+    Parameters
+    ----------
+    world : World
+        The world the game is played on.
+    owners : array
+        The id of the owner of each country.
+    troops : array
+        The number of troops on each country.
+    n_new_troops : list
+        `[0, player 1, player 2]` troops to be disposed on the board.
+    n_total_troops : list
+        `[0, player 1, player 2]` troops on the board.
+    states : list
+        `[None, player 1, player 2]` states, as in `Player.state`.
+    active : {1, 2}
+        The id of the player taking actions.
+    turn : int, default 0
+    winner : {None, 1, 2}, default None
+    last_attack : tuple, optional
+        The countries of the last action of the active player,
+        `(attacker_id, attacked_id)` after an attack. As `Game` compares
+        them with its last call, they are the only countries it can move
+        troops between while conquering.
+    rng : random.Random, optional
+        The generator of the dices, a new one is created if not given.
+    board_hash : int, optional
+        The Zobrist hash of `owners` and `troops` if already known, e.g.
+        `World.hash`, it is computed otherwise.
+
+    Attributes
+    ----------
+    history : list
+        The actions applied, as `(command, args, undo_data)` tuples.
+    hash : int
+        The Zobrist hash of `owners` and `troops`, see `World.zobrist`.
+    continent_counters : ContinentCounters
+        The countries of each player in every continent, updated with
+        `owners`.
+    """
+
+    __slots__ = (
+        'world',
+        'owners',
+        'troops',
+        'n_new_troops',
+        'n_total_troops',
+        'n_countries',
+        'states',
+        'active',
+        'turn',
+        'winner',
+        'last_attack',
+        'rng',
+        'history',
+        'hash',
+        'continent_counters'
+    )
+
+    def __init__(
+            self,
+            world: World,
+            owners: array,
+            troops: array,
+            n_new_troops: list,
+            n_total_troops: list,
+            states: list,
+            active: int,
+            turn: int = 0,
+            winner: int = None,
+            last_attack: tuple = None,
+            rng: random.Random = None,
+            board_hash: int = None
+        ):
+        self.world = world
+        self.owners = owners
+        self.troops = troops
+        self.n_new_troops = n_new_troops
+        self.n_total_troops = n_total_troops
+        self.n_countries = [0, owners.count(1), owners.count(2)]
+        self.states = states
+        self.active = active
+        self.turn = turn
+        self.winner = winner
+        self.last_attack = last_attack
+        self.rng = rng if rng is not None else random.Random()
+        self.history = []
+        if board_hash is None:
+            board_hash = world.zobrist.hash_board(owners, troops)
+        self.hash = board_hash
+        self.continent_counters = ContinentCounters(world.topology, owners)
+
+    @classmethod
+    def from_player_data(cls, world: World, player_data: dict, last_call_data: dict = None, rng: random.Random = None) -> 'GameState':
+        """Build the state seen by an agent from its player data.
+
+        The enemy troops to be disposed and the turn are not in the player
+        data, they start at 0.
+
+        Parameters
+        ----------
+        world : World
+            The world the game is played on.
+        player_data : dict
+            The player data sent by the game to the agent.
+        last_call_data : dict, optional
+            The last call of the agent, needed to move troops while
+            conquering.
+        rng : random.Random, optional
+
+        Returns
+        -------
+        GameState
+        """
+
+        owners = array('b', bytes(len(world.country_list)))
+        troops = array('i', bytes(4 * len(world.country_list)))
+
+        for country_name, country_data in player_data['countries_data'].items():
+            country_id = world.country_dict[country_name].id
+            owners[country_id] = country_data['owner']
+            troops[country_id] = country_data['n_troops']
+
+        return cls._from_agent_data(
+            world,
+            player_data['id'],
+            player_data['state'],
+            player_data['n_new_troops'],
+            player_data['n_total_troops'],
+            player_data['enemy_n_total_troops'],
+            owners,
+            troops,
+            last_call_data,
+            rng
+            )
+
+    @classmethod
+    def from_state_view(cls, world: World, view, last_call_data: dict = None, rng: random.Random = None) -> 'GameState':
+        """Build the state seen by an agent from its state view, as\\
+        `from_player_data` without reading the countries by name.
+
+        Parameters
+        ----------
+        world : World
+            The world the game is played on, with the topology of the view,
+            see `World.from_topology`.
+        view : StateView
+            The state view of the agent.
+        last_call_data : dict, optional
+        rng : random.Random, optional
+
+        Returns
+        -------
+        GameState
+        """
+
+        return cls._from_agent_data(
+            world,
+            view.id,
+            view.state,
+            view.n_new_troops,
+            view.n_total_troops,
+            view.enemy_n_total_troops,
+            array('b', view.owners),
+            array('i', view.troops),
+            last_call_data,
+            rng
+            )
+
+    @classmethod
+    def _from_agent_data(cls, world, id, state, n_new_troops, n_total_troops, enemy_n_total_troops,
+                         owners, troops, last_call_data, rng) -> 'GameState':
+        """Build the state seen by an agent, see `from_player_data`."""
+
+        enemy_id = 2 if id == 1 else 1
+        new_troops = [0, 0, 0]
+        new_troops[id] = n_new_troops
+        total_troops = [0, 0, 0]
+        total_troops[id] = n_total_troops
+        total_troops[enemy_id] = enemy_n_total_troops
+        states = [None, 'waiting', 'waiting']
+        states[id] = state
+
+        last_attack = None
+        if last_call_data is not None and last_call_data['command']['name'] in COUNTRY_PAIR_COMMANDS:
+            args = last_call_data['command']['args']
+            last_attack = (world.country_dict[args[1]].id, world.country_dict[args[2]].id)
+
+        active = id if state != 'waiting' else enemy_id
+
+        return cls(world, owners, troops, new_troops, total_troops, states, active, last_attack=last_attack, rng=rng)
+
+    def clone(self) -> 'GameState':
+        """Copy the state, with an empty history.
+
+        The clone shares the world and the random generator of this state.
+
+        Returns
+        -------
+        GameState
+        """
+
+        state = GameState.__new__(GameState)
+        state.world = self.world
+        state.owners = array('b', self.owners)
+        state.troops = array('i', self.troops)
+        state.n_new_troops = list(self.n_new_troops)
+        state.n_total_troops = list(self.n_total_troops)
+        state.n_countries = list(self.n_countries)
+        state.states = list(self.states)
+        state.active = self.active
+        state.turn = self.turn
+        state.winner = self.winner
+        state.last_attack = self.last_attack
+        state.rng = self.rng
+        state.history = []
+        state.hash = self.hash
+        state.continent_counters = self.continent_counters.copy()
+
+        return state
+
+    def _save_players(self) -> tuple:
+        """Copy everything but the board that an action may change."""
+
+        return (
+            tuple(self.n_new_troops),
+            tuple(self.n_total_troops),
+            tuple(self.n_countries),
+            tuple(self.states),
+            self.active,
+            self.turn,
+            self.winner,
+            self.last_attack,
+            self.hash
+        )
+
+    def apply(self, command: str, args: list) -> bool:
+        """Perform an action of the active player.
+
+        Parameters
+        ----------
+        command : {'attack', 'blitz', 'move_troops', 'set_new_troops', 'set_new_troops_bulk', 'pass_turn'}
+        args : list
+            The same args of the command in the call data, with country ids
+            instead of country names.
+
+        Returns
+        -------
+        bool
+            True if the action was valid. Invalid actions are logged too, as
+            some of them still change the state like in `Game`.
+        """
+
+        players = self._save_players()
+        countries = []
+
+        if command == 'attack':
+            is_valid = self._attack(args[0], args[1], args[2], countries, blitz=False)
+        elif command == 'blitz':
+            is_valid = self._attack(args[0], args[1], args[2], countries, blitz=True)
+        elif command == 'move_troops':
+            is_valid = self._move_troops(args[0], args[1], args[2], countries)
+        elif command == 'set_new_troops':
+            is_valid = self._set_new_troops(args[0], args[1], countries)
+        elif command == 'set_new_troops_bulk':
+            is_valid = self._set_new_troops_bulk(args, countries)
+        elif command == 'pass_turn':
+            is_valid = self._pass_turn()
+        else:
+            is_valid = False
+
+        # Game checks the moves of a conquering with its last call, valid or
+        # not
+        self.last_attack = tuple(args[1:3]) if command in COUNTRY_PAIR_COMMANDS else None
+
+        self._update_hash(countries)
+        self.history.append((command, args, (players, countries)))
+
+        return is_valid
+
+    def undo(self) -> tuple:
+        """Rewind the last action applied.
+
+        Returns
+        -------
+        tuple
+            The `(command, args)` of the action undone.
+        """
+
+        command, args, (players, countries) = self.history.pop()
+
+        (n_new_troops, n_total_troops, n_countries, states,
+         self.active, self.turn, self.winner, self.last_attack, self.hash) = players
+
+        self.n_new_troops[:] = n_new_troops
+        self.n_total_troops[:] = n_total_troops
+        self.n_countries[:] = n_countries
+        self.states[:] = states
+
+        for country_id, owner, n_troops in reversed(countries):
+            self.continent_counters.move(country_id, self.owners[country_id], owner)
+            self.owners[country_id] = owner
+            self.troops[country_id] = n_troops
+
+        return command, args
+
+    def get_key(self) -> int:
+        """Hash the board with the active player and its state.
+
+        Returns
+        -------
+        int
+        """
+
+        return self.hash ^ self.world.zobrist.get_turn_key(self.active, self.states[self.active])
+
+    def _update_hash(self, countries: list):
+        """Replace the keys of the countries changed by an action."""
+
+        keys = self.world.zobrist
+        updated = set()
+
+        for country_id, owner, n_troops in countries:
+            if country_id not in updated:
+                updated.add(country_id)
+                self.hash ^= (keys.get_key(country_id, owner, n_troops)
+                              ^ keys.get_key(country_id, self.owners[country_id], self.troops[country_id]))
+
+    def _save_country(self, country_id: int, countries: list):
+        """Log a country before an action changes it."""
+
+        countries.append((country_id, self.owners[country_id], self.troops[country_id]))
+
+    def _roll(self, n_dice: int, attacker: int, attacked: int):
+        """Roll the dices of a single attack, as in `Player.attack`."""
+
+        attacked_dice = 1 if self.troops[attacked] == 1 else 2
+
+        attacker_values = sorted((self.rng.randint(1, 6) for _ in range(n_dice)), reverse=True)
+        attacked_values = sorted((self.rng.randint(1, 6) for _ in range(attacked_dice)), reverse=True)
+
+        for attacker_value, attacked_value in zip(attacker_values, attacked_values):
+            if attacked_value >= attacker_value:
+                self.troops[attacker] -= 1
+                self.n_total_troops[self.active] -= 1
+            else:
+                self.troops[attacked] -= 1
+                self.n_total_troops[3 - self.active] -= 1
+
+    def _attack(self, n_dice: int, attacker: int, attacked: int, countries: list, blitz: bool) -> bool:
+        player = self.active
+        max_dice = n_dice
+
+        if blitz:
+            # The dices of the first roll, as in Game._blitz
+            n_dice = min(max_dice, self.troops[attacker] - 1)
+
+        if (n_dice not in (1, 2, 3)
+                or self.owners[attacker] != player
+                or self.owners[attacked] != 3 - player
+                or attacked not in self.world.country_list[attacker].neighbour_ids
+                or self.troops[attacker] - n_dice < 1):
+            return False
+
+        self._save_country(attacker, countries)
+        self._save_country(attacked, countries)
+
+        while True:
+            if blitz:
+                n_dice = min(max_dice, self.troops[attacker] - 1)
+
+            self._roll(n_dice, attacker, attacked)
+
+            if self.troops[attacked] == 0 or not blitz or self.troops[attacker] < 2:
+                break
+
+        if self.troops[attacked] == 0:
+            self.continent_counters.move(attacked, 3 - player, player)
+            self.owners[attacked] = player
+            self.n_countries[player] += 1
+            self.n_countries[3 - player] -= 1
+            self.troops[attacked] += n_dice
+            self.troops[attacker] -= n_dice
+            self.states[player] = 'conquering'
+
+            if self.n_countries[player] == len(self.owners):
+                self.winner = player
+                self.states[player] = 'winner'
+                self.states[3 - player] = 'loser'
+
+        return True
+
+    def are_connected(self, country_1: int, country_2: int) -> bool:
+        """Check if two countries of the same owner are connected by land.
+
+        Parameters
+        ----------
+        country_1 : int
+        country_2 : int
+
+        Returns
+        -------
+        bool
+        """
+
+        owner = self.owners[country_1]
+
+        if self.owners[country_2] != owner:
+            return False
+
+        if country_1 == country_2:
+            return True
+
+        offsets = self.world.adjacency_offsets
+        adjacency = self.world.adjacency
+        reached = {country_1}
+        stack = [country_1]
+
+        while stack:
+            country = stack.pop()
+            for neighbour in adjacency[offsets[country]:offsets[country + 1]]:
+                if neighbour == country_2:
+                    return True
+                if neighbour not in reached and self.owners[neighbour] == owner:
+                    reached.add(neighbour)
+                    stack.append(neighbour)
+
+        return False
+
+    def _move_troops(self, n_troops: int, from_country: int, to_country: int, countries: list) -> bool:
+        player = self.active
+        state = self.states[player]
+
+        if state == 'conquering' and (from_country, to_country) != self.last_attack:
+            return False
+
+        if self.owners[from_country] != player or self.owners[to_country] != player:
+            return False
+
+        if state == 'fortifying' and not self.are_connected(from_country, to_country):
+            return False
+
+        is_valid = n_troops < self.troops[from_country]
+
+        if is_valid:
+            self._save_country(from_country, countries)
+            self._save_country(to_country, countries)
+
+            self.troops[to_country] += n_troops
+            self.troops[from_country] -= n_troops
+
+        # Even when there are not enough troops to move, as in Game
+        if state == 'conquering':
+            self.states[player] = 'attacking'
+        elif state == 'fortifying':
+            self._pass_turn()
+
+        return is_valid
+
+    def _set_new_troops(self, n_troops: int, country: int, countries: list) -> bool:
+        player = self.active
+
+        if self.owners[country] != player or n_troops > self.n_new_troops[player]:
+            return False
+
+        self._save_country(country, countries)
+
+        self.troops[country] += n_troops
+        self.n_total_troops[player] += n_troops
+        self.n_new_troops[player] -= n_troops
+
+        return True
+
+    def _set_new_troops_bulk(self, placements: list, countries: list) -> bool:
+        player = self.active
+
+        if (any(self.owners[country] != player or n_troops < 0 for n_troops, country in placements)
+                or sum(n_troops for n_troops, _ in placements) > self.n_new_troops[player]):
+            return False
+
+        for n_troops, country in placements:
+            self._set_new_troops(n_troops, country, countries)
+
+        return True
+
+    def _pass_turn(self) -> bool:
+        player = self.active
+        state = self.states[player]
+
+        if state == 'mobilizing':
+            self.states[player] = 'attacking'
+        elif state == 'attacking':
+            self.states[player] = 'fortifying'
+        elif state == 'fortifying':
+            enemy = 3 - player
+            self.states[player] = 'waiting'
+            self.states[enemy] = 'mobilizing'
+            self.turn += 1
+            self.active = enemy
+            self.n_new_troops[enemy] += self.get_new_troops(enemy)
+        else:
+            return False
+
+        return True
+
+    def get_new_troops(self, player: int) -> int:
+        """Count the troops a player receives at the start of its turn.
+
+        Parameters
+        ----------
+        player : {1, 2}
+
+        Returns
+        -------
+        int
+        """
+
+        return max(self.n_countries[player] // 3, 3) + self.continent_counters.bonuses[player]
@@ -0,0 +1,177 @@
+import io
+import time
+import pstats
+import cProfile
+
+PHASES = ('wait', 'execute', 'check_winner', 'update_data')
+
+class GameStats:
+    """Measures where the time of a game goes.
+
+    Given to a `Game`, it is told how long each phase of every action of
+    `Game.run` took, how long each command took to execute and how many
+    bytes were sent to the agents. Hooks are called with every measure as
+    it is taken, the aggregates are given by `summary` at the end of the
+    game.
+
+    The phases are:
+    - wait: waiting for the active player's call, or asking the in-process
+    agent for it in a headless game.
+    - execute: `_execute_active_player_action`.
+    - check_winner: `_check_for_winner`.
+    - update_data: `_update_players_data`, creating and sending the player
+    data. Headless games send no data.
+
+    Parameters
+    ----------
+    hooks : list, optional
+        Callables called as `hook(kind, name, value)`, where kind is
+        'phase', 'command' or 'bytes'. Phases and commands give their
+        duration in seconds and bytes give the number of bytes sent.
+    profile : bool, default False
+        True to also run the game under cProfile.
+
+    Attributes
+    ----------
+    phases : dict
+        The durations of every phase as `{phase: [duration, ...]}`.
+    commands : dict
+        The durations of every command executed as
+        `{command: [duration, ...]}`.
+    bytes_per_turn : dict
+        The bytes sent to the agents on every turn as `{turn: n_bytes}`.
+    profiler : cProfile.Profile or None
+    """
+
+    def __init__(self, hooks: list = None, profile: bool = False):
+        self.hooks = list(hooks) if hooks is not None else []
+        self.phases = {phase: [] for phase in PHASES}
+        self.commands = {}
+        self.bytes_per_turn = {}
+        self.profiler = cProfile.Profile() if profile else None
+        self.time_start = None
+        self.duration = None
+
+    def add_hook(self, hook):
+        """Call a function with every measure taken from now on.
+
+        Parameters
+        ----------
+        hook : callable
+            Called as `hook(kind, name, value)`.
+        """
+
+        self.hooks.append(hook)
+
+    def start(self):
+        """Start measuring the game."""
+
+        self.time_start = time.perf_counter()
+
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self):
+        """Stop measuring the game."""
+
+        if self.profiler is not None:
+            self.profiler.disable()
+
+        self.duration = time.perf_counter() - self.time_start
+
+    def record_phase(self, phase: str, duration: float):
+        self.phases[phase].append(duration)
+
+        for hook in self.hooks:
+            hook('phase', phase, duration)
+
+    def record_command(self, command: str, duration: float):
+        self.commands.setdefault(command, []).append(duration)
+
+        for hook in self.hooks:
+            hook('command', command, duration)
+
+    def record_bytes(self, turn: int, n_bytes: int):
+        self.bytes_per_turn[turn] = self.bytes_per_turn.get(turn, 0) + n_bytes
+
+        for hook in self.hooks:
+            hook('bytes', turn, n_bytes)
+
+    @staticmethod
+    def _aggregate(durations: list) -> dict:
+        if not durations:
+            return {'count': 0, 'total': 0.0, 'mean': 0.0, 'max': 0.0}
+
+        total = sum(durations)
+
+        return {
+            'count': len(durations),
+            'total': total,
+            'mean': total / len(durations),
+            'max': max(durations)
+        }
+
+    def summary(self) -> dict:
+        """Aggregate the measures of the game.
+
+        Returns
+        -------
+        dict
+            The `duration` of the game, the `count`, `total`, `mean` and
+            `max` durations in seconds of each of the `phases` and
+            `commands`, and the `total`, `mean_per_turn` and `max_per_turn`
+            of the `bytes` sent.
+        """
+
+        bytes_sent = list(self.bytes_per_turn.values())
+
+        return {
+            'duration': self.duration,
+            'phases': {phase: self._aggregate(durations) for phase, durations in self.phases.items()},
+            'commands': {command: self._aggregate(durations) for command, durations in self.commands.items()},
+            'bytes': {
+                'total': sum(bytes_sent),
+                'mean_per_turn': sum(bytes_sent) / len(bytes_sent) if bytes_sent else 0,
+                'max_per_turn': max(bytes_sent, default=0)
+            }
+        }
+
+    def get_profile(self, n_functions: int = 20) -> str:
+        """Get the functions that took the most time in the profile.
+
+        Parameters
+        ----------
+        n_functions : int, default 20
+
+        Returns
+        -------
+        str
+            The pstats table sorted by cumulative time, empty if the game
+            was not profiled.
+        """
+
+        if self.profiler is None:
+            return ''
+
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(n_functions)
+
+        return stream.getvalue()
+
+    def print_summary(self):
+        """Print the aggregated measures, and the profile if there is one."""
+
+        summary = self.summary()
+
+        print(f'Instrumented time: {summary["duration"]}')
+
+        for kind in ('phases', 'commands'):
+            for name, aggregate in summary[kind].items():
+                print(f'{name}: count {aggregate["count"]} total {aggregate["total"]:.6f}s'
+                      f' mean {aggregate["mean"] * 1e6:.1f}us max {aggregate["max"] * 1e6:.1f}us')
+
+        print(f'Bytes sent: {summary["bytes"]["total"]}'
+              f' ({summary["bytes"]["mean_per_turn"]:.0f} per turn, max {summary["bytes"]["max_per_turn"]})')
+
+        if self.profiler is not None:
+            print(self.get_profile())
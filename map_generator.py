@@ -0,0 +1,154 @@
+import sys
+import json
+import math
+import random
+import argparse
+from pathlib import Path
+
+def _create_adjacency(n_countries: int, rng: random.Random, diagonal_probability: float) -> list:
+    """Lay the countries on a grid, row after row, and connect each one to\\
+    the countries next to it and to some of the diagonal ones.
+
+    Only one of the two diagonals of a cell can be drawn, so borders never
+    cross, and the last row is connected to the one above it, so every
+    country can be reached.
+
+    Returns
+    -------
+    list
+        The set of neighbour ids of each country.
+    """
+
+    width = math.ceil(math.sqrt(n_countries))
+    neighbours = [set() for _ in range(n_countries)]
+
+    def connect(country_1, country_2):
+        if country_1 < n_countries and country_2 < n_countries:
+            neighbours[country_1].add(country_2)
+            neighbours[country_2].add(country_1)
+
+    for country in range(n_countries):
+        column = country % width
+        if column + 1 < width:
+            connect(country, country + 1)
+        connect(country, country + width)
+
+        if column + 1 < width and rng.random() < diagonal_probability:
+            if rng.random() < 0.5:
+                connect(country, country + width + 1)
+            else:
+                connect(country + 1, country + width)
+
+    return neighbours
+
+def _create_continents(n_continents: int, neighbours: list, rng: random.Random) -> list:
+    """Grow the continents from random countries at the same time, each\\
+    taking a random country of its border at every step, so continents are
+    connected and of uneven shapes.
+
+    Returns
+    -------
+    list
+        The continent id of each country.
+    """
+
+    n_countries = len(neighbours)
+    continent_of = [-1] * n_countries
+    frontier = []
+
+    for continent_id, country in enumerate(rng.sample(range(n_countries), n_continents)):
+        continent_of[country] = continent_id
+        frontier.append(country)
+
+    while frontier:
+        # Pop a random country of the frontier
+        i = rng.randrange(len(frontier))
+        frontier[i], frontier[-1] = frontier[-1], frontier[i]
+        country = frontier.pop()
+
+        for neighbour in neighbours[country]:
+            if continent_of[neighbour] == -1:
+                continent_of[neighbour] = continent_of[country]
+                frontier.append(neighbour)
+
+    return continent_of
+
+def generate_world(
+        n_countries: int,
+        n_continents: int,
+        seed: int = 0,
+        diagonal_probability: float = 0.3
+    ) -> dict:
+    """Generate a random world in the format of the world definition, see\\
+    `Topology.from_dict`.
+
+    The countries are the cells of a grid, bordering the cells around them,
+    and are split in connected continents. As in the classic world, the
+    extra armies of a continent grow with the countries it has to defend:
+    one for each country bordering another continent, plus one for every 4
+    countries.
+
+    Parameters
+    ----------
+    n_countries : int
+    n_continents : int
+        At most `n_countries`.
+    seed : int, default 0
+        The same seed always gives the same world.
+    diagonal_probability : float, default 0.3
+        The probability of a cell bordering a diagonal one, more borders
+        make the world more connected.
+
+    Returns
+    -------
+    dict
+    """
+
+    if not 1 <= n_continents <= n_countries:
+        raise ValueError(f"Cannot split {n_countries} countries in {n_continents} continents")
+
+    rng = random.Random(seed)
+    neighbours = _create_adjacency(n_countries, rng, diagonal_probability)
+    continent_of = _create_continents(n_continents, neighbours, rng)
+
+    names = [f'Country {country}' for country in range(n_countries)]
+    continents_countries = [[] for _ in range(n_continents)]
+
+    for country, continent_id in enumerate(continent_of):
+        continents_countries[continent_id].append(country)
+
+    world_dict = {}
+
+    for continent_id, countries in enumerate(continents_countries):
+        n_border_countries = sum(
+            any(continent_of[neighbour] != continent_id for neighbour in neighbours[country])
+            for country in countries
+            )
+
+        world_dict[f'Continent {continent_id}'] = {
+            'countries': {
+                names[country]: [names[neighbour] for neighbour in sorted(neighbours[country])]
+                for country
+                in countries
+            },
+            'extra_armies': n_border_countries + len(countries) // 4
+        }
+
+    return world_dict
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a random world definition")
+    parser.add_argument('n_countries', type=int)
+    parser.add_argument('n_continents', type=int)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-d', '--diagonal-probability', type=float, default=0.3)
+    parser.add_argument('-o', '--output', type=Path, default=None, help="write the world to a file instead of stdout")
+    args = parser.parse_args()
+
+    world_dict = generate_world(args.n_countries, args.n_continents, args.seed, args.diagonal_probability)
+    json_data = json.dumps(world_dict, indent=4)
+
+    if args.output is None:
+        sys.stdout.write(json_data)
+    else:
+        args.output.write_text(json_data)
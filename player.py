@@ -1,13 +1,18 @@
 from country import Country
+from connectivity import ComponentIndex, BorderIndex
 import random
 
 class _Control:
-    last_m_time = None
     call_count = None
     call_path = None
     data_path = None
     call_data = None
     last_call_data = None
+    map_outdated = True
+    agent = None
+    transport = None
+    acked_count = None
+    sent_data = None
 
 class Player:
     """Represents a player
@@ -18,6 +23,8 @@ class Player:
         The unique id of the player.
     n_new_troops : int
         The number of initial troops the player starts with.
+    rng : random.Random, optional
+        The generator of the dices, a new one is created if not given.
     
     Attributes
     ----------
@@ -27,7 +34,8 @@ class Player:
         Player unique identifier.
     countries_owned : list
         A list with Country objects containing all the countries owned by the
-        player.
+        player, in no particular order. Changed through `gain_country` and
+        `lose_country`.
     n_new_troops : int
         The number of troops available for being distribuited along the board
         at the mobilizing state.
@@ -37,28 +45,81 @@ class Player:
         A string containing the current state of the player, they being:
         waiting, mobilizing, conquering, fortifying, attacking, winner and
         loser.
-    connection_matrix : dict
-        A matrix that tells if there is a land connection between two owned
-        countries.
+    component_index : ComponentIndex
+        The groups of owned countries connected by land, updated every time
+        a country is gained or lost.
+    components : dict
+        A dict with the owned countries as keys and the id of the group of
+        countries connected by land they belong to as values. Two owned
+        countries have a land connection if they have the same id.
 
-        E.g.: `connection_matrix['country A']['country B'] = True`
+        E.g.: `{'country A': 0, 'country B': 0, 'country C': 3}`
+    border_index : BorderIndex
+        The owned countries next to enemy borders, updated every time a
+        country is gained or lost.
     border_countries : dict
         A dict containing as keys all the owned countries next to enemy
         borders and as values all the neighbours that have border with the key.
 
         E.g.: `{'owned country A': ['enemy neighbour B', 'enemy neighbour C', ...]}`
+    frontier_edges : frozenset
+        The frontier edges of `border_countries`, as `(owned country id,
+        enemy neighbour id)` tuples.
     """
 
-    def __init__(self, id, n_new_troops):
+    def __init__(self, id, n_new_troops, rng=None):
         self.data_count = 0
         self.id = id
+        self.rng = rng if rng is not None else random.Random()
         self.countries_owned = []
+        # The index of each owned Country in countries_owned
+        self._positions = {}
         self.n_new_troops = n_new_troops
         self.n_total_troops = 0
         self.state = None
         self.control = _Control()
-        self.connection_matrix = {}
+        self.component_index = ComponentIndex()
+        self.border_index = BorderIndex()
+        self.components = {}
         self.border_countries = {}
+        self.frontier_edges = frozenset()
+
+    def gain_country(self, country: Country):
+        """Take the ownership of a country, updating the indexes of the\\
+        countries owned.
+
+        Parameters
+        ----------
+        country : Country
+            A country not owned by the player.
+        """
+
+        self._positions[country] = len(self.countries_owned)
+        self.countries_owned.append(country)
+        country.owner = self
+        self.component_index.add(country)
+        self.border_index.add(country)
+
+    def lose_country(self, country: Country):
+        """Give up the ownership of a country, updating the indexes of the\\
+        countries owned. The new owner has to be set after.
+
+        Parameters
+        ----------
+        country : Country
+            A country owned by the player.
+        """
+
+        # Swap with the last country so the removal is O(1)
+        position = self._positions.pop(country)
+        last = self.countries_owned.pop()
+
+        if last is not country:
+            self.countries_owned[position] = last
+            self._positions[last] = position
+
+        self.component_index.remove(country)
+        self.border_index.remove(country)
     
     def attack(self, n_dice : int, attacker : Country, attacked : Country) -> (bool | None):
         """A method called to perform an attack with an owned country against
@@ -66,7 +127,7 @@ class Player:
 
         Parameters
         ----------
-        n_dice : int
+        n_dice : {1, 2, 3}
             The number of dices you want to use to attack.
         attacker : Country
             A Country object of the owned country that will be used to perform
@@ -86,14 +147,18 @@ class Player:
             Returns None and print a message in case of the attack is not valid.
         """
 
+        if n_dice not in (1, 2, 3):
+            print("Player", self.id, "can only attack with 1, 2 or 3 dices, not", n_dice)
+            return None
+
         if attacker.owner == self:
             if attacked.owner != self:
-                if attacked in attacker.neighbours:                   
+                if attacker.is_neighbour(attacked):                   
                     attacked_dice = 1 if attacked.n_troops == 1 else 2
 
                     if attacker.n_troops > 1 and (attacker.n_troops - n_dice) >= 1:
-                        attacker_dice_values = random.sample(range(1, 7), n_dice)
-                        attacked_dice_values = random.sample(range(1, 7), attacked_dice)
+                        attacker_dice_values = [self.rng.randint(1, 6) for _ in range(n_dice)]
+                        attacked_dice_values = [self.rng.randint(1, 6) for _ in range(attacked_dice)]
 
                         attacked_dice_values.sort(reverse=True)
                         attacker_dice_values.sort(reverse=True)
@@ -136,6 +201,11 @@ class Player:
         to_country : Country
             A Country object of the owned country where the troops will be
             moved to.
+
+        Returns
+        -------
+        bool
+            True if the troops were moved, False if the move is not valid.
         """
 
         if(from_country.owner == self):
@@ -143,6 +213,7 @@ class Player:
                 if(n_troops < from_country.n_troops):
                     to_country.n_troops += n_troops
                     from_country.n_troops -= n_troops
+                    return True
                 else:
                     print("Player", self.id, "is trying to move", n_troops, "troops, but has only", from_country.n_troops - 1, "available")
             else:
@@ -150,6 +221,8 @@ class Player:
         else:
             print("Player", self.id, "is trying to move troops from enemy's country (", from_country.name, ")")
 
+        return False
+
     def set_new_troops(self, n_troops : int, country : Country):
         """A method called to perform an attack with an owned country\\
         against an enemy country.
@@ -161,17 +234,26 @@ class Player:
         from_country : Country
             A Country object of the owned country where the new troops will
             be disposed.
+
+        Returns
+        -------
+        bool
+            True if the troops were set, False if there are not enough new
+            troops or the country is not owned.
         """
         if(country.owner == self):
             if(n_troops <= self.n_new_troops):
                 country.n_troops += n_troops
                 self.n_total_troops += n_troops
                 self.n_new_troops -= n_troops
+                return True
             else:
                 print("Player", self.id, "is trying to set", n_troops, "troops, but has only", self.n_new_troops)
         else:
             print("Player", self.id, "is trying to set troops in enemy's country (", country.name, ")")
 
+        return False
+
     def pass_turn(self):
         """Does nothing."""
         pass
\ No newline at end of file
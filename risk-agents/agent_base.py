@@ -1,8 +1,15 @@
 import sys
 import json
-import os
 from pathlib import Path
 
+# The game modules live one folder above the agents
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from transport import TRANSPORTS, FileTransport, SocketTransport, SharedMemoryTransport
+from binary_protocol import is_binary, decode_player_data
+from state_view import StateView
+from world import World
+
 class AgentBase():
     """
     This is a model of an Agent class made to play the Risk game
@@ -10,23 +17,81 @@ class AgentBase():
     Modify the attack, mobilize, conquer and fortify methods to build your AI
 
     All the other methods are made to write and read data from the game, let them as they are
+
+    Parameters
+    ----------
+    id : int
+        The id of the player controlled by the agent.
+    headless : bool
+        True if the agent is played in-process by a headless `Game`. Headless
+        agents don't touch the call and log files, the game gives them its
+        state and calls their methods directly.
+    transport : {'file', 'socket', 'shm'}, default 'file'
+        How the agent talks to the game, it must be the same transport the
+        game was started with. With 'shm' the player data is a read-only
+        view of the last state copied from the shared memory of the game,
+        with the same keys, found by the name in the environment variable
+        `RISK_SHM_NAME`. Ignored when the agent is headless.
+
+    Attributes
+    ----------
+    state_view : StateView
+        The game seen by the agent with countries as ints, see `StateView`.
+        Faster than the player data, that headless agents only build if it
+        is read.
+    player_data : dict
+        The game seen by the agent as sent to agents in other processes.
     """
 
     state = 'waiting' # states can be: waiting | attacking | conquering | fortifying | mobilizing 
-    player_data = {}
 
-    def __init__(self, id: int):
+    def __init__(self, id: int, headless: bool = False, transport: str = 'file'):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport {transport}, choose one of {TRANSPORTS}")
+
         self.id = id
 
         self.log = False
+        self.headless = headless
 
         self.calls_path = Path('Calls/player_' + str(id) + '.json')
         self.data_path = Path('Logs/player_' + str(id) + '.json')
 
-        # These two are used to check if the player data file was modified
-        self.last_time = os.path.getmtime(self.data_path)
+        self.transport = None
+        if not headless:
+            if transport == 'file':
+                self.transport = FileTransport(self.calls_path, self.data_path)
+            elif transport == 'socket':
+                self.transport = SocketTransport.connect(self.calls_path.with_suffix('.sock'))
+            else:
+                self.transport = SharedMemoryTransport.attach(id)
+
+        # Used to check if the player data was updated
         self.player_data_count = 0
 
+        # Player data received and not yet acknowledged, used as base for
+        # the deltas sent by the game
+        self.received_data = {}
+
+        # Names and neighbours of the countries in the order of their ids,
+        # needed to read the binary protocol
+        self.binary_layout = None
+
+        # The last data given by the game, as a dict, a StateView or both,
+        # each one built from the other when read
+        self._player_data = None
+        self._state_view = None
+
+        # The topology of the world, needed to build the state view from the
+        # player data
+        self.topology = None
+
+        # The static arrays of the board and the last evaluation, see
+        # `evaluate`
+        self.board_layout = None
+        self.evaluation = None
+        self.evaluation_count = None
+
         # This is the format a call file must have
         self.call_data = {
             'id': id,
@@ -50,47 +115,242 @@ class AgentBase():
         None
         """
 
-        self.player_data = data
-        self.state = self.player_data['state']
+        self._player_data = data
+        self._state_view = None
+        self.state = data['state']
+
+    def _get_state_view(self, view: StateView):
+        """Save the state view given by a headless game and the actual
+        player state
+
+        Parameters
+        ----------
+        view: StateView
+
+        Returns
+        -------
+        None
+        """
+
+        self._state_view = view
+        self._player_data = None
+        self.state = view.state
+
+    @property
+    def player_data(self) -> dict:
+        if self._player_data is None:
+            if self._state_view is None:
+                return {}
+            self._player_data = self._state_view.to_player_data()
+
+        return self._player_data
+
+    @property
+    def state_view(self) -> StateView:
+        if self._state_view is None and self._player_data is not None:
+            countries_data = self._player_data['countries_data']
+
+            # The world is only read again if the countries changed
+            if (self.topology is None
+                    or len(self.topology.names) != len(countries_data)
+                    or list(countries_data) != self.topology.names):
+                self.topology = World.from_player_data(self._player_data).topology
 
-    def _file_changed(self, last_count: int) -> bool:
-        """Check if the player json was changed
+            self._state_view = StateView.from_player_data(self._player_data, self.topology)
+
+        return self._state_view
+
+    def _data_changed(self, last_count: int) -> bool:
+        """Wait for the next player data sent by the game and check if it
+        was updated
         
         Parameters
         ----------
         last_count: int
-            A counter used to check if the file was modified
+            A counter used to check if the data was updated
 
         Returns
         -------
         bool
         """
 
-        while True:
-            try:
-                with open(self.data_path) as openfile:
-                    data = json.load(openfile)
-                    if data["count"] == last_count:
-                        #print("Atualizou sem precisar")
-                        return False
-                    else:
-                        self.player_data_count = data["count"]
-                        self._get_player_data(data)
-                        return True
-            except:
-                pass
+        if isinstance(self.transport, SharedMemoryTransport):
+            # A read-only view of the state copied from the shared memory,
+            # nothing to decode
+            data = self.transport.read_player_data()
+
+            if data["count"] == last_count:
+                return False
+
+            self.player_data_count = data["count"]
+            self._get_player_data(data)
+            return True
+
+        payload = self.transport.recv()
+
+        if is_binary(payload):
+            data = self._unpack_player_data(payload)
+        else:
+            data = json.loads(payload)
+            # The names may have changed, the layout is read again
+            self.binary_layout = None
+
+        if data["count"] == last_count:
+            return False
+
+        if "base" in data:
+            data = self._patch_player_data(data)
+        self.received_data[data["count"]] = data
+
+        self.player_data_count = data["count"]
+        self._get_player_data(data)
+        return True
+
+    def _get_binary_layout(self) -> tuple:
+        """Get the names, neighbours and continents of the countries in the
+        order of their ids, read from the last json player data
+
+        Returns
+        -------
+        tuple
+            `(names, neighbours, neighbour_ids, continents)`
+        """
+
+        if self.binary_layout is None:
+            countries_data = self.player_data["countries_data"]
+            names = list(countries_data)
+            ids = {name: country_id for country_id, name in enumerate(names)}
+            neighbours = [countries_data[name]["neighbours"] for name in names]
+            neighbour_ids = [[ids[neighbour] for neighbour in country_neighbours]
+                             for country_neighbours
+                             in neighbours]
+            continents = list(self.player_data["continents_data"].items())
+
+            self.binary_layout = (names, neighbours, neighbour_ids, continents)
+
+        return self.binary_layout
+
+    def _unpack_player_data(self, payload: bytes) -> dict:
+        """Rebuild the player data from a message of the binary protocol
+        
+        The names, neighbours and continents are taken from the last json
+        player data, the game always sends one first
+
+        Parameters
+        ----------
+        payload: bytes
+            The message read from the player data file given by the game
+
+        Returns
+        -------
+        dict
+            The player data
+        """
+
+        binary_data = decode_player_data(payload)
+        id = binary_data["id"]
+        owners = binary_data["owners"]
+        troops = binary_data["troops"]
+
+        names, neighbours, neighbour_ids, continents = self._get_binary_layout()
+
+        countries_data = {
+            name: {
+                "neighbours": country_neighbours,
+                "owner": owner,
+                "n_troops": n_troops
+            }
+            for name, country_neighbours, owner, n_troops
+            in zip(names, neighbours, owners, troops)
+        }
+
+        continents_data = {
+            name: {**continent_data, "owner": owner or None}
+            for (name, continent_data), owner
+            in zip(continents, binary_data["continent_owners"])
+        }
+
+        countries_owned = []
+        border_countries = {}
+
+        for country_id, owner in enumerate(owners):
+            if owner != id:
+                continue
+            countries_owned.append(names[country_id])
+            enemies = [names[neighbour]
+                       for neighbour
+                       in neighbour_ids[country_id]
+                       if owners[neighbour] != id]
+            if enemies:
+                border_countries[names[country_id]] = enemies
+
+        components = {
+            names[country_id]: component
+            for component, country_ids in enumerate(binary_data["components"])
+            for country_id in country_ids
+        }
+
+        return {
+            "count": binary_data["count"],
+            "id": id,
+            "n_new_troops": binary_data["n_new_troops"],
+            "n_total_troops": binary_data["n_total_troops"],
+            "enemy_n_total_troops": binary_data["enemy_n_total_troops"],
+            "state": binary_data["state"],
+            "countries_owned": countries_owned,
+            "countries_data": countries_data,
+            "border_countries": border_countries,
+            "components": components,
+            "continents_data": continents_data
+        }
+
+    def _patch_player_data(self, delta: dict) -> dict:
+        """Apply a delta sent by the game over the player data it is based on
+        
+        Parameters
+        ----------
+        delta: dict
+            The delta read from the player json file given by the game
+
+        Returns
+        -------
+        dict
+            The updated player data
+        """
+
+        base = self.received_data[delta["base"]]
+        data = dict(base)
+
+        for key, value in delta.items():
+            if key == "base":
+                continue
+            elif key in ("countries_data", "continents_data"):
+                data[key] = dict(base[key])
+                for name, changes in value.items():
+                    data[key][name] = {**base[key][name], **changes}
+            else:
+                data[key] = value
+
+        return data
 
     def _log(self):
         """Print on the terminal the action the bot asked for the player to execute"""
 
         if self.call_data['command']['name'] == 'attack':
             print('Attacked', self.call_data['command']['args'][2], 'with', self.call_data['command']['args'][1], 'using', self.call_data['command']['args'][0], 'troops')
+        elif self.call_data['command']['name'] == 'blitz':
+            print('Blitzed', self.call_data['command']['args'][2], 'with', self.call_data['command']['args'][1], 'using up to', self.call_data['command']['args'][0], 'troops')
         elif self.call_data['command']['name'] == 'move_troops':
             print('Moved', self.call_data['command']['args'][0], 'troops from', self.call_data['command']['args'][1], 'to', self.call_data['command']['args'][2])
         elif self.call_data['command']['name'] == 'set_new_troops':
             print('Setted', self.call_data['command']['args'][0], 'new troops in', self.call_data['command']['args'][1])
+        elif self.call_data['command']['name'] == 'set_new_troops_bulk':
+            for n_troops, country_name in self.call_data['command']['args']:
+                print('Setted', n_troops, 'new troops in', country_name)
         elif self.call_data['command']['name'] == 'pass_turn':
             print('Passed the turn')
+        elif self.call_data['command']['name'] == 'batch':
+            print('Called', len(self.call_data['command']['args']), 'actions:', ', '.join(command['name'] for command in self.call_data['command']['args']))
 
     def _call_action(self, action: str, args: list):
         """
@@ -103,70 +363,111 @@ class AgentBase():
         Parameters
         ----------
         action : str
-            The action name (attack | move_troops | set_new_troops | pass_turn)
+            The action name (attack | blitz | move_troops | set_new_troops | set_new_troops_bulk | pass_turn | batch)
         args : list
             A list with the args of the given action. The args of each action must be:
             
             attack: [n_dice: int, attacker: str, attacked: str]
 
+            blitz: [max_dice: int, attacker: str, attacked: str], attacks until conquering or having a single troop left
+
             move_troops: [n_troops: int, from_country: str, to_country: str] 
 
             set_new_troops: [n_troops: int, country_name: str]
 
+            set_new_troops_bulk: [[n_troops: int, country_name: str], ...], all placed or none
+
             pass_turn: []
 
+            batch: [{'name': action: str, 'args': args: list}, ...], performed in order until the first invalid one, in a single call
+
         Returns
         -------
         None
         """
 
-        with open(self.calls_path, 'w') as outfile:
-            self.call_data = {
-                'id': self.id,
-                'count': self.call_data['count'] + 1,
-                'command': {
-                    'name': action,
-                    'args': args
-                }  
-            }
-
+        self.call_data = {
+            'id': self.id,
+            'count': self.call_data['count'] + 1,
+            'ack': self.player_data_count,
+            'command': {
+                'name': action,
+                'args': args
+            }  
+        }
+
+        # The game will only send deltas based on this player data from now on
+        self.received_data = {
+            count: data
+            for count, data
+            in self.received_data.items()
+            if count >= self.player_data_count
+        }
+
+        if not self.headless:
             json_obj = json.dumps(self.call_data)
 
-            outfile.write(json_obj)
+            self.transport.send(json_obj.encode())
 
         self.state = 'waiting'
 
         if self.log:
             self._log()
     
+    def evaluate(self):
+        """Evaluate the whole board from the point of view of the agent, see
+        `evaluation.evaluate_board`
+
+        The evaluation is computed once for each state view, until its
+        `count` changes. Needs numpy.
+
+        Returns
+        -------
+        BoardEvaluation
+        """
+
+        from evaluation import BoardLayout, evaluate_board
+
+        view = self.state_view
+
+        if self.evaluation is not None and self.evaluation_count == view.count:
+            return self.evaluation
+
+        if self.board_layout is None or self.board_layout.topology is not view.topology:
+            self.board_layout = BoardLayout(view.topology)
+
+        self.evaluation = evaluate_board(view, self.board_layout)
+        self.evaluation_count = view.count
+
+        return self.evaluation
+
     def _pass_turn(self):
         """Ask the _call_action() method to pass the turn """
         self._call_action('pass_turn', [])
 
     def wait_game(self):
-        """Wait until data_path is updated. If it is, save the new player data and state"""
-        current_time = os.path.getmtime(self.data_path)
-
+        """Wait until the player data is updated. If it is, save the new player data and state"""
         last_count = self.player_data_count
 
-        while True:
-            while self.last_time == current_time:
-                current_time = os.path.getmtime(self.data_path)
-
-            self.last_time = os.path.getmtime(self.data_path)
-
-            if self._file_changed(last_count):
-                break
+        while not self._data_changed(last_count):
+            pass
 
     def win(self):
-        quit()
+        """Called once when the game ends with this agent as the winner"""
+        pass
 
     def lose(self):
-        quit()
+        """Called once when the game ends with this agent as the loser"""
+        pass
+
+    def game_over(self):
+        """Called once when the game ends whatever the result, after win()
+        or lose(), also when the game ends with no winner"""
+        pass
 
     @staticmethod
     def read_id(args):
-        if len(args) != 2:
+        if len(args) not in (2, 3):
             print("Please pass your player id as argument")
             quit()
 
@@ -178,24 +479,48 @@ class AgentBase():
 
         return id
 
+    @staticmethod
+    def read_transport(args):
+        transport = args[2] if len(args) == 3 else 'file'
+
+        if transport not in TRANSPORTS:
+            print("Please choose a transport between", ", ".join(TRANSPORTS))
+            quit()
+
+        return transport
+
+    def act(self):
+        """Call the decision method of the current state"""
+        if self.state == 'attacking':
+            self.attack()
+        elif self.state == 'conquering':
+            self.conquer()
+        elif self.state == 'fortifying':
+            self.fortify()
+        elif self.state == 'mobilizing':
+            self.mobilize()
+        else:
+            print('State unknown')
+
     def play(self):
-        while True:
-            if self.state == 'waiting':
-                self.wait_game()
-            elif self.state == 'attacking':
-                self.attack()
-            elif self.state == 'conquering':
-                self.conquer()
-            elif self.state == 'fortifying':
-                self.fortify()
-            elif self.state == 'mobilizing':
-                self.mobilize()
-            elif self.state == 'winner':
-                self.win()
-            elif self.state == 'loser':
-                self.lose()
-            else:
-                print('State unknown')
+        """Play through the transport until the game ends"""
+        try:
+            while True:
+                if self.state == 'waiting':
+                    self.wait_game()
+                elif self.state == 'winner':
+                    self.win()
+                    break
+                elif self.state == 'loser':
+                    self.lose()
+                    break
+                else:
+                    self.act()
+        finally:
+            # Also reached when the game stops with no winner and closes
+            # the transport
+            self.game_over()
+            self.transport.close()
     
     # Modify the next four methods to implement your AI
     
@@ -218,6 +543,6 @@ class AgentBase():
 if __name__ == "__main__":
     id = AgentBase.read_id(sys.argv)
 
-    agent = AgentBase(id)
+    agent = AgentBase(id, transport=AgentBase.read_transport(sys.argv))
 
     agent.play()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import numpy as np
+
+class BoardLayout:
+    """The parts of the board that do not change during a game, in the\\
+    arrays used by `evaluate_board`.
+
+    Parameters
+    ----------
+    topology : Topology
+        The topology of the world, see `StateView.topology`.
+
+    Attributes
+    ----------
+    topology : Topology
+    names : list
+        The names of the countries, indexed by id.
+    ids : dict
+        The id of each country name.
+    sources, targets : numpy.ndarray
+        The ends of every border, each border in both directions: the
+        nonzero entries of the adjacency matrix.
+    continent_of : numpy.ndarray
+        The continent id of each country.
+    continent_names : list
+    continent_sizes : numpy.ndarray
+    """
+
+    def __init__(self, topology):
+        self.topology = topology
+        self.names = topology.names
+        self.ids = topology.ids
+
+        offsets = np.frombuffer(topology.adjacency_offsets, dtype=np.int32)
+        self.sources = np.repeat(np.arange(len(self.names), dtype=np.intp), np.diff(offsets))
+        self.targets = np.frombuffer(topology.adjacency, dtype=np.int32).astype(np.intp)
+
+        self.continent_names = topology.continent_names
+        self.continent_of = np.frombuffer(topology.country_continent, dtype=np.int32).astype(np.intp)
+        self.continent_sizes = np.bincount(self.continent_of, minlength=len(self.continent_names))
+
+class BoardEvaluation:
+    """Features of the whole board from the point of view of a player, see\\
+    `evaluate_board`.
+
+    Each feature is computed for every country at once the first time it is
+    read, so agents only pay for the ones they use. Per country arrays are
+    indexed by the country ids of the layout, e.g.
+    `evaluation.threat[evaluation.ids['Brazil']]`.
+
+    Parameters
+    ----------
+    view : StateView
+        The game seen by the player.
+    layout : BoardLayout
+        The layout of the topology of the view.
+
+    Attributes
+    ----------
+    names : list
+    ids : dict
+    owned : numpy.ndarray
+        True for the countries of the player.
+    troops : numpy.ndarray
+    threat : numpy.ndarray
+        The enemy troops on the neighbours of each country.
+    n_enemy_neighbours : numpy.ndarray
+        The number of neighbours of each country owned by the enemy.
+    frontier : numpy.ndarray
+        True for the countries of the player bordering an enemy country.
+    pressure : numpy.ndarray
+        The threat on each country of the player over its troops, 0 for the
+        enemy countries.
+    continent_completion : numpy.ndarray
+        The fraction of the countries of each continent owned by the
+        player.
+    enemy_continent_completion : numpy.ndarray
+        The same fraction for the enemy.
+    army_ratio : float
+        The troops of the player over all the troops on the board.
+    """
+
+    def __init__(self, view, layout: BoardLayout):
+        self.layout = layout
+        self.names = layout.names
+        self.ids = layout.ids
+        self.owned = np.frombuffer(view.owners, dtype=np.int8) == view.id
+        self.troops = np.frombuffer(view.troops, dtype=np.int32)
+        self._enemy = ~self.owned
+        self._features = {}
+
+    def _get(self, name: str, compute):
+        feature = self._features.get(name)
+
+        if feature is None:
+            feature = self._features[name] = compute()
+
+        return feature
+
+    def _sum_neighbours(self, values: np.ndarray) -> np.ndarray:
+        """Sum the values of the neighbours of every country, the product of\\
+        the adjacency matrix with the values."""
+
+        layout = self.layout
+
+        return np.bincount(layout.sources, weights=values[layout.targets], minlength=len(layout.names)).astype(np.int64)
+
+    @property
+    def threat(self) -> np.ndarray:
+        return self._get('threat', lambda: self._sum_neighbours(self.troops * self._enemy))
+
+    @property
+    def n_enemy_neighbours(self) -> np.ndarray:
+        return self._get('n_enemy_neighbours', lambda: self._sum_neighbours(self._enemy))
+
+    @property
+    def frontier(self) -> np.ndarray:
+        return self._get('frontier', lambda: self.owned & (self.n_enemy_neighbours > 0))
+
+    @property
+    def pressure(self) -> np.ndarray:
+        return self._get('pressure', lambda: np.where(self.owned, self.threat / np.maximum(self.troops, 1), 0.0))
+
+    def _get_completion(self, countries: np.ndarray) -> np.ndarray:
+        layout = self.layout
+
+        return np.bincount(layout.continent_of, weights=countries, minlength=len(layout.continent_names)) / layout.continent_sizes
+
+    @property
+    def continent_completion(self) -> np.ndarray:
+        return self._get('continent_completion', lambda: self._get_completion(self.owned))
+
+    @property
+    def enemy_continent_completion(self) -> np.ndarray:
+        return self._get('enemy_continent_completion', lambda: self._get_completion(self._enemy))
+
+    @property
+    def army_ratio(self) -> float:
+        def compute():
+            total_troops = self.troops.sum()
+            return float(self.troops[self.owned].sum() / total_troops) if total_troops > 0 else 0.0
+
+        return self._get('army_ratio', compute)
+
+def evaluate_board(view, layout: BoardLayout) -> BoardEvaluation:
+    """Evaluate the board seen by a player.
+
+    Every sum over the neighbours of the countries is a single `bincount`
+    over the borders of the layout, a product of the sparse adjacency
+    matrix with a vector of the board, so each feature is O(n + borders) in
+    numpy, whatever the size of the world.
+
+    Parameters
+    ----------
+    view : StateView
+        The game seen by the player.
+    layout : BoardLayout
+        The layout of the topology of the view.
+
+    Returns
+    -------
+    BoardEvaluation
+    """
+
+    return BoardEvaluation(view, layout)
@@ -0,0 +1,334 @@
+import math
+import random
+import sqlite3
+from pathlib import Path
+
+from game_state import GameState
+
+# Actions are ints, `attacker_id << 16 | attacked_id` for a blitz
+PASS = -1
+
+def encode_attack(attacker: int, attacked: int) -> int:
+    return attacker << 16 | attacked
+
+def decode_attack(action: int) -> tuple:
+    return action >> 16, action & 0xFFFF
+
+def _to_signed(key: int) -> int:
+    """SQLite ints are signed 64 bits."""
+
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+class TreeStore:
+    """Statistics of the edges of the search tree, kept in a SQLite database.
+
+    The edges of a node are read from the database the first time the node
+    is visited and cached in memory, so a decision never reads more than
+    the nodes it visits, however big the tree is. Updates are accumulated
+    and added to the database by `flush`, so agents sharing a database
+    merge their statistics instead of overwriting each other.
+
+    Parameters
+    ----------
+    path : Path
+        The database file, created if it does not exist.
+    """
+
+    def __init__(self, path: Path):
+        self.connection = sqlite3.connect(str(path), timeout=60)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS edges ('
+            'node INTEGER, action INTEGER, visits INTEGER, value REAL, '
+            'PRIMARY KEY (node, action)) WITHOUT ROWID'
+            )
+        self.edges = {}
+        self.pending = {}
+
+    def get_edges(self, node: int) -> dict:
+        """Get the edges leaving a node.
+
+        Parameters
+        ----------
+        node : int
+            The key of the node.
+
+        Returns
+        -------
+        dict
+            A dict with the actions as keys and `[visits, value]` as values.
+        """
+
+        edges = self.edges.get(node)
+
+        if edges is None:
+            rows = self.connection.execute('SELECT action, visits, value FROM edges WHERE node = ?', (_to_signed(node),))
+            edges = {action: [visits, value] for action, visits, value in rows}
+            self.edges[node] = edges
+
+        return edges
+
+    def update(self, node: int, action: int, reward: float):
+        """Count a visit of an edge.
+
+        Parameters
+        ----------
+        node : int
+        action : int
+        reward : float
+        """
+
+        stats = self.get_edges(node).setdefault(action, [0, 0.0])
+        stats[0] += 1
+        stats[1] += reward
+
+        pending = self.pending.setdefault((node, action), [0, 0.0])
+        pending[0] += 1
+        pending[1] += reward
+
+    def flush(self):
+        """Add the pending updates to the database."""
+
+        rows = [(_to_signed(node), action, visits, value)
+                for (node, action), (visits, value)
+                in self.pending.items()]
+
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO edges VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (node, action) DO UPDATE SET '
+                'visits = visits + excluded.visits, value = value + excluded.value',
+                rows
+                )
+
+        self.pending = {}
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+class MCTS:
+    """Monte Carlo tree search over the attacks of a player's turn.
+
+    Nodes are the states where the player is attacking, identified by the
+    Zobrist hash of the board and of the turn, so the same position reached
+    by different paths or in different games shares its statistics. Each
+    simulation walks down the tree with UCT on a clone of the state until it
+    adds a new edge, then plays the game ahead with a fast default policy
+    for `rollout_turns` turns and scores the position reached.
+
+    Parameters
+    ----------
+    player : {1, 2}
+        The id of the player searching.
+    store : TreeStore
+        Where the statistics of the tree are kept.
+    n_simulations : int, default 100
+        Simulations run for each decision.
+    rollout_turns : int, default 2
+        Turns played by the default policy after leaving the tree.
+    exploration : float, default sqrt(2)
+        The exploration constant of UCT.
+    rng : random.Random, optional
+        The generator of the search and of the simulated dices.
+    """
+
+    def __init__(
+            self,
+            player: int,
+            store: TreeStore,
+            n_simulations: int = 100,
+            rollout_turns: int = 2,
+            exploration: float = math.sqrt(2),
+            rng: random.Random = None
+        ):
+        self.player = player
+        self.store = store
+        self.n_simulations = n_simulations
+        self.rollout_turns = rollout_turns
+        self.exploration = exploration
+        self.rng = rng if rng is not None else random.Random()
+
+    def get_key(self, state: GameState) -> int:
+        """Hash a state.
+
+        Parameters
+        ----------
+        state : GameState
+
+        Returns
+        -------
+        int
+        """
+
+        return state.get_key()
+
+    def get_attacks(self, state: GameState, only_favourable: bool = False) -> list:
+        """List the blitzes the active player can do.
+
+        Parameters
+        ----------
+        state : GameState
+        only_favourable : bool, default False
+            True to only list attacks with more troops than the attacked
+            country.
+
+        Returns
+        -------
+        list
+            A list of actions.
+        """
+
+        player = state.active
+        owners = state.owners
+        troops = state.troops
+        offsets = state.world.adjacency_offsets
+        adjacency = state.world.adjacency
+        attacks = []
+
+        for country in range(len(owners)):
+            if owners[country] != player or troops[country] < 2:
+                continue
+            for neighbour in adjacency[offsets[country]:offsets[country + 1]]:
+                if owners[neighbour] != player and (not only_favourable or troops[country] > troops[neighbour]):
+                    attacks.append(encode_attack(country, neighbour))
+
+        return attacks
+
+    def search(self, state: GameState) -> int:
+        """Choose the action of the player in a state where it is attacking.
+
+        Parameters
+        ----------
+        state : GameState
+
+        Returns
+        -------
+        int
+            `PASS` or a blitz encoded by `encode_attack`.
+        """
+
+        for _ in range(self.n_simulations):
+            self._simulate(state.clone())
+
+        edges = self.store.get_edges(self.get_key(state))
+        actions = [PASS] + self.get_attacks(state)
+
+        return max(actions, key=lambda action: edges.get(action, (0,))[0])
+
+    def _select(self, node: int, actions: list) -> tuple:
+        """Choose the action to follow from a node with UCT.
+
+        Returns
+        -------
+        tuple
+            `(action, is_new)`, is_new is True if the edge was never visited.
+        """
+
+        edges = self.store.get_edges(node)
+        unvisited = [action for action in actions if action not in edges]
+
+        if unvisited:
+            return self.rng.choice(unvisited), True
+
+        log_total = math.log(sum(edges[action][0] for action in actions))
+
+        def uct(action):
+            visits, value = edges[action]
+            return value / visits + self.exploration * math.sqrt(log_total / visits)
+
+        return max(actions, key=uct), False
+
+    def _simulate(self, state: GameState):
+        """Run a simulation from a state, updating the tree."""
+
+        path = []
+
+        while state.winner is None and state.active == self.player and state.states[self.player] == 'attacking':
+            node = self.get_key(state)
+            action, is_new = self._select(node, [PASS] + self.get_attacks(state))
+            path.append((node, action))
+
+            if action == PASS:
+                state.apply('pass_turn', [])
+            else:
+                state.apply('blitz', [3, *decode_attack(action)])
+                if state.states[self.player] == 'conquering':
+                    self._conquer(state)
+
+            if is_new:
+                break
+
+        reward = self._rollout(state)
+
+        for node, action in path:
+            self.store.update(node, action, reward)
+
+    def _conquer(self, state: GameState):
+        """Move troops into a conquered country, all of them if it borders\\
+        enemies."""
+
+        attacker, attacked = state.last_attack
+        world = state.world
+        player = state.active
+
+        has_enemies = any(state.owners[neighbour] != player
+                          for neighbour
+                          in world.adjacency[world.adjacency_offsets[attacked]:world.adjacency_offsets[attacked + 1]])
+
+        n_troops = state.troops[attacker] - 1 if has_enemies else 0
+        state.apply('move_troops', [n_troops, attacker, attacked])
+
+    def _play_default_policy(self, state: GameState):
+        """Take a cheap action for the active player."""
+
+        player = state.active
+        player_state = state.states[player]
+
+        if player_state == 'mobilizing':
+            if state.n_new_troops[player] == 0:
+                state.apply('pass_turn', [])
+                return
+            attacks = self.get_attacks(state)
+            if attacks:
+                country, _ = decode_attack(self.rng.choice(attacks))
+            else:
+                country = self.rng.choice([country for country, owner in enumerate(state.owners) if owner == player])
+            state.apply('set_new_troops', [state.n_new_troops[player], country])
+
+        elif player_state == 'attacking':
+            attacks = self.get_attacks(state, only_favourable=True)
+            if attacks:
+                state.apply('blitz', [3, *decode_attack(self.rng.choice(attacks))])
+            else:
+                state.apply('pass_turn', [])
+
+        elif player_state == 'conquering':
+            self._conquer(state)
+
+        else:
+            state.apply('pass_turn', [])
+
+    def _rollout(self, state: GameState) -> float:
+        """Play ahead with the default policy and score the state reached.
+
+        Returns
+        -------
+        float
+            1 if the player won, -1 if it lost and the share of countries
+            and troops of the player scaled to [-1, 1] otherwise.
+        """
+
+        end_turn = state.turn + self.rollout_turns
+
+        while state.winner is None and state.turn < end_turn:
+            self._play_default_policy(state)
+
+        if state.winner is not None:
+            return 1.0 if state.winner == self.player else -1.0
+
+        enemy = 3 - self.player
+        country_share = state.n_countries[self.player] / len(state.owners)
+        total_troops = state.n_total_troops[self.player] + state.n_total_troops[enemy]
+        troop_share = state.n_total_troops[self.player] / total_troops if total_troops else 0.5
+
+        return country_share + troop_share - 1
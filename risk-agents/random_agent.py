@@ -1,85 +1,54 @@
+from agent_base import AgentBase
 import sys
-import json
-import os
 import random
-import time
-from pathlib import Path
 
-class Agent():
+class Agent(AgentBase):
     # This agent is made for basic tests. He makes random actions just to test all the game methods.
-    
-    state = 'waiting' # states may be: waiting | attacking | conquering | fortifying | mobilizing 
-    player_data = {}
 
-    def __init__(self, id):
-        self.id = int(id)
+    def __init__(self, id: int, headless: bool = False, transport: str = 'file'):
+        super().__init__(id, headless, transport)
 
-        self.calls_path = Path('Calls/player_' + str(id) + '.json')
-        self.data_path = Path('Logs/player_' + str(id) + '.json')
-
-        self.last_time = os.path.getmtime(self.data_path)
-
-        self.player_data_count = 0
-
-        self.call_data = {
-            'id': id,
-            'count': 0,
-            'command': {
-                'name': '',
-                'args': []
-        }  
-    }
-
-    def wait_game(self):
+    def mobilize(self):
         """
-        wait until data_path is updated
+        Randomly distribute troops among owned countries until player has 0 new troops, then pass the turn, all in a single call
         """
-        current_time = os.path.getmtime(self.data_path)
-
-        last_count = self.player_data_count
+        view = self.state_view
+        commands = []
+        n_new_troops = view.n_new_troops
 
-        while True:
-            while self.last_time == current_time:
-                current_time = os.path.getmtime(self.data_path)
+        while n_new_troops > 0:
+            n_troops = random.randint(1, n_new_troops)
+            commands.append({'name': 'set_new_troops', 'args': [n_troops, view.names[random.choice(view.countries_owned)]]})
+            n_new_troops -= n_troops
 
-            self.last_time = os.path.getmtime(self.data_path)
+        commands.append({'name': 'pass_turn', 'args': []})
 
-            if self._file_changed(last_count):
-                break
-
-    def mobilize(self):
-        """
-        Randomly distribute troops among owned countries until player has 0 new troops
-        """
-        if(self.player_data['n_new_troops'] == 0):
-            self._call_action('pass_turn', [])
-        else:
-            action = 'set_new_troops'
-            args = [random.randint(1, self.player_data['n_new_troops']), random.choice(self.player_data['countries_owned'])]
-            self._call_action(action, args)
+        self._call_action('batch', commands)
 
     def attack(self):
+        view = self.state_view
+        troops = view.troops
 
-        list_borders = list(self.player_data['border_countries'].keys())
+        list_borders = sorted(view.frontier)
 
         random.shuffle(list_borders)
 
-        for country_name in list_borders:
-            for enemy_name in self.player_data['border_countries'][country_name]:
+        for country in list_borders:
+            for enemy in view.enemy_neighbours(country):
 
-                if self.player_data['countries_data'][country_name]['n_troops'] > 1:
-                    #if self.player_data['countries_data'][country_name]['n_troops'] > self.player_data['countries_data'][enemy_name]['n_troops']:
+                if troops[country] > 1:
+                    #if troops[country] > troops[enemy]:
 
                     action = 'attack'
 
-                    if self.player_data['countries_data'][country_name]['n_troops'] == 2:
+                    if troops[country] == 2:
                         n_dice = 1
-                    elif self.player_data['countries_data'][country_name]['n_troops'] == 3:
+                    elif troops[country] == 3:
                         n_dice = 2
-                    elif self.player_data['countries_data'][country_name]['n_troops'] >= 4:
+                    elif troops[country] >= 4:
                         n_dice = 3
                     
-                    args = [n_dice, country_name, enemy_name]
+                    args = [n_dice, view.names[country], view.names[enemy]]
                     self._call_action(action, args)
                     return
 
@@ -92,7 +61,7 @@ class Agent():
         from_country = self.call_data['command']['args'][1]
         to_country = self.call_data['command']['args'][2]
 
-        n_available_troops = self.player_data['countries_data'][from_country]['n_troops']
+        n_available_troops = self.state_view.troops[self.state_view.ids[from_country]]
 
         action = 'move_troops'
         args = [random.randrange(n_available_troops), from_country, to_country]
@@ -103,107 +72,32 @@ class Agent():
         """
         This bot does fortify already
         """
+        view = self.state_view
+        troops = view.troops
+
         country_1 = None
         for _ in range(10):
-            country_1 = random.choice(self.player_data['countries_owned'])
-            if self.player_data['countries_data'][country_1]['n_troops'] > 1:
+            country_1 = random.choice(view.countries_owned)
+            if troops[country_1] > 1:
                 break
             country_1 = None
         
         if country_1 != None:
-            for country_2 in self.player_data['countries_owned']:
+            for country_2 in view.countries_owned:
                 if country_1 == country_2:
                     continue
-                elif self.player_data['connection_matrix'][country_1][country_2] == True:
+                elif view.get_component(country_1) == view.get_component(country_2):
                     action = 'move_troops'
-                    n_troops = random.randrange(self.player_data['countries_data'][country_1]['n_troops'])
-                    args = [n_troops, country_1, country_2]
+                    n_troops = random.randrange(troops[country_1])
+                    args = [n_troops, view.names[country_1], view.names[country_2]]
                     self._call_action(action, args)
                     return
             
         self._pass_turn()
 
-    def _file_changed(self, last_count):
-        while True:
-            try:
-                with open(self.data_path) as openfile:
-                    data = json.load(openfile)
-                    if data["count"] == last_count:
-                        #print("Atualizou sem precisar")
-                        return False
-                    else:
-                        self.player_data_count = data["count"]
-                        self._get_game_data(data)
-                        return True
-            except:
-                pass
-
-    def _get_game_data(self, data):
-        self.player_data = data
-        self.state = self.player_data['state']
-
-
-    def _call_action(self, action: str, args: list):
-        # print('Next move')
-        # input()
-        with open(self.calls_path, 'w') as outfile:
-            self.call_data = {
-                'id': self.id,
-                'count': self.call_data['count'] + 1,
-                'command': {
-                    'name': action,
-                    'args': args
-                }  
-            }
-
-            json_obj = json.dumps(self.call_data)
-
-            outfile.write(json_obj)
-
-        self.state = 'waiting'
-
-        # self._log()
-
-    def _pass_turn(self):
-        self._call_action('pass_turn', [])
-
-    def _log(self):
-        if self.call_data['command']['name'] == 'attack':
-            print('Attacked', self.call_data['command']['args'][2], 'with', self.call_data['command']['args'][1], 'using', self.call_data['command']['args'][0], 'troops')
-        elif self.call_data['command']['name'] == 'move_troops':
-            print('Moved', self.call_data['command']['args'][0], 'troops from', self.call_data['command']['args'][1], 'to', self.call_data['command']['args'][2])
-        elif self.call_data['command']['name'] == 'set_new_troops':
-            print('Setted', self.call_data['command']['args'][0], 'new troops in', self.call_data['command']['args'][1])
-        elif self.call_data['command']['name'] == 'pass_turn':
-            print('Passed the turn')
-        
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Please pass your player id as argument")
-        quit()
-
-    if int(sys.argv[1]) != 1 and int(sys.argv[1]) != 2:
-        print("Please choose between id 1 or 2")
-        quit()
-
-    agent = Agent(sys.argv[1])
-
-    while True:
-        if agent.state == 'waiting':
-            agent.wait_game()
-        elif agent.state == 'attacking':
-            agent.attack()
-        elif agent.state == 'conquering':
-            agent.conquer()
-        elif agent.state == 'fortifying':
-            agent.fortify()
-        elif agent.state == 'mobilizing':
-            agent.mobilize()
-        elif agent.state == 'winner':
-            #print('I am surprised this actualy worked')
-            quit()
-        elif agent.state == 'loser':
-            #print('This was expected')
-            quit()
-        else:
-            print('State unknown')
\ No newline at end of file
+    id = AgentBase.read_id(sys.argv)
+
+    agent = Agent(id, transport=AgentBase.read_transport(sys.argv))
+
+    agent.play()
@@ -0,0 +1,43 @@
+import random
+import hashlib
+
+def derive_seed(seed: int, *names) -> int:
+    """Derive an independent seed from a seed and the names of a stream.
+
+    The same seed and names always give the same derived seed, and
+    different names give unrelated ones, so a single seed can be split in
+    as many streams as needed, and each stream split again, e.g.
+    `derive_seed(seed, 'game', 3)` for the fourth game of a run and
+    `derive_seed(derive_seed(seed, 'game', 3), 'combat')` for its dices.
+
+    Parameters
+    ----------
+    seed : int
+    names
+        Strs or ints naming the stream.
+
+    Returns
+    -------
+    int
+        A 64 bits seed.
+    """
+
+    key = ':'.join(map(str, (seed, *names))).encode()
+
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+def get_rng(seed: int, *names) -> random.Random:
+    """Create the generator of a stream, see `derive_seed`.
+
+    Parameters
+    ----------
+    seed : int
+    names
+        Strs or ints naming the stream.
+
+    Returns
+    -------
+    random.Random
+    """
+
+    return random.Random(derive_seed(seed, *names))
@@ -0,0 +1,531 @@
+import json
+import time
+import struct
+from array import array
+from collections.abc import Mapping
+from multiprocessing import shared_memory, resource_tracker
+
+from binary_protocol import STATES
+
+# seq, n_countries, n_continents, static_size, call_capacity
+HEADER = struct.Struct('=QIIII')
+
+# count, state, n_new_troops, n_total_troops of each player
+N_COUNTERS = 4
+
+# seq and size of the last call of a player
+CALL_HEADER = struct.Struct('=QI4x')
+
+# Seconds a wait only gives up the time slice between two polls, to answer
+# fast, before sleeping `POLL_INTERVAL` between them, to leave the core to
+# the other processes while the other side thinks
+SPIN_TIME = 0.001
+POLL_INTERVAL = 0.0005
+
+def _align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+def _pause(start: float):
+    """Pause between two polls of a wait started at `start`, see\\
+    `SPIN_TIME`."""
+
+    time.sleep(0 if time.monotonic() - start < SPIN_TIME else POLL_INTERVAL)
+
+class SharedBoard:
+    """The live game state in a block of shared memory, written by the game\\
+    and copied by the agents.
+
+    The block has a fixed layout, every part aligned to 8 bytes:
+    - the header: a sequence number, the number of countries and continents
+    and the sizes of the static data and of the call areas.
+    - the counters of each player: count, state, new troops and total troops.
+    - a call area for each player, where its agent writes the json of its
+    calls, with a sequence number and a size, see `send_call`.
+    - the owner (int8) and troops (int32) of every country and the owner of
+    every continent (int8, 0 for no owner), indexed by id.
+    - the component of every country for each player (int32, -1 if not
+    owned by the player).
+    - the static data in json: the names, neighbours and continents.
+
+    The game is the only writer of the state and updates it as a seqlock:
+    the sequence number is odd while it is being written, so a reader has a
+    complete state when the sequence number is even and did not change
+    during its copy, see `read`. Ints are in the byte order of the host.
+
+    Use `create` on the game side and `attach` on the agent side.
+
+    Parameters
+    ----------
+    shm : shared_memory.SharedMemory
+        The block, already initialized by `create`.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+
+        buf = shm.buf
+        _, n_countries, n_continents, static_size, call_capacity = HEADER.unpack_from(buf)
+
+        self.n_countries = n_countries
+        self.n_continents = n_continents
+        self.call_capacity = call_capacity
+        self._views = []
+
+        offset = 0
+        self.seq = self._view(offset, 8, 'Q')
+        offset = _align(HEADER.size)
+        self.counters = self._view(offset, 2 * N_COUNTERS * 4, 'i')
+        offset = _align(offset + 2 * N_COUNTERS * 4)
+
+        self.call_offsets = []
+        self.call_seqs = []
+        self.call_sizes = []
+        for _ in range(2):
+            self.call_offsets.append(offset)
+            # Views, so the sequence numbers are written as a whole
+            self.call_seqs.append(self._view(offset, 8, 'Q'))
+            self.call_sizes.append(self._view(offset + 8, 4, 'I'))
+            offset = _align(offset + CALL_HEADER.size + call_capacity)
+
+        self.owners = self._view(offset, n_countries, 'b')
+        offset = _align(offset + n_countries)
+        self.troops = self._view(offset, 4 * n_countries, 'i')
+        offset = _align(offset + 4 * n_countries)
+        self.continent_owners = self._view(offset, n_continents, 'b')
+        offset = _align(offset + n_continents)
+        self.components = self._view(offset, 2 * 4 * n_countries, 'i')
+        offset = _align(offset + 2 * 4 * n_countries)
+
+        self.static_data = json.loads(bytes(buf[offset:offset + static_size]))
+
+    @staticmethod
+    def get_size(n_countries: int, n_continents: int, static_size: int, call_capacity: int) -> int:
+        """Get the size of the block of a world."""
+
+        return (_align(HEADER.size)
+                + _align(2 * N_COUNTERS * 4)
+                + 2 * _align(CALL_HEADER.size + call_capacity)
+                + _align(n_countries)
+                + _align(4 * n_countries)
+                + _align(n_continents)
+                + _align(2 * 4 * n_countries)
+                + static_size)
+
+    def _view(self, offset: int, size: int, format: str) -> memoryview:
+        part = self.shm.buf[offset:offset + size]
+        view = part.cast(format)
+        # Both must be released before closing the block
+        self._views += [view, part]
+
+        return view
+
+    @classmethod
+    def create(cls, name: str, world, call_capacity: int = 4096) -> 'SharedBoard':
+        """Create the block of a world, replacing a stale one.
+
+        Parameters
+        ----------
+        name : str
+            The name of the block, the agents attach to it by name.
+        world : World
+        call_capacity : int, default 4096
+            The largest call in bytes an agent can write.
+
+        Returns
+        -------
+        SharedBoard
+        """
+
+        static_payload = json.dumps({
+            'names': [country.name for country in world.country_list],
+            'neighbours': [[neighbour.name for neighbour in country.neighbours]
+                           for country
+                           in world.country_list],
+            'continents': [[continent.name, continent.extra_armies, [country.name for country in continent.countries]]
+                           for continent
+                           in world.continents]
+        }).encode()
+
+        n_countries = len(world.country_list)
+        n_continents = len(world.continents)
+        size = cls.get_size(n_countries, n_continents, len(static_payload), call_capacity)
+
+        try:
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+
+        shm = shared_memory.SharedMemory(name, create=True, size=size)
+        HEADER.pack_into(shm.buf, 0, 0, n_countries, n_continents, len(static_payload), call_capacity)
+        shm.buf[size - len(static_payload):size] = static_payload
+
+        board = cls(shm)
+        board.components[:] = memoryview(b'\xff' * len(board.components) * 4).cast('i')
+
+        return board
+
+    @classmethod
+    def attach(cls, name: str, timeout: float = 30) -> 'SharedBoard':
+        """Open the block created by the game, waiting for it to be created.
+
+        Parameters
+        ----------
+        name : str
+        timeout : float, default 30
+            Seconds to wait for the game before giving up.
+
+        Returns
+        -------
+        SharedBoard
+        """
+
+        deadline = time.monotonic() + timeout
+
+        while True:
+            try:
+                shm = shared_memory.SharedMemory(name)
+                break
+            except FileNotFoundError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+        # The block belongs to the game, it must not be removed when the
+        # agent exits
+        resource_tracker.unregister(shm._name, 'shared_memory')
+
+        return cls(shm)
+
+    def write(self, owners, troops, continent_owners: list, players: list):
+        """Replace the state, as a single update for the readers.
+
+        Parameters
+        ----------
+        owners : array
+            The id of the owner of each country, typecode 'b'.
+        troops : array
+            The troops on each country, typecode 'i'.
+        continent_owners : list
+            The id of the owner of each continent, 0 if it has no owner.
+        players : list
+            For player 1 and 2, `(count, state, n_new_troops, n_total_troops,
+            components)` where components is a dict with the country ids
+            owned by the player as keys and their component id as values.
+        """
+
+        # Odd while the state is being written, see `read`
+        self.seq[0] += 1
+
+        self.owners[:] = owners
+        self.troops[:] = troops
+        self.continent_owners[:] = array('b', continent_owners)
+
+        n_countries = self.n_countries
+
+        for i, (_, _, _, _, components) in enumerate(players):
+            offset = i * n_countries
+            for country_id in range(n_countries):
+                self.components[offset + country_id] = components.get(country_id, -1)
+
+        for i, (count, state, n_new_troops, n_total_troops, _) in enumerate(players):
+            self.counters[i * N_COUNTERS:(i + 1) * N_COUNTERS] = memoryview(
+                struct.pack('=4i', count, STATES.index(state), n_new_troops, n_total_troops)
+                ).cast('i')
+
+        self.seq[0] += 1
+
+    def wait_update(self, last_seq: int) -> int:
+        """Wait until the state is complete and newer than a sequence number.
+
+        Parameters
+        ----------
+        last_seq : int
+
+        Returns
+        -------
+        int
+            The sequence number of the state.
+        """
+
+        start = time.monotonic()
+
+        while True:
+            seq = self.seq[0]
+            if seq % 2 == 0 and seq != last_seq:
+                return seq
+            _pause(start)
+
+    def read(self, last_seq: int) -> tuple:
+        """Wait for a state newer than a sequence number and copy it.
+
+        The copy is kept only if the sequence number did not change while
+        it was taken, otherwise the game wrote during the copy and it is
+        taken again.
+
+        Parameters
+        ----------
+        last_seq : int
+
+        Returns
+        -------
+        tuple
+            `(seq, counters, owners, troops, continent_owners, components)`,
+            the arrays being copies with the typecodes of the block.
+        """
+
+        while True:
+            seq = self.wait_update(last_seq)
+            state = (
+                array('i', self.counters),
+                array('b', self.owners),
+                array('i', self.troops),
+                array('b', self.continent_owners),
+                array('i', self.components)
+                )
+            if self.seq[0] == seq:
+                return (seq, *state)
+
+    def send_call(self, player_id: int, payload: bytes):
+        """Write the call of an agent.
+
+        The sequence number of the call area is a seqlock like the one of
+        the state: it is odd while the size and the payload are written.
+
+        Parameters
+        ----------
+        player_id : {1, 2}
+        payload : bytes
+        """
+
+        if len(payload) > self.call_capacity:
+            raise ValueError(f"The call has {len(payload)} bytes, the most is {self.call_capacity}")
+
+        seqs = self.call_seqs[player_id - 1]
+        start = self.call_offsets[player_id - 1] + CALL_HEADER.size
+
+        seqs[0] += 1
+        self.call_sizes[player_id - 1][0] = len(payload)
+        self.shm.buf[start:start + len(payload)] = payload
+        # Publish the call only once it is written
+        seqs[0] += 1
+
+    def recv_call(self, player_id: int, last_seq: int) -> tuple:
+        """Wait for a call of an agent newer than a sequence number.
+
+        Parameters
+        ----------
+        player_id : {1, 2}
+        last_seq : int
+
+        Returns
+        -------
+        tuple
+            `(seq, payload)`.
+        """
+
+        seqs = self.call_seqs[player_id - 1]
+        sizes = self.call_sizes[player_id - 1]
+        offset = self.call_offsets[player_id - 1] + CALL_HEADER.size
+        start = time.monotonic()
+
+        while True:
+            seq = seqs[0]
+            if seq % 2 == 0 and seq != last_seq:
+                payload = bytes(self.shm.buf[offset:offset + sizes[0]])
+                # The agent wrote again during the copy
+                if seqs[0] == seq:
+                    return seq, payload
+            _pause(start)
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+class _CountryView(Mapping):
+    """The data of a country in the shared board, as in `countries_data`."""
+
+    __slots__ = ('data', 'id', 'neighbours')
+
+    def __init__(self, data: 'PlayerDataView', id: int, neighbours: list):
+        self.data = data
+        self.id = id
+        self.neighbours = neighbours
+
+    def __getitem__(self, key: str):
+        if key == 'owner':
+            return self.data.owners[self.id]
+        if key == 'n_troops':
+            return self.data.troops[self.id]
+        if key == 'neighbours':
+            return self.neighbours
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(('neighbours', 'owner', 'n_troops'))
+
+    def __len__(self) -> int:
+        return 3
+
+class _ContinentView(Mapping):
+    """The data of a continent in the shared board, as in `continents_data`."""
+
+    __slots__ = ('data', 'id', 'extra_armies', 'countries')
+
+    def __init__(self, data: 'PlayerDataView', id: int, extra_armies: int, countries: list):
+        self.data = data
+        self.id = id
+        self.extra_armies = extra_armies
+        self.countries = countries
+
+    def __getitem__(self, key: str):
+        if key == 'owner':
+            return self.data.continent_owners[self.id] or None
+        if key == 'extra_armies':
+            return self.extra_armies
+        if key == 'countries':
+            return self.countries
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(('owner', 'extra_armies', 'countries'))
+
+    def __len__(self) -> int:
+        return 3
+
+class PlayerDataView(Mapping):
+    """A read-only view of the player data of a player in a `SharedBoard`.
+
+    It has the keys of the player data sent by the other transports and
+    reads the last state copied from the shared memory by `read`, so the
+    game writing the next state never changes what the agent is reading.
+    `countries_owned`, `border_countries` and `components` are derived
+    from the owners, in a pass over every country and its neighbours the
+    first time one of them is read after each `read`.
+
+    Parameters
+    ----------
+    board : SharedBoard
+    id : {1, 2}
+        The id of the player.
+    """
+
+    KEYS = (
+        'count',
+        'id',
+        'n_new_troops',
+        'n_total_troops',
+        'enemy_n_total_troops',
+        'state',
+        'countries_owned',
+        'countries_data',
+        'border_countries',
+        'components',
+        'continents_data'
+    )
+
+    def __init__(self, board: SharedBoard, id: int):
+        self.board = board
+        self.id = id
+
+        static_data = board.static_data
+        self.names = static_data['names']
+        ids = {name: country_id for country_id, name in enumerate(self.names)}
+        self.neighbour_ids = [[ids[neighbour] for neighbour in neighbours]
+                              for neighbours
+                              in static_data['neighbours']]
+
+        self.countries_data = {
+            name: _CountryView(self, country_id, neighbours)
+            for country_id, (name, neighbours)
+            in enumerate(zip(self.names, static_data['neighbours']))
+        }
+        self.continents_data = {
+            name: _ContinentView(self, continent_id, extra_armies, countries)
+            for continent_id, (name, extra_armies, countries)
+            in enumerate(static_data['continents'])
+        }
+
+        self.seq = 0
+        self.counters = None
+        self.owners = None
+        self.troops = None
+        self.continent_owners = None
+        self.components = None
+        self._derived = None
+
+    def read(self):
+        """Wait for a state newer than the last one read and copy it, see\
+        `SharedBoard.read`."""
+
+        (self.seq, self.counters, self.owners, self.troops,
+         self.continent_owners, self.components) = self.board.read(self.seq)
+        self._derived = None
+
+    def _get_counter(self, player_id: int, i: int) -> int:
+        return self.counters[(player_id - 1) * N_COUNTERS + i]
+
+    def _get_derived(self) -> tuple:
+        """Compute `(countries_owned, border_countries, components)` of the\\
+        current state."""
+
+        if self._derived is None:
+            owners = self.owners
+            components = self.components
+            offset = (self.id - 1) * self.board.n_countries
+            countries_owned = []
+            border_countries = {}
+            labels = {}
+
+            for country_id, name in enumerate(self.names):
+                if owners[country_id] != self.id:
+                    continue
+                countries_owned.append(name)
+                labels[name] = components[offset + country_id]
+                enemies = [self.names[neighbour]
+                           for neighbour
+                           in self.neighbour_ids[country_id]
+                           if owners[neighbour] != self.id]
+                if enemies:
+                    border_countries[name] = enemies
+
+            self._derived = (countries_owned, border_countries, labels)
+
+        return self._derived
+
+    def __getitem__(self, key: str):
+        if key == 'count':
+            return self._get_counter(self.id, 0)
+        if key == 'id':
+            return self.id
+        if key == 'state':
+            return STATES[self._get_counter(self.id, 1)]
+        if key == 'n_new_troops':
+            return self._get_counter(self.id, 2)
+        if key == 'n_total_troops':
+            return self._get_counter(self.id, 3)
+        if key == 'enemy_n_total_troops':
+            return self._get_counter(3 - self.id, 3)
+        if key == 'countries_data':
+            return self.countries_data
+        if key == 'continents_data':
+            return self.continents_data
+        if key == 'countries_owned':
+            return self._get_derived()[0]
+        if key == 'border_countries':
+            return self._get_derived()[1]
+        if key == 'components':
+            return self._get_derived()[2]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
@@ -0,0 +1,296 @@
+from array import array
+
+from topology import Topology
+
+class StateView:
+    """A read-only view of the game seen by a player, with countries and\\
+    continents as ints, see `AgentBase.state_view`.
+
+    Country ids are the ids of the topology, the order of the world
+    definition. The sets are computed the first time they are read, and
+    `to_player_data` builds the player data dict of the other agents.
+
+    Parameters
+    ----------
+    topology : Topology
+    count : int
+        The count of the player data.
+    id : {1, 2}
+    state : str
+    n_new_troops : int
+    n_total_troops : int
+    enemy_n_total_troops : int
+    owners : array
+        The id of the owner of each country, typecode 'b', not copied.
+    troops : array
+        The troops on each country, typecode 'i', not copied.
+    countries_owned : tuple
+        The ids of the countries of the player, in the order of the
+        `countries_owned` of the player data.
+    border_countries : dict
+        The `border_countries` of the player data.
+    components : dict
+        The `components` of the player data.
+    continent_owners : tuple
+        The id of the owner of each continent, 0 if it has no owner.
+    frontier_edges : frozenset, optional
+        The `(owned country id, enemy neighbour id)` pairs of
+        `border_countries`, computed from it if not given.
+
+    Attributes
+    ----------
+    owners, troops : memoryview
+        Read-only views of the arrays.
+    """
+
+    __slots__ = ('topology', 'count', 'id', 'enemy_id', 'state', 'n_new_troops',
+                 'n_total_troops', 'enemy_n_total_troops', 'owners', 'troops',
+                 'countries_owned', 'continent_owners', '_border_countries',
+                 '_components', '_owned', '_enemy', '_frontier', '_frontier_edges',
+                 '_component_of')
+
+    def __init__(
+            self,
+            topology: Topology,
+            count: int,
+            id: int,
+            state: str,
+            n_new_troops: int,
+            n_total_troops: int,
+            enemy_n_total_troops: int,
+            owners: array,
+            troops: array,
+            countries_owned: tuple,
+            border_countries: dict,
+            components: dict,
+            continent_owners: tuple,
+            frontier_edges: frozenset = None
+        ):
+        self.topology = topology
+        self.count = count
+        self.id = id
+        self.enemy_id = 2 if id == 1 else 1
+        self.state = state
+        self.n_new_troops = n_new_troops
+        self.n_total_troops = n_total_troops
+        self.enemy_n_total_troops = enemy_n_total_troops
+        self.owners = memoryview(owners).toreadonly()
+        self.troops = memoryview(troops).toreadonly()
+        self.countries_owned = countries_owned
+        self.continent_owners = continent_owners
+        self._border_countries = border_countries
+        self._components = components
+        self._owned = None
+        self._enemy = None
+        self._frontier = None
+        self._frontier_edges = frontier_edges
+        self._component_of = None
+
+    @classmethod
+    def from_player_data(cls, player_data: dict, topology: Topology) -> 'StateView':
+        """Build the view of the player data sent by the game.
+
+        Parameters
+        ----------
+        player_data : dict
+        topology : Topology
+            The topology of the world of the player data, see
+            `World.from_player_data`.
+
+        Returns
+        -------
+        StateView
+        """
+
+        countries_data = player_data['countries_data']
+        names = topology.names
+        ids = topology.ids
+
+        return cls(
+            topology,
+            player_data['count'],
+            player_data['id'],
+            player_data['state'],
+            player_data['n_new_troops'],
+            player_data['n_total_troops'],
+            player_data['enemy_n_total_troops'],
+            array('b', [countries_data[name]['owner'] for name in names]),
+            array('i', [countries_data[name]['n_troops'] for name in names]),
+            tuple(ids[name] for name in player_data['countries_owned']),
+            player_data['border_countries'],
+            player_data['components'],
+            tuple(continent_data['owner'] or 0 for continent_data in player_data['continents_data'].values())
+            )
+
+    @property
+    def n_countries(self) -> int:
+        return len(self.owners)
+
+    @property
+    def names(self) -> list:
+        """The names of the countries, indexed by id."""
+
+        return self.topology.names
+
+    @property
+    def ids(self) -> dict:
+        """The id of each country name."""
+
+        return self.topology.ids
+
+    @property
+    def owned(self) -> frozenset:
+        """The ids of the countries of the player."""
+
+        if self._owned is None:
+            self._owned = frozenset(self.countries_owned)
+
+        return self._owned
+
+    @property
+    def enemy(self) -> frozenset:
+        """The ids of the countries of the enemy."""
+
+        if self._enemy is None:
+            self._enemy = frozenset(range(len(self.owners))) - self.owned
+
+        return self._enemy
+
+    @property
+    def frontier(self) -> frozenset:
+        """The ids of the countries of the player bordering the enemy."""
+
+        if self._frontier is None:
+            ids = self.topology.ids
+            self._frontier = frozenset(ids[name] for name in self._border_countries)
+
+        return self._frontier
+
+    @property
+    def frontier_edges(self) -> frozenset:
+        """The borders between the player and the enemy, as `(owned country\
+        id, enemy neighbour id)` tuples."""
+
+        if self._frontier_edges is None:
+            ids = self.topology.ids
+            self._frontier_edges = frozenset((ids[name], ids[enemy])
+                                             for name, enemies in self._border_countries.items()
+                                             for enemy in enemies)
+
+        return self._frontier_edges
+
+    def neighbours(self, country_id: int) -> tuple:
+        """Get the ids of the neighbours of a country.
+
+        Parameters
+        ----------
+        country_id : int
+
+        Returns
+        -------
+        tuple
+        """
+
+        return self.topology.neighbours[country_id]
+
+    def enemy_neighbours(self, country_id: int):
+        """Iterate over the ids of the neighbours of a country owned by the\\
+        enemy of the player.
+
+        Parameters
+        ----------
+        country_id : int
+
+        Yields
+        ------
+        int
+        """
+
+        owners = self.owners
+        enemy_id = self.enemy_id
+
+        for neighbour in self.topology.neighbours[country_id]:
+            if owners[neighbour] == enemy_id:
+                yield neighbour
+
+    def get_component(self, country_id: int) -> int:
+        """Get the group of countries of the player connected by land a\\
+        country belongs to, see the `components` of the player data.
+
+        Parameters
+        ----------
+        country_id : int
+
+        Returns
+        -------
+        int or None
+            None if the player does not own the country.
+        """
+
+        if self._component_of is None:
+            ids = self.topology.ids
+            self._component_of = {ids[name]: component for name, component in self._components.items()}
+
+        return self._component_of.get(country_id)
+
+    def get_continent(self, country_id: int) -> int:
+        """Get the id of the continent of a country.
+
+        Parameters
+        ----------
+        country_id : int
+
+        Returns
+        -------
+        int
+        """
+
+        return self.topology.country_continent[country_id]
+
+    def to_player_data(self) -> dict:
+        """Build the player data dict the game sends to agents in other\\
+        processes.
+
+        Returns
+        -------
+        dict
+        """
+
+        topology = self.topology
+        names = topology.names
+        owners = self.owners
+        troops = self.troops
+
+        countries_data = {
+            name: {
+                "neighbours": [names[neighbour] for neighbour in topology.neighbours[country_id]],
+                "owner": owners[country_id],
+                "n_troops": troops[country_id]
+            }
+            for country_id, name
+            in enumerate(names)
+        }
+
+        continents_data = {
+            continent_name: {
+                "owner": self.continent_owners[continent_id] or None,
+                "extra_armies": topology.continent_extra_armies[continent_id],
+                "countries": [names[country_id] for country_id in topology.get_continent_countries(continent_id)]
+            }
+            for continent_id, continent_name
+            in enumerate(topology.continent_names)
+        }
+
+        return {
+            "count": self.count,
+            "id": self.id,
+            "n_new_troops": self.n_new_troops,
+            "n_total_troops": self.n_total_troops,
+            "enemy_n_total_troops": self.enemy_n_total_troops,
+            "state": self.state,
+            "countries_owned": [names[country_id] for country_id in self.countries_owned],
+            "countries_data": countries_data,
+            "border_countries": self._border_countries,
+            "components": self._components,
+            "continents_data": continents_data
+        }
@@ -0,0 +1,97 @@
+import unittest
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+
+from combat import get_n_dice, get_roll_outcomes, simulate_battles, get_battle_tables
+
+@lru_cache(maxsize=None)
+def get_exact_victory(attacker_troops: int, defender_troops: int) -> Fraction:
+    """The probability of conquering a country attacking until the end, as\\
+    a fraction built from the outcomes of single rolls."""
+
+    if defender_troops == 0:
+        return Fraction(1)
+    if attacker_troops <= 1:
+        return Fraction(0)
+
+    attacker_dice, defender_dice = get_n_dice(attacker_troops, defender_troops)
+
+    return sum(Fraction(probability).limit_denominator(6 ** 5)
+               * get_exact_victory(attacker_troops - attacker_losses, defender_troops - defender_losses)
+               for attacker_losses, defender_losses, probability
+               in get_roll_outcomes(attacker_dice, defender_dice))
+
+class TestRollOutcomes(unittest.TestCase):
+    """The outcomes of a single roll are the exact ones of the rules."""
+
+    def test_sum(self):
+        for attacker_dice in (1, 2, 3):
+            for defender_dice in (1, 2):
+                outcomes = get_roll_outcomes(attacker_dice, defender_dice)
+
+                self.assertAlmostEqual(sum(probability for _, _, probability in outcomes), 1, places=12)
+                for attacker_losses, defender_losses, _ in outcomes:
+                    self.assertEqual(attacker_losses + defender_losses, min(attacker_dice, defender_dice))
+
+    def test_known_values(self):
+        self.assertEqual(get_roll_outcomes(1, 1), ((0, 1, 15 / 36), (1, 0, 21 / 36)))
+        self.assertEqual(get_roll_outcomes(3, 2), ((0, 2, 2890 / 7776), (1, 1, 2611 / 7776), (2, 0, 2275 / 7776)))
+
+class TestBattleTables(unittest.TestCase):
+    """The battle tables follow from the outcomes of single rolls."""
+
+    def setUp(self):
+        self.tables = get_battle_tables()
+
+    def test_sum(self):
+        tables = self.tables
+        total = tables.attacker_remaining.sum(axis=2) + tables.defender_remaining.sum(axis=2)
+
+        np.testing.assert_allclose(total, 1, atol=1e-12)
+        self.assertTrue((tables.victory[:, 0] == 1).all())
+        self.assertTrue((tables.victory[:2, 1:] == 0).all())
+
+    def test_roll_outcomes(self):
+        for attacker_troops in range(12):
+            for defender_troops in range(12):
+                self.assertAlmostEqual(self.tables.win_probability(attacker_troops, defender_troops),
+                                       float(get_exact_victory(attacker_troops, defender_troops)),
+                                       places=12,
+                                       msg=(attacker_troops, defender_troops))
+
+        self.assertAlmostEqual(self.tables.win_probability(2, 1), 15 / 36)
+
+    def test_expected_losses(self):
+        tables = self.tables
+
+        for attacker_troops, defender_troops in ((2, 1), (5, 3), (10, 8), (30, 12)):
+            attacker_losses, defender_losses = tables.expected_losses(attacker_troops, defender_troops)
+            remaining = np.arange(attacker_troops + 1)
+
+            # Losing leaves a single troop on the attacking country
+            expected_attacker_losses = (attacker_troops
+                                        - tables.attacker_remaining[attacker_troops, defender_troops, :attacker_troops + 1] @ remaining
+                                        - (1 - tables.victory[attacker_troops, defender_troops]))
+            expected_defender_losses = defender_troops - tables.defender_remaining[attacker_troops, defender_troops] @ np.arange(tables.max_defender + 1)
+
+            self.assertAlmostEqual(attacker_losses, expected_attacker_losses)
+            self.assertAlmostEqual(defender_losses, expected_defender_losses)
+            self.assertGreaterEqual(attacker_losses, 0)
+            self.assertLessEqual(defender_losses, defender_troops)
+
+    def test_simulate_battles(self):
+        rng = np.random.default_rng(0)
+        n_battles = 20000
+
+        for attacker_troops, defender_troops in ((2, 1), (5, 3), (10, 8), (12, 15)):
+            attacker, defender = simulate_battles(np.full(n_battles, attacker_troops), defender_troops, rng)
+            victory = self.tables.win_probability(attacker_troops, defender_troops)
+            sigma = np.sqrt(victory * (1 - victory) / n_battles)
+
+            self.assertTrue(((defender == 0) | (attacker == 1)).all())
+            self.assertLess(abs((defender == 0).mean() - victory), 5 * sigma, (attacker_troops, defender_troops))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import random
+import unittest
+from collections import deque
+
+from game import Game
+from player import Player
+from state_view import StateView
+from world import World
+
+def transfer_countries(world: World, players: tuple, rng: random.Random, n_transfers: int):
+    """Give every country to a random player, then move random countries\\
+    from their owner to the other player, yielding after every change."""
+
+    for country in world.country_list:
+        rng.choice(players).gain_country(country)
+
+    yield
+
+    for _ in range(n_transfers):
+        country = rng.choice(world.country_list)
+        owner = country.owner
+        enemy = players[0] if owner is players[1] else players[1]
+        owner.lose_country(country)
+        enemy.gain_country(country)
+
+        yield
+
+def get_components(player: Player) -> list:
+    """The groups of countries of a player connected by land, found by a\\
+    breadth-first search over the whole board."""
+
+    remaining = set(player.countries_owned)
+    components = []
+
+    while remaining:
+        start = remaining.pop()
+        component = {start}
+        queue = deque([start])
+
+        while queue:
+            country = queue.popleft()
+            for neighbour in country.neighbours:
+                if neighbour in remaining:
+                    remaining.remove(neighbour)
+                    component.add(neighbour)
+                    queue.append(neighbour)
+
+        components.append(component)
+
+    return components
+
+class TestComponentIndex(unittest.TestCase):
+    """`ComponentIndex` splits and merges components as a search from\\
+    scratch finds them."""
+
+    def test_transfers(self):
+        for seed in range(5):
+            world = World('worlds/classic.json')
+            players = (Player(1, 0), Player(2, 0))
+
+            for i, _ in enumerate(transfer_countries(world, players, random.Random(seed), 500)):
+                for player in players:
+                    index = player.component_index
+                    message = f'seed {seed}, transfer {i}'
+                    expected = sorted(sorted(country.id for country in component) for component in get_components(player))
+
+                    self.assertEqual(sorted(sorted(country.id for country in members) for members in index.members.values()),
+                                     expected,
+                                     message)
+                    self.assertEqual(set(index.component_of), set(player.countries_owned), message)
+                    self.assertEqual(index.labels, {country.name: id for country, id in index.component_of.items()}, message)
+                    for id, members in index.members.items():
+                        self.assertTrue(all(index.component_of[country] == id for country in members), message)
+
+class TestBorderIndex(unittest.TestCase):
+    """`BorderIndex` keeps the frontier a full scan of the board finds."""
+
+    def test_transfers(self):
+        world = World('worlds/classic.json')
+        players = (Player(1, 0), Player(2, 0))
+
+        for i, _ in enumerate(transfer_countries(world, players, random.Random(0), 500)):
+            for player in players:
+                edges = {(country.id, neighbour.id)
+                         for country in player.countries_owned
+                         for neighbour in country.neighbours
+                         if neighbour.owner is not player}
+                border_countries = player.border_index.border_countries
+
+                self.assertEqual(player.border_index.edges, edges, f'transfer {i}')
+                self.assertEqual({(world.country_dict[name].id, world.country_dict[enemy].id)
+                                  for name, enemies in border_countries.items()
+                                  for enemy in enemies},
+                                 edges,
+                                 f'transfer {i}')
+
+    def test_state_view(self):
+        for seed in range(5):
+            game = Game(agents=[], seed=seed)
+
+            for player in (game.player_1, game.player_2):
+                view = game._create_state_view(player)
+                other = StateView.from_player_data(view.to_player_data(), game.world.topology)
+
+                self.assertEqual(view.frontier_edges, player.border_index.edges)
+                self.assertEqual(other.frontier_edges, view.frontier_edges)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import io
+import random
+import shutil
+import tempfile
+import unittest
+import contextlib
+from pathlib import Path
+
+from game import Game
+from game_record import GameRecordReader
+from test_game_state import random_command, to_names
+
+def get_game_state(game: Game) -> tuple:
+    """What a replay must give back of a game."""
+
+    return (
+        list(game.world.owners),
+        list(game.world.troops),
+        game.turn,
+        game.active_player.id,
+        [player.state for player in (game.player_1, game.player_2)],
+        [player.n_new_troops for player in (game.player_1, game.player_2)],
+        [player.n_total_troops for player in (game.player_1, game.player_2)],
+        game.winner.id if game.winner is not None else None
+    )
+
+def play(path: Path, seed: int, n_actions: int = 600) -> tuple:
+    """Record a game of random commands, valid or not.
+
+    Returns
+    -------
+    tuple
+        `(game, states)` with the state of the game at the start of every
+        turn.
+    """
+
+    rng = random.Random(seed)
+    game = Game(agents=[], seed=seed, record_path=path)
+    game.time_start = 0
+    states = {0: get_game_state(game)}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(n_actions):
+            player = game.active_player
+            name, args = random_command(game.get_state(), rng)
+            player.control.call_count += 1
+            player.control.last_call_data = player.control.call_data
+            player.control.call_data = {'id': player.id, 'count': player.control.call_count, 'command': {'name': name, 'args': to_names(game, name, args)}}
+            game._execute_active_player_action()
+
+            if game._check_for_winner():
+                break
+
+            states.setdefault(game.turn, get_game_state(game))
+
+    game.recorder.close()
+
+    return game, states
+
+class TestGameRecord(unittest.TestCase):
+    """A game read back from its record is the game that was played."""
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_actions(self):
+        for seed in range(5):
+            path = self.directory / f'{seed}.rskr'
+            game, _ = play(path, seed)
+
+            with GameRecordReader(path) as reader:
+                self.assertEqual(reader.seed, seed)
+                self.assertEqual(reader.world_digest, game.world.topology.digest)
+                self.assertEqual(list(reader.actions(names=game.world.topology.names)), game.actions)
+
+            self.assertEqual(get_game_state(Game.replay_file(path)), get_game_state(game))
+
+    def test_seek(self):
+        for seed in range(5):
+            path = self.directory / f'{seed}.rskr'
+            game, states = play(path, seed)
+
+            with GameRecordReader(path) as reader:
+                self.assertGreater(len(reader.index), 1)
+                for snapshot in reader.snapshots():
+                    self.assertEqual(snapshot.turn % reader.snapshot_interval, 0)
+
+                for turn in states:
+                    snapshot = reader.seek(turn)
+                    self.assertLessEqual(snapshot.turn, turn)
+                    self.assertGreater(snapshot.turn + reader.snapshot_interval, turn)
+
+            for turn, state in states.items():
+                self.assertEqual(get_game_state(Game.replay_file(path, turn=turn)), state, f'seed {seed}, turn {turn}')
+
+    def test_unclosed(self):
+        path = self.directory / 'game.rskr'
+        game, _ = play(path, 0)
+
+        with GameRecordReader(path) as reader:
+            end = reader.end
+            index = reader.index
+
+        data = path.read_bytes()
+        rng = random.Random(0)
+
+        # A game that crashed leaves any prefix of the records, without the
+        # index and the footer
+        for size in [end, end - 1, end - 5] + [rng.randrange(100, end) for _ in range(20)]:
+            cut_path = self.directory / f'cut_{size}.rskr'
+            cut_path.write_bytes(data[:size])
+
+            with GameRecordReader(cut_path) as reader:
+                actions = list(reader.actions(names=game.world.topology.names))
+
+                self.assertEqual(reader.index, index[:len(reader.index)], size)
+                self.assertEqual(actions, game.actions[:len(actions)], size)
+                if size == end:
+                    self.assertEqual(reader.index, index)
+                    self.assertEqual(actions, game.actions)
+
+                snapshot = reader.seek(10 ** 6)
+                if snapshot is not None:
+                    self.assertEqual(snapshot.turn, reader.index[-1][0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import io
+import random
+import unittest
+import contextlib
+
+from game import Game
+
+COMMANDS = ('attack', 'blitz', 'move_troops', 'set_new_troops', 'set_new_troops_bulk', 'pass_turn')
+
+def random_command(state, rng: random.Random) -> tuple:
+    """Draw a command of the active player of a `GameState`, often valid\\
+    and sometimes not."""
+
+    world = state.world
+    player = state.active
+    player_state = state.states[player]
+    owned = [country_id for country_id, owner in enumerate(state.owners) if owner == player]
+    country_id = rng.choice(owned) if rng.random() < 0.9 else rng.randrange(len(state.owners))
+    neighbours = list(world.get_neighbour_ids(country_id))
+    other_id = rng.choice(neighbours) if rng.random() < 0.8 else rng.randrange(len(state.owners))
+    n_troops = state.troops[country_id]
+
+    if player_state == 'mobilizing':
+        name = rng.choice(COMMANDS[3:] * 3 + COMMANDS)
+    elif player_state == 'conquering':
+        name = rng.choice(('move_troops',) * 6 + COMMANDS)
+    else:
+        name = rng.choice(COMMANDS)
+
+    if name in ('attack', 'blitz'):
+        args = [rng.randint(0, 5), country_id, other_id]
+    elif name == 'move_troops':
+        if state.last_attack is not None and rng.random() < 0.8:
+            args = list(state.last_attack)
+            n_troops = state.troops[args[0]]
+        else:
+            args = [country_id, rng.choice(owned)]
+        args = [rng.randint(-1, max(n_troops, 0)), *args]
+    elif name == 'set_new_troops':
+        args = [rng.randint(-1, state.n_new_troops[player] + 1), country_id]
+    elif name == 'set_new_troops_bulk':
+        args = [[rng.randint(-1, state.n_new_troops[player] // 2 + 1), rng.choice(owned)] for _ in range(rng.randint(1, 3))]
+    else:
+        args = []
+
+    return name, args
+
+def to_names(game: Game, name: str, args: list) -> list:
+    """Replace the country ids of the args of a command by names."""
+
+    names = game.world.topology.names
+
+    if name == 'set_new_troops_bulk':
+        return [[n_troops, names[country_id]] for n_troops, country_id in args]
+    if name == 'set_new_troops':
+        return [args[0], names[args[1]]]
+    if name == 'pass_turn':
+        return []
+    return [args[0], names[args[1]], names[args[2]]]
+
+class TestGameStateRules(unittest.TestCase):
+    """`GameState` plays the same game as `Game`, valid actions or not."""
+
+    def assert_same(self, game: Game, state, message: str):
+        players = (None, game.player_1, game.player_2)
+
+        self.assertEqual(list(state.owners), list(game.world.owners), message)
+        self.assertEqual(list(state.troops), list(game.world.troops), message)
+        self.assertEqual(state.n_new_troops[1:], [player.n_new_troops for player in players[1:]], message)
+        self.assertEqual(state.n_total_troops[1:], [player.n_total_troops for player in players[1:]], message)
+        self.assertEqual(state.states[1:], [player.state for player in players[1:]], message)
+        self.assertEqual(state.active, game.active_player.id, message)
+        self.assertEqual(state.turn, game.turn, message)
+        self.assertEqual(state.winner, game.winner.id if game.winner is not None else None, message)
+        self.assertEqual(state.hash, game.world.hash, message)
+
+    def test_random_commands(self):
+        for seed in range(40):
+            rng = random.Random(seed)
+            game = Game(agents=[], seed=seed)
+            state_rng = random.Random()
+            state_rng.setstate(game.combat_rng.getstate())
+            state = game.get_state(state_rng)
+
+            for i in range(400):
+                player = game.active_player
+                enemy = game.player_2 if player.id == 1 else game.player_1
+                name, args = random_command(state, rng)
+                message = f'seed {seed}, action {i}: {name} {args} while {player.state}'
+
+                player.control.last_call_data = player.control.call_data
+                player.control.call_data = {'id': player.id, 'count': i + 1, 'command': {'name': name, 'args': to_names(game, name, args)}}
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    is_valid = game._execute_command(player, enemy, name)
+
+                self.assertEqual(state.apply(name, args), is_valid, message)
+                self.assert_same(game, state, message)
+
+                if game.winner is not None:
+                    break
+
+    def test_undo(self):
+        for seed in range(10):
+            rng = random.Random(seed)
+            game = Game(agents=[], seed=seed)
+            state = game.get_state(random.Random(seed))
+            start = (list(state.owners), list(state.troops), state.hash, state.states[1:], state.turn)
+
+            n_actions = 0
+            while n_actions < 200 and state.winner is None:
+                name, args = random_command(state, rng)
+                state.apply(name, args)
+                n_actions += 1
+
+            while state.history:
+                state.undo()
+
+            self.assertEqual((list(state.owners), list(state.troops), state.hash, state.states[1:], state.turn), start)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import io
+import sys
+import random
+import unittest
+import contextlib
+from array import array
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'risk-agents'))
+
+from agent_base import AgentBase
+from binary_protocol import STATES, is_binary, encode_player_data, decode_player_data
+from game import Game
+from test_game_state import random_command, to_names
+
+class QueueTransport:
+    """The messages of the game to an agent, in the order they were sent."""
+
+    def __init__(self):
+        self.payloads = []
+
+    def recv(self) -> bytes:
+        return self.payloads.pop(0)
+
+def get_expected_data(game: Game, player) -> dict:
+    """The whole player data of a player, built from the game."""
+
+    enemy = game.player_2 if player.id == 1 else game.player_1
+
+    return {
+        'count': player.data_count,
+        'id': player.id,
+        'n_new_troops': player.n_new_troops,
+        'n_total_troops': player.n_total_troops,
+        'enemy_n_total_troops': enemy.n_total_troops,
+        'state': player.state,
+        'countries_owned': [country.name for country in player.countries_owned],
+        'countries_data': game._create_countries_data(),
+        'border_countries': player.border_index.border_countries,
+        'components': player.component_index.labels,
+        'continents_data': game._create_continents_data()
+    }
+
+def normalize(data: dict) -> dict:
+    """Drop what the protocols are free to order or number differently: the\\
+    order of the countries owned and of the enemy neighbours, and the ids of
+    the components."""
+
+    components = {}
+    for name, component in data['components'].items():
+        components.setdefault(component, []).append(name)
+
+    return {
+        **data,
+        'countries_owned': sorted(data['countries_owned']),
+        'border_countries': {name: sorted(enemies) for name, enemies in data['border_countries'].items()},
+        'components': sorted(sorted(names) for names in components.values())
+    }
+
+class TestBinaryProtocol(unittest.TestCase):
+    """`decode_player_data` gives back what `encode_player_data` packed."""
+
+    def test_round_trip(self):
+        rng = random.Random(0)
+
+        for n_countries in (1, 7, 8, 9, 42, 1000):
+            owners = array('b', [rng.randint(0, 2) for _ in range(n_countries)])
+            troops = array('i', [rng.randint(-1, 1 << 20) for _ in range(n_countries)])
+            continent_owners = [rng.randint(0, 2) for _ in range(rng.randint(0, 12))]
+            country_ids = [country_id for country_id in range(n_countries) if owners[country_id] == 1]
+            rng.shuffle(country_ids)
+            components = [sorted(country_ids[i:i + 5]) for i in range(0, len(country_ids), 5)]
+            state = rng.choice(STATES)
+
+            payload = encode_player_data(
+                12345, 1, state, 3, -1, 1 << 30, owners, troops, continent_owners,
+                [sum(1 << country_id for country_id in component) for component in components]
+                )
+            data = decode_player_data(payload)
+
+            self.assertTrue(is_binary(payload))
+            self.assertEqual(data, {
+                'count': 12345,
+                'id': 1,
+                'state': state,
+                'n_new_troops': 3,
+                'n_total_troops': -1,
+                'enemy_n_total_troops': 1 << 30,
+                'owners': owners,
+                'troops': troops,
+                'continent_owners': bytes(continent_owners),
+                'components': components
+            })
+
+class TestPlayerDataProtocols(unittest.TestCase):
+    """An agent reading the messages of every protocol rebuilds the same\\
+    player data as the full json."""
+
+    def play(self, protocol: str, seed: int):
+        rng = random.Random(seed)
+        game = Game(agents=[], protocol=protocol, seed=seed)
+        game.time_start = 0
+        players = (game.player_1, game.player_2)
+        agents = [AgentBase(player.id, headless=True) for player in players]
+
+        for agent in agents:
+            agent.transport = QueueTransport()
+
+        for i in range(300):
+            player = game.active_player
+            name, args = random_command(game.get_state(), rng)
+            player.control.last_call_data = player.control.call_data
+            player.control.call_data = {'id': player.id, 'count': i + 1, 'command': {'name': name, 'args': to_names(game, name, args)}}
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                game._execute_active_player_action()
+                has_winner = game._check_for_winner()
+
+            # Some states are never sent, as when an agent reads a file
+            # slower than the game writes it
+            if rng.random() < 0.2 and not has_winner:
+                continue
+
+            for player, agent, payload in zip(players, agents, game._create_players_payloads()):
+                message = f'{protocol}, seed {seed}, action {i}'
+                agent.transport.payloads.append(payload)
+
+                # Once the agent acknowledged a count, only the changes are sent
+                is_acked = player.control.acked_count is not None
+                if protocol == 'binary':
+                    self.assertEqual(is_binary(payload), is_acked, message)
+                elif protocol == 'delta':
+                    self.assertEqual(b'"base"' in payload, is_acked, message)
+
+                self.assertTrue(agent._data_changed(agent.player_data_count), message)
+                self.assertEqual(normalize(agent.player_data), normalize(get_expected_data(game, player)), message)
+
+                # The agent calls an action, acknowledging what it read
+                if rng.random() < 0.5:
+                    agent._call_action('pass_turn', [])
+                    player.control.acked_count = agent.call_data['ack']
+
+            if has_winner:
+                break
+
+    def test_full(self):
+        for seed in range(5):
+            self.play('full', seed)
+
+    def test_delta(self):
+        for seed in range(5):
+            self.play('delta', seed)
+
+    def test_binary(self):
+        for seed in range(5):
+            self.play('binary', seed)
+
+if __name__ == '__main__':
+    unittest.main()
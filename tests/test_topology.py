@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import topology
+from topology import Topology, load_topology
+
+WORLD_DEFINITION = 'worlds/classic.json'
+
+class TestTopologyCache(unittest.TestCase):
+    """A broken cache file is compiled again, never loaded."""
+
+    def setUp(self):
+        self.cache_dir = Path(tempfile.mkdtemp())
+        topology._topologies.clear()
+
+    def tearDown(self):
+        topology._topologies.clear()
+        for path in self.cache_dir.iterdir():
+            path.unlink()
+        self.cache_dir.rmdir()
+
+    def test_from_bytes(self):
+        data = load_topology(WORLD_DEFINITION, None).to_bytes()
+
+        self.assertEqual(Topology.from_bytes(data).names, load_topology(WORLD_DEFINITION, None).names)
+
+        for broken in (data[:10], data[:-1], data[:len(data) // 2], data + b'\0'):
+            with self.assertRaises(ValueError):
+                Topology.from_bytes(broken)
+
+    def test_truncated_file(self):
+        expected = load_topology(WORLD_DEFINITION, self.cache_dir)
+        cache_path, = self.cache_dir.iterdir()
+        cache_path.write_bytes(cache_path.read_bytes()[:-3000])
+        topology._topologies.clear()
+
+        loaded = load_topology(WORLD_DEFINITION, self.cache_dir)
+
+        self.assertEqual(list(loaded.distances), list(expected.distances))
+        self.assertEqual(list(loaded.adjacency), list(expected.adjacency))
+
+    def test_failed_write(self):
+        with mock.patch('topology.os.replace', side_effect=OSError):
+            load_topology(WORLD_DEFINITION, self.cache_dir)
+
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+if __name__ == '__main__':
+    unittest.main()
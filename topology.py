@@ -0,0 +1,468 @@
+import os
+import sys
+import json
+import struct
+import hashlib
+import tempfile
+from array import array
+from pathlib import Path
+from collections import OrderedDict
+
+MAGIC = b'RSKT'
+VERSION = 1
+
+# magic, version, byte order, n_countries, n_continents, n_adjacency,
+# has_distances, names_size
+HEADER = struct.Struct('<4sIIIIIII')
+
+# Where the compiled worlds are kept
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / 'worlds' / '.cache'
+
+# All pairs distances are only computed for worlds up to this size, bigger
+# worlds compute the distances from a country when they are first asked
+MAX_DISTANCE_COUNTRIES = 1024
+
+# Distance between countries not connected by land
+UNREACHABLE = 0xFFFF
+
+_BYTE_ORDERS = ('little', 'big')
+
+# Topologies kept in the memory of the process, the least recently used
+# is dropped past this number, big worlds have megabytes of distances
+MAX_CACHED_TOPOLOGIES = 4
+
+# Topologies already loaded by this process, by digest, the most recently
+# used last
+_topologies = OrderedDict()
+
+class Topology:
+    """The compiled structure of a world, everything that does not change\\
+    during a game.
+
+    Countries are numbered in the order they appear in the world definition,
+    continent after continent, and continents in their order too.
+
+    Parameters
+    ----------
+    names : list
+        The names of the countries, indexed by id.
+    continent_names : list
+        The names of the continents, indexed by id.
+    continent_extra_armies : array
+        The extra armies of each continent.
+    country_continent : array
+        The continent id of each country.
+    adjacency_offsets : array
+        The neighbours of the country with id `i` are
+        `adjacency[adjacency_offsets[i]:adjacency_offsets[i + 1]]`.
+    adjacency : array
+        The ids of the neighbours of all countries, one country after the
+        other (compressed sparse row).
+    continent_masks : list, optional
+        A bitmask of the country ids of each continent, computed if not
+        given.
+    distances : array, optional
+        The number of borders crossed between every pair of countries,
+        `distances[i * n_countries + j]`, `UNREACHABLE` if there is no path.
+        Computed if not given and the world is small enough.
+    digest : str, optional
+        The hash of the world definition the topology was compiled from.
+
+    Attributes
+    ----------
+    ids : dict
+        A dict with the country names as keys and their id as values.
+    """
+
+    def __init__(
+            self,
+            names: list,
+            continent_names: list,
+            continent_extra_armies: array,
+            country_continent: array,
+            adjacency_offsets: array,
+            adjacency: array,
+            continent_masks: list = None,
+            distances: array = None,
+            digest: str = None
+        ):
+        self.names = names
+        self.ids = {name: id for id, name in enumerate(names)}
+        self.continent_names = continent_names
+        self.continent_extra_armies = continent_extra_armies
+        self.country_continent = country_continent
+        self.adjacency_offsets = adjacency_offsets
+        self.adjacency = adjacency
+        self.digest = digest
+
+        if continent_masks is None:
+            continent_masks = [0] * len(continent_names)
+            for country_id, continent_id in enumerate(country_continent):
+                continent_masks[continent_id] |= 1 << country_id
+
+        self.continent_masks = continent_masks
+        self._distance_rows = {}
+        self._neighbours = None
+
+        if distances is None and len(names) <= MAX_DISTANCE_COUNTRIES:
+            distances = array('H')
+            for country_id in range(len(names)):
+                distances.extend(self._bfs(country_id))
+
+        self.distances = distances
+
+    @property
+    def n_countries(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_dict(cls, world_dict: dict, digest: str = None) -> 'Topology':
+        """Compile a world definition.
+
+        Parameters
+        ----------
+        world_dict : dict
+            A dict containing the world definition as follows:
+            ```
+            {
+                'Continent A':{
+                    'countries':{
+                        'Country A':[
+                            'Neighbour A',
+                            'Neighbour B',
+                            ...
+                        ],
+                        'Country B':[
+                            'Neighbour A',
+                            'Neighbour B',
+                            ...
+                        ],
+                        ...
+                    },
+                    'extra_armies': int(x)
+                },
+                'Continent B'...
+            }
+            ```
+        digest : str, optional
+
+        Returns
+        -------
+        Topology
+        """
+
+        names = []
+        continent_names = []
+        continent_extra_armies = array('i')
+        country_continent = array('i')
+
+        for continent_id, (continent_name, continent_data) in enumerate(world_dict.items()):
+            continent_names.append(continent_name)
+            continent_extra_armies.append(continent_data['extra_armies'])
+            for country_name in continent_data['countries']:
+                names.append(country_name)
+                country_continent.append(continent_id)
+
+        ids = {name: id for id, name in enumerate(names)}
+        adjacency_offsets = array('i', [0])
+        adjacency = array('i')
+
+        for continent_data in world_dict.values():
+            for neighbours_names in continent_data['countries'].values():
+                adjacency.extend(ids[neighbour_name] for neighbour_name in neighbours_names)
+                adjacency_offsets.append(len(adjacency))
+
+        return cls(names, continent_names, continent_extra_armies, country_continent,
+                   adjacency_offsets, adjacency, digest=digest)
+
+    def get_neighbour_ids(self, country_id: int) -> array:
+        """Get the ids of the neighbours of a country.
+
+        Parameters
+        ----------
+        country_id : int
+
+        Returns
+        -------
+        array
+        """
+
+        return self.adjacency[self.adjacency_offsets[country_id]:self.adjacency_offsets[country_id + 1]]
+
+    @property
+    def neighbours(self) -> list:
+        """The ids of the neighbours of each country as tuples, built the\\
+        first time they are read."""
+
+        if self._neighbours is None:
+            self._neighbours = [tuple(self.get_neighbour_ids(country_id))
+                                for country_id
+                                in range(len(self.names))]
+
+        return self._neighbours
+
+    def get_continent_countries(self, continent_id: int) -> list:
+        """Get the ids of the countries of a continent.
+
+        Parameters
+        ----------
+        continent_id : int
+
+        Returns
+        -------
+        list
+        """
+
+        mask = self.continent_masks[continent_id]
+        country_ids = []
+
+        while mask:
+            lowest = mask & -mask
+            country_ids.append(lowest.bit_length() - 1)
+            mask ^= lowest
+
+        return country_ids
+
+    def _bfs(self, country_id: int) -> array:
+        """Count the borders crossed from a country to every other one."""
+
+        offsets = self.adjacency_offsets
+        adjacency = self.adjacency
+        distances = array('H', [UNREACHABLE]) * len(self.names)
+        distances[country_id] = 0
+        frontier = [country_id]
+        distance = 0
+
+        while frontier:
+            distance += 1
+            next_frontier = []
+            for country in frontier:
+                for neighbour in adjacency[offsets[country]:offsets[country + 1]]:
+                    if distances[neighbour] == UNREACHABLE:
+                        distances[neighbour] = distance
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+
+        return distances
+
+    def get_distance(self, country_1: int, country_2: int) -> int:
+        """Count the borders crossed on the shortest path between two\\
+        countries, whoever owns the countries in between.
+
+        Parameters
+        ----------
+        country_1 : int
+        country_2 : int
+
+        Returns
+        -------
+        int
+            `UNREACHABLE` if there is no path.
+        """
+
+        if self.distances is not None:
+            return self.distances[country_1 * len(self.names) + country_2]
+
+        row = self._distance_rows.get(country_1)
+
+        if row is None:
+            row = self._distance_rows[country_1] = self._bfs(country_1)
+
+        return row[country_2]
+
+    def to_bytes(self) -> bytes:
+        """Pack the topology in the format read by `from_bytes`.
+
+        Returns
+        -------
+        bytes
+        """
+
+        names = '\n'.join(self.names + self.continent_names).encode()
+        n_bytes = (len(self.names) + 7) // 8
+
+        header = HEADER.pack(
+            MAGIC,
+            VERSION,
+            _BYTE_ORDERS.index(sys.byteorder),
+            len(self.names),
+            len(self.continent_names),
+            len(self.adjacency),
+            self.distances is not None,
+            len(names)
+        )
+
+        return b''.join((
+            header,
+            self.adjacency_offsets.tobytes(),
+            self.adjacency.tobytes(),
+            self.country_continent.tobytes(),
+            self.continent_extra_armies.tobytes(),
+            *(mask.to_bytes(n_bytes, 'little') for mask in self.continent_masks),
+            self.distances.tobytes() if self.distances is not None else b'',
+            names
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, digest: str = None) -> 'Topology':
+        """Unpack a topology packed by `to_bytes`.
+
+        Parameters
+        ----------
+        data : bytes
+        digest : str, optional
+
+        Returns
+        -------
+        Topology
+
+        Raises
+        ------
+        ValueError
+            If the data was packed by another version or on a host with
+            another byte order, or is truncated or corrupt.
+        """
+
+        if len(data) < HEADER.size:
+            raise ValueError("The topology is truncated")
+
+        (magic, version, byte_order, n_countries, n_continents, n_adjacency,
+         has_distances, names_size) = HEADER.unpack_from(data)
+
+        if magic != MAGIC or version != VERSION or byte_order != _BYTE_ORDERS.index(sys.byteorder):
+            raise ValueError("The topology was compiled by another version or host")
+
+        n_bytes = (n_countries + 7) // 8
+        size = (HEADER.size
+                + 4 * (n_countries + 1 + n_adjacency + n_countries + n_continents)
+                + n_continents * n_bytes
+                + (2 * n_countries * n_countries if has_distances else 0)
+                + names_size)
+
+        # array.frombytes takes short slices silently
+        if len(data) != size:
+            raise ValueError(f"The topology has {len(data)} bytes instead of {size}")
+
+        offset = HEADER.size
+
+        def read(typecode, n_items):
+            nonlocal offset
+            values = array(typecode)
+            size = values.itemsize * n_items
+            values.frombytes(data[offset:offset + size])
+            offset += size
+            return values
+
+        adjacency_offsets = read('i', n_countries + 1)
+        adjacency = read('i', n_adjacency)
+        country_continent = read('i', n_countries)
+        continent_extra_armies = read('i', n_continents)
+        continent_masks = []
+        for _ in range(n_continents):
+            continent_masks.append(int.from_bytes(data[offset:offset + n_bytes], 'little'))
+            offset += n_bytes
+        distances = read('H', n_countries * n_countries) if has_distances else None
+
+        names = data[offset:offset + names_size].decode().split('\n')
+
+        if len(names) != n_countries + n_continents:
+            raise ValueError("The topology has the wrong number of names")
+
+        return cls(names[:n_countries], names[n_countries:], continent_extra_armies,
+                   country_continent, adjacency_offsets, adjacency, continent_masks,
+                   distances, digest)
+
+def get_digest(content: bytes) -> str:
+    """Hash a world definition."""
+
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+def _load(content: bytes, get_world_dict, cache_dir: Path) -> Topology:
+    """Get the topology of a world definition from the memory of the\\
+    process, from the cache or by compiling it, in this order."""
+
+    digest = get_digest(content)
+    topology = _topologies.get(digest)
+
+    if topology is not None:
+        _topologies.move_to_end(digest)
+        return topology
+
+    cache_path = None
+
+    if cache_dir is not None:
+        cache_path = Path(cache_dir) / f'{digest}.v{VERSION}.topology'
+        try:
+            topology = Topology.from_bytes(cache_path.read_bytes(), digest)
+        except (OSError, ValueError, struct.error):
+            topology = None
+
+    if topology is None:
+        topology = Topology.from_dict(get_world_dict(), digest)
+
+        if cache_path is not None:
+            tmp_path = None
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                # Written aside and renamed, so other processes never read
+                # half of it
+                fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(topology.to_bytes())
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                # Not renamed, nothing else would ever remove it
+                if tmp_path is not None:
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+
+    _topologies[digest] = topology
+
+    while len(_topologies) > MAX_CACHED_TOPOLOGIES:
+        _topologies.popitem(last=False)
+
+    return topology
+
+def load_topology(world_definition: str, cache_dir: Path = DEFAULT_CACHE_DIR) -> Topology:
+    """Get the topology of a world definition file.
+
+    The file is compiled once and cached in `cache_dir` under the hash of
+    its content, so editing the file compiles it again. The last
+    `MAX_CACHED_TOPOLOGIES` topologies used are also kept in memory, loading
+    one of them again in a process is free.
+
+    Parameters
+    ----------
+    world_definition : str
+        A string with a path to a json containing the infos of the world.
+    cache_dir : Path, default DEFAULT_CACHE_DIR
+        None to compile without caching on disk.
+
+    Returns
+    -------
+    Topology
+    """
+
+    with open(world_definition, 'rb') as f:
+        content = f.read()
+
+    return _load(content, lambda: json.loads(content), cache_dir)
+
+def get_topology(world_dict: dict, cache_dir: Path = DEFAULT_CACHE_DIR) -> Topology:
+    """Get the topology of a world definition already loaded in a dict, as\\
+    in `load_topology`.
+
+    Parameters
+    ----------
+    world_dict : dict
+        See `Topology.from_dict`.
+    cache_dir : Path, default DEFAULT_CACHE_DIR
+
+    Returns
+    -------
+    Topology
+    """
+
+    return _load(json.dumps(world_dict).encode(), lambda: world_dict, cache_dir)
@@ -0,0 +1,207 @@
+from game import Game
+
+import sys
+import os
+import math
+import time
+import random
+import argparse
+import itertools
+import contextlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(str(Path(__file__).resolve().parent / 'risk-agents'))
+
+from angry_based_agent import AngryBased
+from random_agent import Agent
+from monte_carlo_agent import MonteCarlo
+
+AGENTS = {
+    'AngryBased': AngryBased,
+    'Agent': Agent,
+    'MonteCarlo': MonteCarlo
+}
+
+def play_game(task: tuple) -> tuple:
+    """Play one headless game in the current process.
+
+    Every game builds its own `Game` and agents, so games running at the
+    same time share nothing.
+
+    Parameters
+    ----------
+    task : tuple
+        `(agent_1_class, agent_2_class, seed, max_turns)`.
+
+    Returns
+    -------
+    tuple
+        `(winner, turns)` where winner is the id of the winning player, or
+        None if no one won in `max_turns`.
+    """
+
+    agent_1_class, agent_2_class, seed, max_turns = task
+
+    random.seed(seed)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        agents = [agent_1_class(1, headless=True), agent_2_class(2, headless=True)]
+        game = Game(agents=agents, seed=seed)
+        game.run(max_turns)
+
+    winner = game.winner.id if game.winner is not None else None
+
+    return winner, game.turn
+
+def wilson_interval(wins: int, n_games: int, z: float = 1.96) -> tuple:
+    """Confidence interval of a win rate.
+
+    Parameters
+    ----------
+    wins : int
+    n_games : int
+    z : float, default 1.96
+        The normal quantile of the confidence level, 1.96 for 95%.
+
+    Returns
+    -------
+    tuple
+        `(low, high)`, or `(0, 1)` when there are no games.
+    """
+
+    if n_games == 0:
+        return (0.0, 1.0)
+
+    rate = wins / n_games
+    denominator = 1 + z**2 / n_games
+    center = (rate + z**2 / (2 * n_games)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / n_games + z**2 / (4 * n_games**2)) / denominator
+
+    return (max(0.0, center - margin), min(1.0, center + margin))
+
+def run_tournament(
+        agent_names: list,
+        n_games: int,
+        seed: int = 0,
+        max_turns: int = 150,
+        workers: int = None
+    ) -> dict:
+    """Play every pairing of agents `n_games` times across a process pool.
+
+    Each pairing plays half of its games with each agent as player 1.
+
+    Parameters
+    ----------
+    agent_names : list
+        Names of agents in `AGENTS`.
+    n_games : int
+        Number of games of each pairing.
+    seed : int, default 0
+        The seed of the first game, the next games use the following ints.
+    max_turns : int, default 150
+        Maximum number of turns of each game, games that reach it are draws.
+    workers : int, optional
+        Number of processes, defaults to the number of cores.
+
+    Returns
+    -------
+    dict
+        A dict with the `agents`, the `wins`, `draws` and `games` matrices
+        indexed as `[agent][opponent]`, the `win_rate` matrix with
+        `(rate, low, high)` tuples (None on the diagonal), the number of
+        `turns` played and the `duration` in seconds.
+    """
+
+    n_agents = len(agent_names)
+    tasks = []
+    pairings = []
+
+    for i, j in itertools.combinations(range(n_agents), 2):
+        for k in range(n_games):
+            # Alternate seats so the first player advantage cancels out
+            first, second = (i, j) if k % 2 == 0 else (j, i)
+            tasks.append((AGENTS[agent_names[first]], AGENTS[agent_names[second]], seed + len(tasks), max_turns))
+            pairings.append((first, second))
+
+    wins = [[0] * n_agents for _ in range(n_agents)]
+    draws = [[0] * n_agents for _ in range(n_agents)]
+    games = [[0] * n_agents for _ in range(n_agents)]
+    turns = 0
+
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(tasks) // (workers * 8))
+
+    time_start = time.perf_counter()
+
+    with ProcessPoolExecutor(workers) as executor:
+        results = executor.map(play_game, tasks, chunksize=chunksize)
+
+        for (first, second), (winner, game_turns) in zip(pairings, results):
+            games[first][second] += 1
+            games[second][first] += 1
+            turns += game_turns
+
+            if winner == 1:
+                wins[first][second] += 1
+            elif winner == 2:
+                wins[second][first] += 1
+            else:
+                draws[first][second] += 1
+                draws[second][first] += 1
+
+    duration = time.perf_counter() - time_start
+
+    win_rate = [[None] * n_agents for _ in range(n_agents)]
+
+    for i, j in itertools.permutations(range(n_agents), 2):
+        if games[i][j] > 0:
+            win_rate[i][j] = (wins[i][j] / games[i][j], *wilson_interval(wins[i][j], games[i][j]))
+
+    return {
+        'agents': list(agent_names),
+        'wins': wins,
+        'draws': draws,
+        'games': games,
+        'win_rate': win_rate,
+        'turns': turns,
+        'duration': duration
+    }
+
+def print_results(results: dict):
+    """Print the win rate matrix of a tournament, rows against columns."""
+
+    names = results['agents']
+    width = max(22, *(len(name) for name in names)) + 2
+
+    print(''.ljust(width) + ''.join(name.ljust(width) for name in names))
+
+    for i, name in enumerate(names):
+        row = name.ljust(width)
+        for j in range(len(names)):
+            if results['win_rate'][i][j] is None:
+                row += '-'.ljust(width)
+            else:
+                rate, low, high = results['win_rate'][i][j]
+                row += f'{rate:.2f} [{low:.2f}, {high:.2f}]'.ljust(width)
+        print(row)
+
+    n_games = sum(map(sum, results['games'])) // 2
+    print(f'Games: {n_games}')
+    print(f'Time: {results["duration"]}')
+    print(f'Games per second: {n_games / results["duration"]}')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Play headless games between agents in parallel")
+    parser.add_argument('agents', nargs='+', choices=AGENTS.keys())
+    parser.add_argument('-n', '--games', type=int, default=100, help="games per pairing")
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-t', '--max-turns', type=int, default=150)
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if len(args.agents) < 2:
+        parser.error("at least two agents are needed")
+
+    results = run_tournament(args.agents, args.games, args.seed, args.max_turns, args.workers)
+    print_results(results)
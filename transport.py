@@ -0,0 +1,377 @@
+import os
+import socket
+import struct
+import time
+import uuid
+from pathlib import Path
+
+from shared_state import SharedBoard, PlayerDataView
+
+TRANSPORTS = ('file', 'socket', 'shm')
+
+# The environment variable with the name of the shared memory block of the
+# 'shm' transport, read by the agents and by `game.py`
+SHARED_MEMORY_ENV = 'RISK_SHM_NAME'
+
+def new_shared_memory_name() -> str:
+    """Create a name for the shared memory block of a game, unique on the\\
+    host.
+
+    Returns
+    -------
+    str
+    """
+
+    return f'risk_{os.getpid()}_{uuid.uuid4().hex[:8]}'
+
+class FileTransport:
+    """Exchanges messages through a pair of files, one written by each side.
+
+    This is the original protocol of the game. A file only keeps the last
+    message written on it, so a reader may skip messages if it is slower
+    than the writer. Messages are written to a temporary file and renamed
+    over the destination, so a reader never sees half of a message written
+    by another `FileTransport`.
+
+    A message already on `recv_path` when the transport is created is the
+    first one received, so an agent started after the game reads the state
+    the game wrote before it came up.
+
+    Parameters
+    ----------
+    send_path : Path
+        The file where the messages are written.
+    recv_path : Path
+        The file where the messages are read from.
+    poll_interval : float, default 0
+        Seconds slept between two checks of `recv_path`. 0 only gives up the
+        rest of the time slice.
+    """
+
+    def __init__(self, send_path: Path, recv_path: Path, poll_interval: float = 0):
+        self.send_path = Path(send_path)
+        self.recv_path = Path(recv_path)
+        self.poll_interval = poll_interval
+        # Nothing read yet, the file may already hold the first message
+        self.last_signature = None
+
+    def _get_signature(self) -> tuple:
+        """Identify the current version of `recv_path`.
+
+        Returns
+        -------
+        tuple or None
+            `(inode, modification time, size)` of the file, None if it does
+            not exist.
+        """
+
+        try:
+            stat = os.stat(self.recv_path)
+        except FileNotFoundError:
+            return None
+
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def send(self, payload: bytes):
+        """Replace the content of `send_path` with a message.
+
+        Parameters
+        ----------
+        payload : bytes
+            The message.
+        """
+
+        temp_path = self.send_path.with_name(self.send_path.name + '.tmp')
+
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+
+        os.replace(temp_path, self.send_path)
+
+    def recv(self) -> bytes:
+        """Wait until `recv_path` changes and read it.
+
+        Returns
+        -------
+        bytes
+            The content of the file.
+        """
+
+        signature = self._get_signature()
+
+        while signature == self.last_signature:
+            time.sleep(self.poll_interval)
+            signature = self._get_signature()
+
+        self.last_signature = signature
+
+        with open(self.recv_path, 'rb') as f:
+            return f.read()
+
+    def close(self):
+        pass
+
+class SocketTransport:
+    """Exchanges length-prefixed messages through a connected stream socket.
+
+    Every message is preceded by its size as a 4 bytes big-endian unsigned
+    int, so a message is always read whole and `recv` blocks until one
+    arrives. Messages are queued, none of them is skipped.
+
+    The game side binds a Unix socket with `serve` and waits for its agent
+    with `accept`, the agent side uses `connect`. Any connected stream
+    socket works, e.g. one end of a `socket.socketpair()`.
+
+    Parameters
+    ----------
+    sock : socket.socket
+        A connected stream socket.
+    """
+
+    header = struct.Struct('!I')
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+
+    @staticmethod
+    def serve(path: Path) -> socket.socket:
+        """Bind a listening Unix socket on path, replacing a stale one.
+
+        Parameters
+        ----------
+        path : Path
+            The path of the socket file.
+
+        Returns
+        -------
+        socket.socket
+            The listening socket.
+        """
+
+        if os.path.exists(path):
+            os.remove(path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(path))
+        server.listen(1)
+
+        return server
+
+    @classmethod
+    def accept(cls, server: socket.socket) -> 'SocketTransport':
+        """Wait for an agent to connect to a socket created by `serve`.
+
+        The listening socket is closed after the connection.
+
+        Parameters
+        ----------
+        server : socket.socket
+            The listening socket.
+
+        Returns
+        -------
+        SocketTransport
+        """
+
+        path = server.getsockname()
+        sock, _ = server.accept()
+        server.close()
+        os.remove(path)
+
+        return cls(sock)
+
+    @classmethod
+    def connect(cls, path: Path, timeout: float = 30) -> 'SocketTransport':
+        """Connect to the socket of the game, waiting for it to be served.
+
+        Parameters
+        ----------
+        path : Path
+            The path of the socket file.
+        timeout : float, default 30
+            Seconds to wait for the game before giving up.
+
+        Returns
+        -------
+        SocketTransport
+        """
+
+        deadline = time.monotonic() + timeout
+
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(str(path))
+                return cls(sock)
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def _recv_exactly(self, size: int) -> bytes:
+        """Read exactly size bytes from the socket.
+
+        Parameters
+        ----------
+        size : int
+
+        Returns
+        -------
+        bytes
+        """
+
+        chunks = []
+
+        while size > 0:
+            chunk = self.sock.recv(size)
+            if not chunk:
+                raise ConnectionError("The other side closed the connection")
+            chunks.append(chunk)
+            size -= len(chunk)
+
+        return b''.join(chunks)
+
+    def send(self, payload: bytes):
+        """Send a message.
+
+        Parameters
+        ----------
+        payload : bytes
+            The message.
+        """
+
+        self.sock.sendall(self.header.pack(len(payload)) + payload)
+
+    def recv(self) -> bytes:
+        """Wait for the next message.
+
+        Returns
+        -------
+        bytes
+            The message.
+        """
+
+        size, = self.header.unpack(self._recv_exactly(self.header.size))
+
+        return self._recv_exactly(size)
+
+    def close(self):
+        self.sock.close()
+
+class SharedMemoryTransport:
+    """Shares the live game state through a `SharedBoard`.
+
+    The game writes the state of both players in shared memory instead of
+    sending messages, and the agents read a copy of it through a
+    `PlayerDataView`. Calls are still json, written in the call area of the
+    player in the same block.
+
+    The game side creates the board with `create`, one transport per
+    player, the agent side uses `attach`. Each game has its own block, the
+    agents find it by the name the game was given.
+
+    Parameters
+    ----------
+    board : SharedBoard
+    player_id : {1, 2}
+        The player whose calls are exchanged.
+    owns_board : bool, default False
+        True if closing this transport also removes the board.
+    """
+
+    def __init__(self, board: SharedBoard, player_id: int, owns_board: bool = False):
+        self.board = board
+        self.player_id = player_id
+        self.owns_board = owns_board
+        self.last_call_seq = 0
+        self.player_data = None
+
+    @classmethod
+    def create(cls, world, name: str) -> tuple:
+        """Create the board of a world and the transports of both players.
+
+        Parameters
+        ----------
+        world : World
+        name : str
+            The name of the block, see `new_shared_memory_name`.
+
+        Returns
+        -------
+        tuple
+            The transports of player 1 and player 2.
+        """
+
+        board = SharedBoard.create(name, world)
+
+        return (cls(board, 1, owns_board=True), cls(board, 2))
+
+    @classmethod
+    def attach(cls, player_id: int, name: str = None, timeout: float = 30) -> 'SharedMemoryTransport':
+        """Attach an agent to the board of the game, waiting for it to be\\
+        created.
+
+        Parameters
+        ----------
+        player_id : {1, 2}
+        name : str, optional
+            The name of the block of the game, read from the environment
+            variable `SHARED_MEMORY_ENV` if not given.
+        timeout : float, default 30
+
+        Returns
+        -------
+        SharedMemoryTransport
+        """
+
+        if name is None:
+            name = os.environ.get(SHARED_MEMORY_ENV)
+        if name is None:
+            raise ValueError(f"The name of the shared memory of the game is needed, set {SHARED_MEMORY_ENV}")
+
+        transport = cls(SharedBoard.attach(name, timeout), player_id)
+        transport.player_data = PlayerDataView(transport.board, player_id)
+
+        return transport
+
+    def read_player_data(self) -> PlayerDataView:
+        """Wait for a state newer than the last one read.
+
+        Returns
+        -------
+        PlayerDataView
+            The view of the player data, the same object every time.
+        """
+
+        self.player_data.read()
+
+        return self.player_data
+
+    def send(self, payload: bytes):
+        """Write a call of the agent.
+
+        Parameters
+        ----------
+        payload : bytes
+        """
+
+        self.board.send_call(self.player_id, payload)
+
+    def recv(self) -> bytes:
+        """Wait for the next call of the agent.
+
+        Returns
+        -------
+        bytes
+        """
+
+        self.last_call_seq, payload = self.board.recv_call(self.player_id, self.last_call_seq)
+
+        return payload
+
+    def close(self):
+        self.player_data = None
+        self.board.close()
+        if self.owns_board:
+            self.board.unlink()
@@ -1,6 +1,8 @@
-from continent import Continent
+from continent import Continent, ContinentCounters
 from country import Country
-import json
+from topology import Topology, load_topology, get_topology
+from zobrist import get_keys
+from array import array
 
 class World:
     """Represents the world as a not fully connected graph.
@@ -15,79 +17,224 @@ class World:
     continents : list
         A list with objects of the type Continent.
     country_list : list
-        A list with objects Country.
+        A list with objects Country, the index of each country is its id.
     country_dict : dict
         A dict with countries as keys and an object Country as value.
+    owners : array
+        The id of the owner of each country indexed by the country id, 0 if
+        the country has no owner.
+    troops : array
+        The number of troops on each country indexed by the country id.
+    players : dict
+        A dict with the player ids found in `owners` as keys and the Player
+        objects as values, 0 is None.
+    adjacency_offsets : array
+        The neighbours of the country with id `i` are
+        `adjacency[adjacency_offsets[i]:adjacency_offsets[i + 1]]`.
+    adjacency : array
+        The ids of the neighbours of all countries, one country after the
+        other (compressed sparse row).
+    topology : Topology
+        The compiled structure of the world, shared by all the worlds of the
+        same definition.
+    zobrist : ZobristKeys
+        The keys hashing the boards of this world.
+    board_hash : list
+        A single element list with the Zobrist hash of `owners` and
+        `troops`, updated by `Country` whenever a country changes.
+    continent_counters : ContinentCounters
+        The countries of each owner in every continent, updated by `Country`
+        whenever a country changes owner.
+    changed_countries : set
+        The ids of the countries set by `Country` since the last
+        `pop_changes`.
     """
     
     def __init__(self, world_definition: str):
-        with open(world_definition, 'r') as f:
-            world_dict = json.load(f)
-
-        world_data = self._create_world_data(world_dict)
+        world_data = self._create_world_data(load_topology(world_definition))
         self.country_dict, self.country_list, self.continents = world_data
 
-    def _create_world_data(self, world_dict: dict) -> tuple:
-        """Create all data structures that describes the world.
+    @classmethod
+    def from_dict(cls, world_dict: dict) -> 'World':
+        """Create a world from a dict in the format of the world definition.
 
         Parameters
         ----------
         world_dict : dict
-            A dict containing the world definition as follows:
-            ```
-            {
-                'Continent A':{
-                    'countries':{
-                        'Country A':[
-                            'Neighbour A',
-                            'Neighbour B',
-                            ...   
-                        ],
-                        'Country B':[
-                            'Neighbour A',
-                            'Neighbour B',
-                            ...   
-                        ],
-                        ...
-                    },
-                    'extra_armies': int(x)
+            See `Topology.from_dict`.
+
+        Returns
+        -------
+        World
+        """
+
+        return cls.from_topology(get_topology(world_dict))
+
+    @classmethod
+    def from_topology(cls, topology: Topology) -> 'World':
+        """Create a world from a compiled world definition, e.g. the\\
+        topology of a `StateView`.
+
+        Parameters
+        ----------
+        topology : Topology
+
+        Returns
+        -------
+        World
+        """
+
+        world = cls.__new__(cls)
+        world_data = world._create_world_data(topology)
+        world.country_dict, world.country_list, world.continents = world_data
+
+        return world
+
+    @classmethod
+    def from_player_data(cls, player_data: dict) -> 'World':
+        """Create the world described by the player data sent to the agents.
+
+        The country ids may differ from the ids of the game.
+
+        Parameters
+        ----------
+        player_data : dict
+            The player data sent by the game to an agent.
+
+        Returns
+        -------
+        World
+        """
+
+        world_dict = {}
+
+        for continent_name, continent_data in player_data['continents_data'].items():
+            world_dict[continent_name] = {
+                'countries': {
+                    country_name: player_data['countries_data'][country_name]['neighbours']
+                    for country_name
+                    in continent_data['countries']
                 },
-                'Continent B'...
+                'extra_armies': continent_data['extra_armies']
             }
-            ```
+
+        return cls.from_dict(world_dict)
+
+    def _create_world_data(self, topology: Topology) -> tuple:
+        """Create all data structures that describes the world.
+
+        The arrays with the state of the board are also created here, the
+        adjacency of the countries is the one of the topology.
+
+        Parameters
+        ----------
+        topology : Topology
+            The compiled world definition, see `load_topology`.
 
         Returns
         -------
         tuple
             The following tuple: `(country_dict, country_list, continents)`.    
         """
-        country_dict = {}
-        country_list = []
-        continents = []
-
-        # Create countries and continents
-        for continent_name, continent_data in world_dict.items():
-            countries = continent_data['countries']
-            extra_armies = continent_data['extra_armies']
-            continent_countries = []
-            for country_name, _ in countries.items():
-                country = Country(country_name)
-                country_dict[country_name] = country
-                country_list.append(country)
-                continent_countries.append(country)
-
-            continent = Continent(
-                continent_name, 
-                continent_countries, 
-                extra_armies
+
+        n_countries = topology.n_countries
+        self.topology = topology
+        self.owners = array('b', bytes(n_countries))
+        self.troops = array('i', bytes(4 * n_countries))
+        self.players = {0: None}
+        self.zobrist = get_keys(n_countries)
+        self.board_hash = [self.zobrist.hash_board(self.owners, self.troops)]
+        self.changed_countries = set(range(n_countries))
+        self.continent_counters = ContinentCounters(topology, self.owners)
+        self.adjacency_offsets = topology.adjacency_offsets
+        self.adjacency = topology.adjacency
+
+        country_list = [Country(name, id, self) for id, name in enumerate(topology.names)]
+        country_dict = {country.name: country for country in country_list}
+
+        for country in country_list:
+            neighbour_ids = topology.get_neighbour_ids(country.id)
+            country.neighbours = [country_list[neighbour_id] for neighbour_id in neighbour_ids]
+            country.neighbour_ids = frozenset(neighbour_ids)
+
+        continents = [
+            Continent(
+                continent_name,
+                [country_list[country_id] for country_id in topology.get_continent_countries(continent_id)],
+                topology.continent_extra_armies[continent_id],
+                continent_id,
+                self
                 )
-            continents.append(continent)
+            for continent_id, continent_name in enumerate(topology.continent_names)
+        ]
+
+        return (country_dict, country_list, continents)
+
+    @property
+    def hash(self) -> int:
+        """The Zobrist hash of the owners and troops of all countries."""
+
+        return self.board_hash[0]
+
+    def get_neighbour_ids(self, country_id: int) -> array:
+        """Get the ids of the neighbours of a country.
+
+        Parameters
+        ----------
+        country_id : int
+
+        Returns
+        -------
+        array
+        """
 
-        # TODO Is it really needed this second nested loop to assign neighbours?
-        # Assign neighbours to each country
-        for continent in continents:
-            for country in continent.countries:
-                neighbours_names = world_dict[continent.name]['countries'][country.name]
-                country.neighbours += [country_dict[neighbour_name] for neighbour_name in neighbours_names]
+        start = self.adjacency_offsets[country_id]
+        end = self.adjacency_offsets[country_id + 1]
+
+        return self.adjacency[start:end]
+
+    def pop_changes(self) -> tuple:
+        """Take the countries and continents changed since the last call,\\
+        all of them the first time.
+
+        Returns
+        -------
+        tuple
+            `(country_ids, continent_ids)`, the sets of the ids of the
+            countries whose owner or troops were set and of the continents
+            whose owner changed.
+        """
+
+        country_ids = set(self.changed_countries)
+        self.changed_countries.clear()
+        continent_ids = self.continent_counters.changed
+        self.continent_counters.changed = set()
+
+        return (country_ids, continent_ids)
+
+    def get_state(self) -> tuple:
+        """Copy the owners and troops of all countries.
+
+        Returns
+        -------
+        tuple
+            `(owners, troops)`, copies of the arrays.
+        """
+
+        return (array('b', self.owners), array('i', self.troops))
+
+    def set_state(self, state: tuple):
+        """Restore the owners and troops copied by `get_state`.
+
+        Parameters
+        ----------
+        state : tuple
+            `(owners, troops)`.
+        """
 
-        return (country_dict, country_list, continents)
\ No newline at end of file
+        owners, troops = state
+        self.owners[:] = owners
+        self.troops[:] = troops
+        self.board_hash[0] = self.zobrist.hash_board(owners, troops)
+        self.changed_countries.update(range(len(owners)))
+        self.continent_counters.count(owners)
\ No newline at end of file
@@ -109,7 +109,7 @@ class World:
 
         for i, continent_countries in enumerate(_continents_countries):
             for country_name in continent_countries:
-                country = Country(country_name)
+                country = Country(country_name, len(self.country_list))
                 self.country_dict[country_name] = country
                 self.country_list.append(country)
                 self.continents[i].countries.append(country)
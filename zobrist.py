@@ -0,0 +1,238 @@
+from array import array
+from functools import lru_cache
+import random
+
+MASK = (1 << 64) - 1
+
+# Keys are precomputed for stacks up to this size, bigger ones are mixed on
+# demand
+N_CACHED_TROOPS = 64
+
+def _splitmix64(x: int) -> int:
+    """Mix the bits of a 64 bits int, see Steele et al. (2014)."""
+
+    x = (x + 0x9E3779B97F4A7C15) & MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK
+
+    return x ^ (x >> 31)
+
+class ZobristKeys:
+    """Random 64 bits keys used to hash board states.
+
+    The hash of a board is the xor of the keys of the `(owner, n_troops)` of
+    every country, so changing a country changes the hash by xoring out its
+    old key and xoring in the new one. Keys are derived from the seed, the
+    same seed always gives the same hashes.
+
+    Parameters
+    ----------
+    n_countries : int
+        The number of countries of the world.
+    seed : int, default 0
+    """
+
+    STATES = ('waiting', 'mobilizing', 'attacking', 'conquering', 'fortifying', 'winner', 'loser')
+
+    def __init__(self, n_countries: int, seed: int = 0):
+        self.n_countries = n_countries
+        self.seed = seed
+
+        # keys[(country_id * 3 + owner) * N_CACHED_TROOPS + n_troops], drawn
+        # at once from a generator seeded with the seed
+        n_keys = n_countries * 3 * N_CACHED_TROOPS
+        self.keys = array('Q', random.Random(seed).randbytes(8 * n_keys))
+
+        self.turn_keys = {(player, state): _splitmix64(self.seed ^ _splitmix64(~(player * 16 + i) & MASK))
+                          for player in (1, 2)
+                          for i, state in enumerate(self.STATES)}
+
+    def _mix(self, country_id: int, owner: int, n_troops: int) -> int:
+        return _splitmix64(self.seed ^ _splitmix64((country_id << 34) | (owner << 32) | n_troops))
+
+    def get_key(self, country_id: int, owner: int, n_troops: int) -> int:
+        """Get the key of a country having an owner and a number of troops.
+
+        Parameters
+        ----------
+        country_id : int
+        owner : {0, 1, 2}
+        n_troops : int
+
+        Returns
+        -------
+        int
+        """
+
+        if n_troops < N_CACHED_TROOPS:
+            return self.keys[(country_id * 3 + owner) * N_CACHED_TROOPS + n_troops]
+
+        return self._mix(country_id, owner, n_troops)
+
+    def hash_board(self, owners: array, troops: array) -> int:
+        """Hash a whole board.
+
+        Parameters
+        ----------
+        owners : array
+            The id of the owner of each country.
+        troops : array
+            The number of troops on each country.
+
+        Returns
+        -------
+        int
+        """
+
+        board_hash = 0
+
+        for country_id in range(self.n_countries):
+            board_hash ^= self.get_key(country_id, owners[country_id], troops[country_id])
+
+        return board_hash
+
+    def get_turn_key(self, player: int, state: str) -> int:
+        """Get the key of the player taking actions and its state, to be\\
+        xored with the hash of the board.
+
+        Parameters
+        ----------
+        player : {1, 2}
+        state : str
+
+        Returns
+        -------
+        int
+        """
+
+        return self.turn_keys[(player, state)]
+
+@lru_cache(maxsize=None)
+def get_keys(n_countries: int, seed: int = 0) -> ZobristKeys:
+    """Get the `ZobristKeys` of a number of countries, created only once per\\
+    process.
+
+    Parameters
+    ----------
+    n_countries : int
+    seed : int, default 0
+
+    Returns
+    -------
+    ZobristKeys
+    """
+
+    return ZobristKeys(n_countries, seed)
+
+class TranspositionTable:
+    """A bounded table of values keyed by Zobrist hashes.
+
+    The table never grows past its size. Every hash maps to a bucket of two
+    entries: the first keeps the value computed with the most work, as
+    given by `depth`, and the second always takes the last value stored,
+    so deep results survive floods of shallow ones. Entries stored before
+    the last call of `new_generation` are replaced first, whatever their
+    depth, so the table can be kept between decisions and games.
+
+    Parameters
+    ----------
+    size : int, default 65536
+        The number of entries, rounded up to a power of 2.
+    """
+
+    def __init__(self, size: int = 1 << 16):
+        n_entries = 2
+
+        while n_entries < size:
+            n_entries *= 2
+
+        self.mask = n_entries // 2 - 1
+        self.keys = array('Q', bytes(8 * n_entries))
+        self.depths = array('i', [-1]) * n_entries
+        self.generations = array('i', bytes(4 * n_entries))
+        self.values = [None] * n_entries
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self.depths) - self.depths.count(-1)
+
+    def _find(self, key: int) -> int:
+        """Get the entry holding a key, -1 if it is not stored."""
+
+        entry = (key & self.mask) * 2
+
+        for i in (entry, entry + 1):
+            if self.keys[i] == key and self.depths[i] >= 0:
+                return i
+
+        return -1
+
+    def get(self, key: int, default=None, min_depth: int = 0):
+        """Get the value stored for a key.
+
+        Parameters
+        ----------
+        key : int
+        default : optional
+            Returned if the key is not stored.
+        min_depth : int, default 0
+            Values stored with a smaller depth are ignored.
+
+        Returns
+        -------
+        The value stored, or default.
+        """
+
+        i = self._find(key)
+
+        if i == -1 or self.depths[i] < min_depth:
+            return default
+
+        return self.values[i]
+
+    def put(self, key: int, value, depth: int = 0):
+        """Store a value, possibly replacing another entry.
+
+        Parameters
+        ----------
+        key : int
+        value
+        depth : int, default 0
+            The work spent on the value, like the depth of a search or the
+            number of simulations. Must not be negative.
+        """
+
+        i = self._find(key)
+
+        if i == -1:
+            entry = (key & self.mask) * 2
+            if (depth >= self.depths[entry]
+                    or self.generations[entry] != self.generation):
+                i = entry
+                # The replaced entry is still the newest of the second one
+                self._copy(entry, entry + 1)
+            else:
+                i = entry + 1
+        elif depth < self.depths[i] and self.generations[i] == self.generation:
+            return
+
+        self.keys[i] = key
+        self.depths[i] = depth
+        self.generations[i] = self.generation
+        self.values[i] = value
+
+    def _copy(self, source: int, destination: int):
+        self.keys[destination] = self.keys[source]
+        self.depths[destination] = self.depths[source]
+        self.generations[destination] = self.generations[source]
+        self.values[destination] = self.values[source]
+
+    def new_generation(self):
+        """Age every entry stored so far, making it the first to be\\
+        replaced."""
+
+        self.generation += 1
+
+    def clear(self):
+        self.depths = array('i', [-1]) * len(self.depths)
+        self.values = [None] * len(self.values)